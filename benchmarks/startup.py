@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cold-start timings for yoink-mcp and the yoink TUI.
+
+Each sample spawns a fresh interpreter, so the numbers include imports:
+
+- mcp: spawn -> ``initialize`` answered -> first ``list_downloads`` result
+- tui: spawn -> first frame rendered (headless)
+
+Usage: python benchmarks/startup.py [--repeat N] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+TUI_PROBE = """
+import asyncio
+from yoink.tui.app import YoinkApp
+
+async def main():
+    async with YoinkApp().run_test() as pilot:
+        await pilot.pause()
+        print("ready", flush=True)
+
+asyncio.run(main())
+"""
+
+
+async def _mcp_sample() -> dict[str, float]:
+    params = StdioServerParameters(command=sys.executable, args=["-m", "yoink.mcp_server.server"])
+    start = time.perf_counter()
+    async with stdio_client(params, errlog=subprocess.DEVNULL) as (read, write), ClientSession(read, write) as session:
+        await session.initialize()
+        initialized = time.perf_counter()
+        await session.call_tool("list_downloads", {})
+        first_tool = time.perf_counter()
+    return {
+        "mcp_initialize_ms": (initialized - start) * 1000,
+        "mcp_first_tool_ms": (first_tool - start) * 1000,
+    }
+
+
+def _tui_sample() -> dict[str, float]:
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", TUI_PROBE], stdout=subprocess.PIPE, text=True)
+    assert proc.stdout is not None
+    if proc.stdout.readline().strip() != "ready":
+        proc.wait()
+        raise RuntimeError("TUI probe exited before rendering")
+    first_frame = time.perf_counter()
+    proc.wait()
+    return {"tui_first_frame_ms": (first_frame - start) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, metavar="N", help="samples per metric (default: 5)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    samples: dict[str, list[float]] = {}
+    for _ in range(args.repeat):
+        for name, value in {**asyncio.run(_mcp_sample()), **_tui_sample()}.items():
+            samples.setdefault(name, []).append(value)
+
+    results = {
+        name: {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        for name, values in samples.items()
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:<22} median {r['median']:7.0f}  min {r['min']:7.0f}  max {r['max']:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
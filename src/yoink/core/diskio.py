@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import glob
+import os
+import shutil
+import sys
+from pathlib import Path
+
+_FALLOC_FL_KEEP_SIZE = 0x01
+_COPY_BUFFER = 1024 * 1024
+
+_libc = None
+if sys.platform.startswith("linux"):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        _libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+    except (OSError, AttributeError):
+        _libc = None
+
+
+def preallocate(path: str | Path, size: int) -> bool:
+    """Reserve ``size`` bytes of disk for ``path`` without changing its length.
+
+    The apparent size must stay put because yt-dlp appends to ``.part`` files
+    and resumes from their length. Only Linux supports this; elsewhere it is
+    a no-op that returns False.
+    """
+    if _libc is None or size <= 0:
+        return False
+    try:
+        fd = os.open(path, os.O_WRONLY)
+    except OSError:
+        return False
+    try:
+        return _libc.fallocate(fd, _FALLOC_FL_KEEP_SIZE, 0, size) == 0
+    finally:
+        os.close(fd)
+
+
+def atomic_move(src: Path, dest: Path, buffer_size: int = _COPY_BUFFER, replace: bool = True) -> int:
+    """Move ``src`` to ``dest`` so that ``dest`` never appears half-written.
+
+    A rename is used when both paths share a filesystem. Otherwise the data is
+    copied to a hidden sibling of ``dest``, fsynced and renamed into place.
+    With ``replace=False`` an existing ``dest`` is left alone and
+    FileExistsError is raised. Returns the number of bytes copied (0 for a
+    plain rename).
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        _place(src, dest, replace)
+        return 0
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp = dest.with_name(f".{dest.name}.yoink-tmp")
+    try:
+        with src.open("rb") as fin, tmp.open("wb") as fout:
+            shutil.copyfileobj(fin, fout, buffer_size)
+            fout.flush()
+            os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)
+        _place(tmp, dest, replace)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    size = dest.stat().st_size
+    src.unlink()
+    return size
+
+
+def _place(src: Path, dest: Path, replace: bool) -> None:
+    """Rename ``src`` to ``dest``; without ``replace``, never over an existing file."""
+    if replace:
+        os.replace(src, dest)
+        return
+    # A hard link fails if dest exists, so the check and the move are one step.
+    try:
+        os.link(src, dest)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        # No hard links on this filesystem; check, then rename.
+        if dest.exists():
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(dest)) from None
+        os.replace(src, dest)
+        return
+    src.unlink()
+
+
+def remove_partials(path: Path, format_id: str | None = None) -> int:
+    """Delete the in-progress files yt-dlp keeps for ``path``. Returns how many were removed.
+
+    That is the ``.part``/``.ytdl`` files, fragment pieces and ffmpeg's
+    ``.temp`` merge output. With ``format_id``, ``path`` is a merge input
+    (``<name>.f<id>.<ext>``) and is deleted as well.
+    """
+    stem = path.stem
+    if format_id is not None:
+        stem = stem.removesuffix(f".f{format_id}")
+    name = glob.escape(path.name)
+    patterns = [f"{name}.part", f"{name}.ytdl", f"{name}.part-Frag*", f"{glob.escape(stem)}.temp.*"]
+    if format_id is not None:
+        patterns.append(name)
+    removed = 0
+    for pattern in patterns:
+        for found in path.parent.glob(pattern):
+            try:
+                found.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
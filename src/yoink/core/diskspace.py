@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import shutil
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from .models import DiskReservation, FormatOption
+
+# Headroom kept free on every filesystem beyond the outstanding reservations.
+DEFAULT_MARGIN = 256 * 1024 * 1024
+
+
+class InsufficientDiskSpace(Exception):
+    pass
+
+
+def estimate_bytes(info: dict, merge_overhead: bool = True) -> int:
+    """Estimate the bytes a download will write from its extracted info.
+
+    Uses the format's filesize, falling back to bitrate x duration. Merged
+    downloads count twice because ffmpeg writes the output while the
+    separate streams are still on disk; pass ``merge_overhead=False`` when
+    the streams are muxed on the fly (clip downloads).
+    """
+    formats = info.get("requested_formats") or [info]
+    duration = info.get("duration") or 0
+    total = 0
+    for f in formats:
+        size = f.get("filesize") or f.get("filesize_approx")
+        if not size and f.get("tbr") and duration:
+            size = f["tbr"] * 1000 / 8 * duration
+        total += int(size or 0)
+    if merge_overhead and len(formats) > 1:
+        total *= 2
+    return total
+
+
+def _existing(path: Path) -> Path:
+    path = path.absolute()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path
+
+
+class DiskSpaceGuard:
+    """Admits downloads only when their estimated size fits on the target filesystems.
+
+    Reservations shrink as jobs report written bytes, so space already
+    consumed on disk isn't counted twice.
+    """
+
+    def __init__(self, margin: int = DEFAULT_MARGIN):
+        self._margin = margin
+        self._cond = threading.Condition()
+        self._reservations: dict[str, list[DiskReservation]] = {}
+
+    def reserve(
+        self,
+        download_id: str,
+        paths: list[str],
+        nbytes: int,
+        cancelled: Callable[[], bool] | None = None,
+        poll: float = 1.0,
+    ) -> bool:
+        """Block until ``nbytes`` fit on every filesystem in ``paths``.
+
+        Returns False if ``cancelled()`` turns true while waiting. Raises
+        InsufficientDiskSpace when the job could never fit, i.e. nothing
+        else holds a reservation on that filesystem.
+        """
+        targets: dict[int, Path] = {}
+        for p in paths:
+            existing = _existing(Path(p))
+            targets.setdefault(existing.stat().st_dev, existing)
+
+        with self._cond:
+            while True:
+                if cancelled is not None and cancelled():
+                    return False
+                blocked = None
+                for device, path in targets.items():
+                    free = shutil.disk_usage(path).free
+                    held = self._outstanding(device)
+                    if nbytes > 0 and free - held - self._margin < nbytes:
+                        blocked = (device, free)
+                        break
+                if blocked is None:
+                    self._reservations[download_id] = [
+                        DiskReservation(
+                            download_id=download_id,
+                            path=str(path),
+                            device=device,
+                            reserved_bytes=nbytes,
+                        )
+                        for device, path in targets.items()
+                    ]
+                    return True
+                device, free = blocked
+                if self._outstanding(device) == 0:
+                    raise InsufficientDiskSpace(
+                        f"Not enough disk space: needs {FormatOption._human_size(nbytes)}, "
+                        f"{FormatOption._human_size(max(0, free - self._margin))} free"
+                    )
+                self._cond.wait(poll)
+
+    def wake(self) -> None:
+        """Make waiting ``reserve`` calls re-check now, e.g. after a cancel."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def update(self, download_id: str, written_bytes: int) -> None:
+        with self._cond:
+            for r in self._reservations.get(download_id, []):
+                r.written_bytes = max(r.written_bytes, written_bytes)
+
+    def release(self, download_id: str) -> None:
+        with self._cond:
+            if self._reservations.pop(download_id, None) is not None:
+                self._cond.notify_all()
+
+    def reservations(self) -> list[DiskReservation]:
+        with self._cond:
+            return [r.model_copy() for rs in self._reservations.values() for r in rs]
+
+    def _outstanding(self, device: int) -> int:
+        return sum(
+            r.outstanding_bytes
+            for rs in self._reservations.values()
+            for r in rs
+            if r.device == device
+        )
@@ -1,20 +1,130 @@
 from __future__ import annotations
 
+import glob
+import re
+import shutil
+import tempfile
 import threading
 import time
 from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import yt_dlp
-
+from .diskio import atomic_move, preallocate, remove_partials
+from .diskspace import estimate_bytes
 from .errors import friendly_error
-from .models import DownloadProgress, DownloadRequest, DownloadStatus
+from .models import DownloadProgress, DownloadRequest, DownloadStatus, EngineOptions
+from .store import ContentStore, link_file
+from .streamcache import SharedStreamCache
+from .streaming import FileDescriptorSink, NamedPipeSink, StreamSink
+from .subprocs import ChildProcesses
+from .ytcache import cache_params
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+
+FRAGMENT_BUDGET = 16
+MAX_FRAGMENTS_PER_JOB = 8
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+STREAM_READ_SIZE = 64 * 1024
+# Clip sections are cut by ffmpeg, which reports no progress of its own.
+CLIP_POLL_INTERVAL = 0.5
+# Caption files yt-dlp writes next to the media; they aren't part of its size.
+_CAPTION_EXTS = frozenset({"vtt", "srt", "ass", "lrc", "ttml", "srv1", "srv2", "srv3", "json3"})
+
+# Audio-only selectors and FFmpegExtractAudio mappings ("source ext>target")
+# for each codec a client may accept without re-encoding.
+_AUDIO_SELECTORS = {
+    "m4a": "bestaudio[ext=m4a]",
+    "opus": "bestaudio[acodec=opus]",
+    "mp3": "bestaudio[ext=mp3]",
+}
+_AUDIO_PASSTHROUGH = {
+    "m4a": "m4a>m4a",
+    "opus": "webm>opus/opus>opus",
+    "mp3": "mp3>mp3",
+}
+# Seconds of MP3 encoding per second of audio, used until the manager has
+# measured real transcodes.
+DEFAULT_TRANSCODE_RATE = 0.02
+
+
+# How often blocking phases (extraction, slot waits) check for a cancel.
+CANCEL_POLL_INTERVAL = 0.1
+
+# Watchdog restarts allowed per job before a stall counts as a failure.
+MAX_RESTARTS = 3
 
 
 class DownloadCancelled(Exception):
     pass
 
 
+class DownloadStalled(Exception):
+    pass
+
+
+def auto_fragment_settings(running: int, max_concurrent: int) -> tuple[int, int]:
+    """Split the fragment thread budget across the download slots in use.
+
+    Returns ``(concurrent_fragments, http_chunk_size)``.
+    """
+    active = max(1, min(running, max_concurrent))
+    fragments = max(1, min(FRAGMENT_BUDGET // active, MAX_FRAGMENTS_PER_JOB))
+    return fragments, DEFAULT_CHUNK_SIZE
+
+
+def audio_action(info: dict, accepted: list[str]) -> str:
+    """Return ``"remux"`` if the selected audio stream can be kept as-is, else ``"transcode"``."""
+    ext = info.get("ext") or ""
+    acodec = info.get("acodec") or ""
+    for codec in [*accepted, "mp3"]:
+        if codec == "opus" and acodec.startswith("opus"):
+            return "remux"
+        if codec in ("m4a", "mp3") and ext == codec:
+            return "remux"
+    return "transcode"
+
+
+def clip_sections(info: dict, request: DownloadRequest) -> list[tuple[float, float]]:
+    """Return the ``(start, end)`` spans a clip request covers, in media seconds."""
+    duration = info.get("duration") or float("inf")
+    spans = [
+        (c.get("start_time") or 0.0, c.get("end_time") or duration)
+        for c in info.get("chapters") or []
+        if any(re.search(p, c.get("title") or "") for p in request.chapters)
+    ]
+    if request.start_time is not None or request.end_time is not None:
+        spans.append((request.start_time or 0.0, min(request.end_time or duration, duration)))
+    return spans
+
+
+def muxed_equivalent(info: dict) -> dict | None:
+    """Return a single audio+video format as good as the selected video+audio pair.
+
+    "As good" means at least the video stream's height and frame rate. None
+    when the selection isn't a merge or no muxed format matches.
+    """
+    requested = info.get("requested_formats") or []
+    if len(requested) < 2:
+        return None
+    video = next((f for f in requested if f.get("vcodec") not in (None, "none")), None)
+    if video is None:
+        return None
+    height, fps = video.get("height") or 0, video.get("fps") or 0
+    muxed = [
+        f for f in info.get("formats") or []
+        if f.get("vcodec") not in (None, "none")
+        and f.get("acodec") not in (None, "none")
+        and (f.get("height") or 0) >= height
+        and (f.get("fps") or fps) >= fps
+    ]
+    if not muxed:
+        return None
+    return max(muxed, key=lambda f: ((f.get("height") or 0), f.get("tbr") or 0))
+
+
 class DownloadEngine:
     """Executes a single download with progress reporting. Runs synchronously in a thread."""
 
@@ -22,28 +132,202 @@ class DownloadEngine:
         self,
         request: DownloadRequest,
         callback: Callable[[DownloadProgress], None] | None = None,
+        on_downloaded: Callable[[], None] | None = None,
+        postprocess_slot: threading.Semaphore | None = None,
+        sink: StreamSink | None = None,
+        options: EngineOptions | None = None,
     ):
         self.request = request
         self.callback = callback
+        self.sink = sink
+        self.options = options or EngineOptions()
+        self._preallocated: set[str] = set()
+        self._bytes_written = 0
+        # Post-processing (merge, audio extraction) is CPU-bound: the caller's
+        # download slot is handed back via on_downloaded once bytes are on disk,
+        # and the postprocess_slot bounds how many jobs mux/transcode at once.
+        self.on_downloaded = on_downloaded
+        self.postprocess_slot = postprocess_slot
+        self._in_postprocess = False
+        self.transcode_threads: int | None = None
+        self.transcode_rate = DEFAULT_TRANSCODE_RATE
+        self.media_duration: float | None = None
+        self.audio_action: str | None = None
+        # Share of the media a clip request covers, and its estimated size.
+        self.clip_fraction = 1.0
+        self.clip_bytes = 0
+        self._holds_postprocess_slot = False
+        self._bytes_on_disk = False
         self._cancel_event = threading.Event()
+        self._restart_event = threading.Event()
+        self._children = ChildProcesses()
+        self._clip_prefix: Path | None = None
+        # Every file yt-dlp reported writing; removed with their .part files on cancel.
+        self._seen_files: set[str] = set()
         self._last_callback_time: float = 0
         self._progress = DownloadProgress(
             download_id=request.download_id,
             status=DownloadStatus.QUEUED,
         )
+        # Fragment threads report concurrently and video/audio streams each
+        # count from zero, so bytes are aggregated per file (per format id for
+        # merge components) under a lock.
+        self._progress_lock = threading.Lock()
+        self._file_bytes: dict[str | None, tuple[int, int]] = {}
+        self._finished_files: set[str | None] = set()
+        self.auto_fragments, self.auto_chunk_size = auto_fragment_settings(1, 1)
+        self._stage: str | None = None
+        self._stage_since: float = 0.0
+        self._begin_stage("queued")
+        self._prepared = False
+        self._info: dict | None = None
+        self._prepare_error: Exception | None = None
+        # Info from an earlier extraction of the same URL; reused for format
+        # selection instead of extracting again.
+        self.cached_info: dict | None = None
+        self._format_override: str | None = None
+        # True when _info came from cached_info; the download then starts from it.
+        self._info_reused = False
+        # Set by the manager; component streams other jobs also need come from here.
+        self.stream_cache: SharedStreamCache | None = None
+
+    def prepare(self) -> dict | None:
+        """Extract metadata ahead of the download. Safe to call more than once.
+
+        The manager calls this once the job has a slot, before the download,
+        so it can size the job; extraction errors are held back and raised by
+        ``run``.
+        """
+        if self._prepared:
+            return self._info
+        self._prepared = True
+        self._begin_stage("extract")
+        try:
+            self._info = self._abandonable(self._extract)
+        except Exception as e:
+            self._prepare_error = e
+        if self._info and self.options.avoid_merges:
+            self._avoid_merge()
+        self._begin_stage("queued")
+
+        info = self._info
+        if info:
+            self._progress.title = info.get("title", "Unknown")
+            self.media_duration = info.get("duration")
+            if self.request.convert_to_mp3:
+                self.audio_action = audio_action(info, self.request.accept_audio_codecs)
+            if self.request.is_clip and info.get("duration"):
+                covered = sum(max(0.0, end - start) for start, end in clip_sections(info, self.request))
+                self.clip_fraction = min(1.0, covered / info["duration"])
+                self.clip_bytes = int(estimate_bytes(info, merge_overhead=False) * self.clip_fraction)
+            self._emit_progress(force=True)
+        return info
+
+    def _extract(self) -> dict | None:
+        import yt_dlp
+
+        opts = {
+            "format": self._format_string(),
+            "quiet": True,
+            "no_warnings": True,
+            **cache_params(self.options.cache_dir),
+        }
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            if self.cached_info is not None:
+                clean = ydl.sanitize_info(dict(self.cached_info), remove_private_keys=True)
+                self._info_reused = True
+                return ydl.process_ie_result(clean, download=False)
+            return ydl.extract_info(self.request.url, download=False)
+
+    def _abandonable(self, fn: Callable[[], dict | None]) -> dict | None:
+        """Run ``fn`` on a helper thread and stop waiting for it once the job is cancelled.
+
+        yt-dlp can't interrupt an extraction, so an abandoned one finishes in
+        the background and its result is dropped.
+        """
+        if self._cancel_event.is_set():
+            raise DownloadCancelled()
+        result: dict = {}
+        done = threading.Event()
+
+        def target() -> None:
+            try:
+                with self._children.track():
+                    result["info"] = fn()
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name=f"yoink-extract-{self.request.download_id}", daemon=True).start()
+        while not done.wait(CANCEL_POLL_INTERVAL):
+            if self._cancel_event.is_set():
+                raise DownloadCancelled()
+        if "error" in result:
+            raise result["error"]
+        return result["info"]
+
+    def _avoid_merge(self) -> None:
+        """Switch a video+audio selection to an equivalent muxed format, skipping the merge.
+
+        The muxed format must still satisfy the request's own format string,
+        so pinned format ids are left alone.
+        """
+        import yt_dlp
+
+        muxed = muxed_equivalent(self._info)
+        if muxed is None:
+            return
+        opts = {"format": self._format_string(), "quiet": True, "no_warnings": True}
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                clean = ydl.sanitize_info(dict(self._info), remove_private_keys=True)
+                probe = ydl.process_ie_result({**clean, "formats": [muxed]}, download=False)
+        except Exception:
+            return
+        if not probe or probe.get("requested_formats"):
+            return
+        self._format_override = muxed["format_id"]
+        self._info = probe
+        self._progress.merge_avoided = True
+
+    def _format_string(self) -> str:
+        if self._format_override is not None:
+            return self._format_override
+        if not self.request.convert_to_mp3:
+            return self.request.format_string
+        accepted = self.request.accept_audio_codecs
+        selectors = [_AUDIO_SELECTORS[c] for c in accepted]
+        if not accepted:
+            selectors.append(_AUDIO_SELECTORS["m4a"])
+        return "/".join([*selectors, "bestaudio", "best"])
 
     def run(self) -> DownloadProgress:
         """Execute the download. Call from a thread pool."""
-        output_dir = Path(self.request.output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        outtmpl = str(output_dir / self.request.output_template)
-
-        format_string = self.request.format_string
-        if self.request.convert_to_mp3:
-            format_string = "bestaudio[ext=m4a]/bestaudio/best"
+        stream_dir = staging_dir = None
+        final_dir = Path(self.request.output_dir)
+        if self.options.staging_dir:
+            Path(self.options.staging_dir).mkdir(parents=True, exist_ok=True)
+        if self.request.output_mode == "stream":
+            # Only used when the stream needs a merge or conversion first.
+            stream_dir = tempfile.mkdtemp(prefix="yoink-stream-", dir=self.options.staging_dir)
+            output_dir = Path(stream_dir)
+        elif self.options.staging_dir:
+            staging_dir = Path(self.options.staging_dir).absolute() / f"yoink-{self.request.download_id}"
+            staging_dir.mkdir(parents=True, exist_ok=True)
+            output_dir = staging_dir
+        else:
+            output_dir = final_dir
+            output_dir.mkdir(parents=True, exist_ok=True)
+        template = self.request.output_template
+        if self.request.is_clip:
+            # Each section gets its own file instead of overwriting the last one.
+            stem, dot, ext = template.rpartition(".")
+            template = f"{stem} [%(section_title,section_start)s]{dot}{ext}" if dot else template
+        outtmpl = str(output_dir / template)
 
         ydl_opts: dict = {
-            "format": format_string,
+            "format": self._format_string(),
             "outtmpl": outtmpl,
             "quiet": True,
             "no_warnings": True,
@@ -51,89 +335,609 @@ class DownloadEngine:
             "progress_hooks": [self._progress_hook],
             "postprocessor_hooks": [self._postprocessor_hook],
             "noprogress": True,
+            **cache_params(self.options.cache_dir),
         }
 
         if self.request.speed_limit:
             ydl_opts["ratelimit"] = self.request.speed_limit
 
+        if self.options.socket_timeout:
+            ydl_opts["socket_timeout"] = self.options.socket_timeout
+
+        if self.options.buffer_size:
+            ydl_opts["buffersize"] = self.options.buffer_size
+            ydl_opts["noresizebuffer"] = True
+
+        fragments = self.request.concurrent_fragments or self.auto_fragments
+        ydl_opts["concurrent_fragment_downloads"] = fragments
+        chunk_size = self.request.http_chunk_size
+        if chunk_size is None:
+            chunk_size = self.auto_chunk_size
+        if chunk_size:
+            ydl_opts["http_chunk_size"] = chunk_size
+
+        if self.request.is_clip:
+            ranges = []
+            if self.request.start_time is not None or self.request.end_time is not None:
+                ranges.append((self.request.start_time or 0, self.request.end_time or float("inf")))
+            from yt_dlp.utils import download_range_func
+
+            ydl_opts["download_ranges"] = download_range_func(self.request.chapters or None, ranges)
+
+        if self.request.subtitles_only:
+            ydl_opts["skip_download"] = True
+
         if self.request.download_subtitles:
             ydl_opts["writesubtitles"] = True
             ydl_opts["writeautomaticsub"] = True
             ydl_opts["subtitleslangs"] = [self.request.subtitle_lang]
 
         if self.request.convert_to_mp3:
+            mapping = [_AUDIO_PASSTHROUGH[c] for c in self.request.accept_audio_codecs]
             ydl_opts.setdefault("postprocessors", [])
             ydl_opts["postprocessors"].append({
                 "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
+                "preferredcodec": "/".join([*mapping, "mp3"]),
                 "preferredquality": "192",
             })
+            if self.transcode_threads:
+                ydl_opts["postprocessor_args"] = {
+                    "extractaudio+ffmpeg": ["-threads", str(self.transcode_threads)],
+                }
 
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(self.request.url, download=False)
-                if info:
-                    self._progress.title = info.get("title", "Unknown")
-                self._update_status(DownloadStatus.DOWNLOADING)
-                ydl.download([self.request.url])
-
-            self._update_status(DownloadStatus.FINISHED)
-            self._progress.percent = 100.0
-            self._emit_progress(force=True)
+            info = self.prepare()
+            if self._prepare_error is not None:
+                raise self._prepare_error
+            if self._cancel_event.is_set():
+                raise DownloadCancelled()
+            if self.request.is_clip and not clip_sections(info or {}, self.request):
+                raise ValueError("No chapters match " + ", ".join(self.request.chapters))
+            if not self._link_from_store(info or {}, final_dir):
+                # ffmpeg merges/conversions run inside download(); track them so cancel can kill them.
+                with self._children.track():
+                    self._download(ydl_opts, info or {}, output_dir, streaming=stream_dir is not None)
+                if staging_dir is not None:
+                    self._finalize(staging_dir, final_dir)
+                self._add_to_store(info or {})
+            status = DownloadStatus.FINISHED
         except DownloadCancelled:
-            self._update_status(DownloadStatus.CANCELLED)
-            self._emit_progress(force=True)
+            status = DownloadStatus.CANCELLED
         except Exception as e:
-            self._progress.error = friendly_error(str(e))
-            self._update_status(DownloadStatus.ERROR)
-            self._emit_progress(force=True)
+            if self._cancel_event.is_set():
+                # A killed ffmpeg or closed pipe surfaces as an ordinary error.
+                status = DownloadStatus.CANCELLED
+            else:
+                self._progress.error = friendly_error(str(e))
+                status = DownloadStatus.ERROR
+        finally:
+            self._begin_stage(None)
+            for temp_dir in (stream_dir, staging_dir):
+                if temp_dir is not None:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+            if self._holds_postprocess_slot:
+                self._holds_postprocess_slot = False
+                self.postprocess_slot.release()
+
+        if status == DownloadStatus.FINISHED:
+            self._progress.percent = 100.0
+            self._progress.disk_throughput = self._disk_throughput()
+        elif status == DownloadStatus.CANCELLED:
+            self._discard_partials()
+        self._update_status(status)
+        self._emit_progress(force=True)
+        return self._progress
+
+    def _download(self, ydl_opts: dict, info: dict, output_dir: Path, streaming: bool) -> None:
+        import yt_dlp
+
+        while True:
+            try:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    self._begin_stage("download")
+                    self._update_status(DownloadStatus.DOWNLOADING)
+                    if streaming:
+                        self._stream(ydl, info)
+                    elif self.request.is_clip:
+                        self._download_clip(ydl, info, output_dir)
+                    else:
+                        self._use_shared_streams(ydl, info, output_dir)
+                        self._fetch(ydl)
+                return
+            except DownloadStalled:
+                # Retries extract again, so they get fresh media URLs and
+                # resume from the .part files left in place.
+                if self._progress.restart_count >= MAX_RESTARTS:
+                    raise RuntimeError(f"Download stalled {MAX_RESTARTS + 1} times")
+                self._restart_event.clear()
+                self._progress.restart_count += 1
+
+    def _fetch(self, ydl) -> None:
+        """Download the selected formats, from the reused extraction on the first attempt.
+
+        Outputs of one group share one extraction this way instead of each
+        extracting again inside ``download()``.
+        """
+        if self._info_reused and self._info and not self._progress.restart_count:
+            clean = ydl.sanitize_info(dict(self._info), remove_private_keys=True)
+            ydl.process_ie_result(clean, download=True)
+        else:
+            ydl.download([self.request.url])
+
+    def _discard_partials(self) -> None:
+        """Delete what a cancelled download left behind. Finished outputs are kept."""
+        info = self._info or {}
+        components = [f["format_id"] for f in info.get("requested_formats") or [] if f.get("format_id")]
+        for name in list(self._seen_files):
+            path = Path(name)
+            format_id = next((c for c in components if path.stem.endswith(f".f{c}")), None)
+            remove_partials(path, format_id)
+        if self._clip_prefix is not None:
+            prefix = self._clip_prefix
+            for part in prefix.parent.glob(glob.escape(prefix.name) + " [*.part"):
+                part.unlink(missing_ok=True)
+
+    def _download_clip(self, ydl, info: dict, output_dir: Path) -> None:
+        """Download the requested sections, polling their files for progress."""
+        stem = Path(ydl.prepare_filename(info, outtmpl=str(output_dir / self.request.output_template))).stem
+        self._clip_prefix = output_dir / stem
+        stop = threading.Event()
+        watcher = threading.Thread(
+            target=self._watch_clip, args=(output_dir, stem, stop), daemon=True
+        )
+        watcher.start()
+        try:
+            self._fetch(ydl)
+        finally:
+            stop.set()
+            watcher.join()
+
+    def _watch_clip(self, output_dir: Path, stem: str, stop: threading.Event) -> None:
+        started = time.time()
+        while not stop.wait(CLIP_POLL_INTERVAL):
+            written = 0
+            for path in output_dir.glob(glob.escape(stem) + " [*"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if st.st_mtime >= started:
+                    written += st.st_size
+            with self._progress_lock:
+                self._progress.status = DownloadStatus.DOWNLOADING
+                self._record_file_bytes({
+                    "filename": "clip",
+                    "downloaded_bytes": written,
+                    "total_bytes_estimate": self.clip_bytes,
+                })
+                self._emit_progress()
+
+    def _use_shared_streams(self, ydl, info: dict, output_dir: Path) -> None:
+        """Place streams shared with other jobs where yt-dlp expects them.
 
+        yt-dlp skips any download whose file (``<name>.f<format_id>.<ext>``
+        for merge components) already exists, so the job picks up the cached
+        copy instead of fetching it.
+        """
+        requested = info.get("requested_formats") or [info]
+        if self.stream_cache is None or not info.get("id") or self.request.subtitles_only:
+            return
+        base = Path(ydl.prepare_filename(info, outtmpl=str(output_dir / self.request.output_template)))
+        for fmt in requested:
+            if not fmt.get("format_id"):
+                continue
+            key = (info["id"], fmt["format_id"])
+            if self.stream_cache.users(key) < 2:
+                continue
+            # Waiting on another job's fetch moves no bytes; keep the watchdog off it.
+            self._begin_stage("shared_wait")
+            try:
+                cached = self.stream_cache.fetch(
+                    key,
+                    lambda target, fmt=fmt: self._fetch_component(info, fmt, target),
+                    cancelled=lambda: self.is_cancelled,
+                )
+            finally:
+                with self._progress_lock:
+                    self._file_bytes.pop(fmt["format_id"], None)
+                self._begin_stage("download")
+            if self._cancel_event.is_set():
+                raise DownloadCancelled()
+            if cached is None:
+                continue
+            if len(requested) == 1:
+                link_file(cached, base)
+            else:
+                link_file(cached, base.with_name(f"{base.stem}.f{fmt['format_id']}.{fmt['ext']}"))
+
+    def _fetch_component(self, info: dict, fmt: dict, target: Path) -> Path:
+        import yt_dlp
+
+        opts = {
+            "format": fmt["format_id"],
+            "outtmpl": str(target / "stream.%(ext)s"),
+            "quiet": True,
+            "no_warnings": True,
+            "noprogress": True,
+            "progress_hooks": [lambda d: self._component_hook(d, fmt["format_id"])],
+        }
+        if self.request.speed_limit:
+            opts["ratelimit"] = self.request.speed_limit
+        self._begin_stage("download")
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            clean = ydl.sanitize_info(dict(info), remove_private_keys=True)
+            ydl.process_ie_result(clean, download=True)
+        return target / f"stream.{fmt['ext']}"
+
+    def _component_hook(self, d: dict, format_id: str) -> None:
+        """Count a shared fetch's bytes so the watchdog sees it moving.
+
+        The entry is dropped once the fetch ends; yt-dlp then reports the
+        linked file in place with its full size.
+        """
+        self._cancel_hook(d)
+        if d.get("status") == "downloading":
+            with self._progress_lock:
+                self._record_file_bytes(d, key=format_id)
+                self._progress.speed = d.get("speed") or 0.0
+                self._emit_progress()
+
+    def _cancel_hook(self, d: dict) -> None:
+        if self._cancel_event.is_set():
+            raise DownloadCancelled()
+        if self._restart_event.is_set():
+            raise DownloadStalled()
+
+    def _store_key(self, info: dict) -> tuple[str, str] | None:
+        if (
+            not self.options.store_dir
+            or self.request.output_mode == "stream"
+            or self.request.is_clip
+            or self.request.subtitles_only
+        ):
+            return None
+        video_id, format_id = info.get("id"), info.get("format_id")
+        if not video_id or not format_id:
+            return None
+        if self.request.convert_to_mp3:
+            codecs = "-".join(self.request.accept_audio_codecs) or "mp3"
+            format_id = f"{format_id}~audio-{codecs}"
+        return video_id, format_id
+
+    def _link_from_store(self, info: dict, final_dir: Path) -> bool:
+        """Satisfy the job from the content store instead of downloading. False on a miss."""
+        import yt_dlp
+
+        key = self._store_key(info)
+        # Subtitles live next to the media, not in the store.
+        if key is None or self.request.download_subtitles:
+            return False
+        with yt_dlp.YoutubeDL({"outtmpl": str(final_dir / self.request.output_template)}) as ydl:
+            dest = Path(ydl.prepare_filename(info))
+        self._begin_stage("store_link")
+        linked = ContentStore(self.options.store_dir).link_into(*key, dest)
+        if linked is None:
+            return False
+        self._progress.output_path = str(linked)
+        self._progress.store_hit = True
+        return True
+
+    def _add_to_store(self, info: dict) -> None:
+        key = self._store_key(info)
+        if key is None or not self._progress.output_path:
+            return
+        try:
+            ContentStore(self.options.store_dir).add(*key, Path(self._progress.output_path))
+        except OSError:
+            pass  # the download itself succeeded; the store is best-effort
+
+    def _finalize(self, staging_dir: Path, final_dir: Path) -> None:
+        """Atomically move every finished file from the staging dir into output_dir."""
+        self._begin_stage("finalize")
+        output_path = Path(self._progress.output_path) if self._progress.output_path else None
+        for src in sorted(p for p in staging_dir.rglob("*") if p.is_file()):
+            if src.suffix in (".part", ".ytdl"):
+                continue
+            dest = self._move_unclobbered(src, final_dir / src.relative_to(staging_dir))
+            if output_path == src:
+                self._progress.output_path = str(dest)
+        self._begin_stage(None)
+
+    def _move_unclobbered(self, src: Path, dest: Path) -> Path:
+        """Move ``src`` to ``dest``, or to ``name (N).ext`` beside it if that's taken.
+
+        yt-dlp never overwrites an existing output when it writes in place,
+        so a staged download mustn't either. Returns where the file went.
+        """
+        candidate, n = dest, 0
+        while True:
+            try:
+                self._bytes_written += atomic_move(
+                    src, candidate, self.options.buffer_size or 1024 * 1024, replace=False
+                )
+                return candidate
+            except FileExistsError:
+                n += 1
+                candidate = dest.with_name(f"{dest.stem} ({n}){dest.suffix}")
+
+    def _disk_throughput(self) -> float | None:
+        """Bytes per second this job wrote to disk across download and finalize."""
+        timings = self._progress.stage_timings
+        seconds = timings.get("download", 0.0) + timings.get("finalize", 0.0)
+        if self.request.output_mode == "stream" or seconds <= 0:
+            return None
+        written = self._bytes_written + self._progress.downloaded_bytes
+        return round(written / seconds, 1) if written else None
+
+    def _stream(self, ydl: yt_dlp.YoutubeDL, info: dict) -> None:
+        """Send the media to the stream sink, skipping the disk when no merge is needed."""
+        sink = self._open_sink()
+        try:
+            direct = (
+                not info.get("requested_formats")
+                and info.get("protocol") in ("http", "https")
+                and info.get("url")
+                and not self.request.convert_to_mp3
+            )
+            if direct:
+                self._stream_http(ydl, info, sink)
+            else:
+                self._fetch(ydl)
+                if not self._progress.output_path:
+                    raise RuntimeError("Download produced no file to stream")
+                self._stream_file(Path(self._progress.output_path), sink)
+        finally:
+            sink.close()
+        self._progress.output_path = None
+
+    def _open_sink(self) -> StreamSink:
+        if self.sink is not None:
+            return self.sink
+        if self.request.stream_fd is not None:
+            return FileDescriptorSink(self.request.stream_fd)
+        if self.request.stream_path:
+            return NamedPipeSink(self.request.stream_path, cancelled=self._cancel_event.is_set)
+        raise ValueError("Streaming output needs stream_fd, stream_path or a consumer")
+
+    def _stream_http(self, ydl: yt_dlp.YoutubeDL, info: dict, sink: StreamSink) -> None:
+        """Fetch the format URL in ranged chunks and forward each block as it arrives."""
+        import yt_dlp
+
+        headers = dict(info.get("http_headers") or {})
+        total = info.get("filesize") or info.get("filesize_approx") or 0
+        chunk_size = self.request.http_chunk_size
+        if chunk_size is None:
+            chunk_size = self.auto_chunk_size
+        started = time.monotonic()
+        done = 0
+        while True:
+            if chunk_size and total:
+                end = min(done + chunk_size, total) - 1
+                headers["Range"] = f"bytes={done}-{end}"
+            response = ydl.urlopen(yt_dlp.networking.Request(info["url"], headers=headers))
+            try:
+                if not total:
+                    total = int(response.headers.get("Content-Length") or 0)
+                received = 0
+                while chunk := response.read(STREAM_READ_SIZE):
+                    self._write_chunk(sink, chunk)
+                    done += len(chunk)
+                    received += len(chunk)
+                    elapsed = max(time.monotonic() - started, 1e-6)
+                    speed = done / elapsed
+                    self._progress_hook({
+                        "status": "downloading",
+                        "filename": "<stream>",
+                        "downloaded_bytes": done,
+                        "total_bytes": total or None,
+                        "speed": speed,
+                        "eta": int((total - done) / speed) if total else None,
+                    })
+            finally:
+                response.close()
+            if "Range" not in headers or not received or done >= total:
+                break
+
+    def _stream_file(self, path: Path, sink: StreamSink) -> None:
+        with path.open("rb") as f:
+            while chunk := f.read(STREAM_READ_SIZE):
+                self._write_chunk(sink, chunk)
+
+    def _write_chunk(self, sink: StreamSink, chunk: bytes) -> None:
+        if self._cancel_event.is_set():
+            raise DownloadCancelled()
+        try:
+            sink.write(chunk)
+        except BrokenPipeError:
+            if self._cancel_event.is_set():
+                raise DownloadCancelled() from None
+            raise RuntimeError("Stream consumer closed the pipe") from None
+
+    def fail(self, message: str) -> DownloadProgress:
+        """Mark a job that never reached ``run`` as failed."""
+        self._begin_stage(None)
+        self._progress.error = message
+        self._update_status(DownloadStatus.ERROR)
+        self._emit_progress(force=True)
         return self._progress
 
     def cancel(self) -> None:
         self._cancel_event.set()
+        self._children.kill()
+
+    def drop(self) -> DownloadProgress:
+        """Mark a job cancelled while it waited for a download slot."""
+        self._begin_stage(None)
+        self._update_status(DownloadStatus.CANCELLED)
+        self._emit_progress(force=True)
+        return self._progress
+
+    def request_restart(self, reason: str) -> None:
+        """Abort the current transfer at the next progress report and start it again."""
+        with self._progress_lock:
+            self._progress.stall_count += 1
+            self._progress.stall_reason = reason
+        self._restart_event.set()
+
+    @property
+    def progress(self) -> DownloadProgress:
+        return self._progress
+
+    @property
+    def stage(self) -> str | None:
+        return self._stage
 
     @property
     def is_cancelled(self) -> bool:
         return self._cancel_event.is_set()
 
     def _progress_hook(self, d: dict) -> None:
+        if d.get("filename"):
+            self._seen_files.add(d["filename"])
         if self._cancel_event.is_set():
             raise DownloadCancelled()
+        if self._restart_event.is_set():
+            raise DownloadStalled()
 
         status = d.get("status", "")
-        if status == "downloading":
-            self._progress.status = DownloadStatus.DOWNLOADING
-            self._progress.downloaded_bytes = d.get("downloaded_bytes", 0)
-            self._progress.total_bytes = (
-                d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-            )
-            self._progress.speed = d.get("speed") or 0.0
-            self._progress.eta = d.get("eta")
-            if self._progress.total_bytes > 0:
-                self._progress.percent = (
-                    self._progress.downloaded_bytes / self._progress.total_bytes * 100
-                )
-            self._emit_progress()
-        elif status == "finished":
-            filepath = d.get("filename") or d.get("info_dict", {}).get("filepath")
-            if filepath:
-                self._progress.output_path = str(filepath)
-            self._progress.percent = 100.0
-            self._progress.status = DownloadStatus.MERGING
-            self._emit_progress(force=True)
+        if self._is_caption(d) and not self.request.subtitles_only:
+            return  # progress and the merge wait track the media only
+        with self._progress_lock:
+            if status == "downloading":
+                self._progress.status = DownloadStatus.DOWNLOADING
+                self._record_file_bytes(d)
+                self._maybe_preallocate(d)
+                self._progress.speed = d.get("speed") or 0.0
+                self._progress.eta = d.get("eta")
+                self._emit_progress()
+            elif status == "finished":
+                filepath = d.get("filename") or d.get("info_dict", {}).get("filepath")
+                if filepath:
+                    self._progress.output_path = str(filepath)
+                self._bytes_on_disk = True
+                if self.request.is_clip:
+                    # Sections report only completion; _watch_clip tracks their bytes.
+                    self._emit_progress(force=True)
+                    return
+                self._record_file_bytes(d, finished=True)
+                # Merge components finish one by one; only the last starts the merge.
+                requested = [f.get("format_id") for f in self._requested_formats()]
+                if self._finished_files >= set(requested or self._file_bytes):
+                    self._progress.percent = 100.0
+                    self._progress.status = DownloadStatus.MERGING
+                self._emit_progress(force=True)
+
+    def _maybe_preallocate(self, d: dict) -> None:
+        """Reserve the whole .part file once its exact size is known."""
+        tmpfile = d.get("tmpfilename")
+        total = d.get("total_bytes")
+        if not self.options.preallocate or not tmpfile or not total:
+            return
+        if tmpfile in self._preallocated:
+            return
+        self._preallocated.add(tmpfile)
+        preallocate(tmpfile, int(total))
+
+    def _is_caption(self, d: dict) -> bool:
+        """Whether a hook report is for a subtitle file rather than the media."""
+        url = (d.get("info_dict") or {}).get("url")
+        subtitles = (self._info or {}).get("requested_subtitles") or {}
+        if url and any(s.get("url") == url for s in subtitles.values()):
+            return True
+        name = (d.get("filename") or d.get("tmpfilename") or "").removesuffix(".part")
+        return Path(name).suffix[1:].lower() in _CAPTION_EXTS
+
+    def _file_key(self, d: dict) -> str | None:
+        """The format id of the merge component a hook reports on, else its file name."""
+        name = d.get("filename") or d.get("tmpfilename")
+        ids = {f.get("format_id") for f in self._requested_formats()}
+        format_id = (d.get("info_dict") or {}).get("format_id")
+        if format_id in ids:
+            return format_id
+        # Components are written as <name>.f<format_id>.<ext>.
+        match = re.search(r"\.f([^.]+)\.[^.]+(?:\.part)?$", name or "")
+        if match and match.group(1) in ids:
+            return match.group(1)
+        return name
+
+    def _record_file_bytes(self, d: dict, finished: bool = False, key: str | None = None) -> None:
+        """Fold one hook report into the per-file totals without going backwards."""
+        key = key or self._file_key(d)
+        prev_done, prev_total = self._file_bytes.get(key, (0, 0))
+        done = max(prev_done, d.get("downloaded_bytes") or 0)
+        total = d.get("total_bytes") or d.get("total_bytes_estimate") or prev_total
+        if finished:
+            self._finished_files.add(key)
+            total = done = max(done, int(total))
+        self._file_bytes[key] = (done, max(int(total), done))
+
+        self._progress.downloaded_bytes = sum(b for b, _ in self._file_bytes.values())
+        self._progress.total_bytes = sum(t for _, t in self._file_bytes.values())
+        if not self.request.is_clip:
+            # Components that haven't started yet still count toward the total.
+            unseen = [f for f in self._requested_formats() if f.get("format_id") not in self._file_bytes]
+            self._progress.total_bytes += sum(int(f.get("filesize") or f.get("filesize_approx") or 0) for f in unseen)
+        if self._progress.total_bytes > 0:
+            percent = self._progress.downloaded_bytes / self._progress.total_bytes * 100
+            self._progress.percent = max(self._progress.percent, min(percent, 99.9))
+
+    def _requested_formats(self) -> list[dict]:
+        """The merge components yt-dlp will download, in order; empty for a single format."""
+        if self.request.subtitles_only:
+            return []
+        return (self._info or {}).get("requested_formats") or []
 
     def _postprocessor_hook(self, d: dict) -> None:
         if self._cancel_event.is_set():
             raise DownloadCancelled()
         status = d.get("status", "")
         if status == "started":
+            if self._bytes_on_disk:
+                self._enter_postprocess()
+            if d.get("postprocessor") == "ExtractAudio" and self.audio_action:
+                self._begin_stage(self.audio_action)
             self._progress.status = DownloadStatus.MERGING
             self._emit_progress(force=True)
         elif status == "finished":
             filepath = d.get("info_dict", {}).get("filepath")
             if filepath:
                 self._progress.output_path = str(filepath)
+            if d.get("postprocessor") == "ExtractAudio" and self.audio_action:
+                self._begin_stage("postprocess")
+                self._record_encode_savings()
+
+    def _enter_postprocess(self) -> None:
+        """Switch to the post-processing stage, trading the download slot for a CPU slot."""
+        if self._in_postprocess:
+            return
+        self._in_postprocess = True
+        self._begin_stage("postprocess_wait")
+        if self.on_downloaded is not None:
+            self.on_downloaded()
+        if self.postprocess_slot is not None:
+            while not self.postprocess_slot.acquire(timeout=0.2):
+                if self._cancel_event.is_set():
+                    raise DownloadCancelled()
+            self._holds_postprocess_slot = True
+        self._begin_stage("postprocess")
+
+    def _record_encode_savings(self) -> None:
+        """Estimate the MP3 encode time a remux avoided, from the measured transcode rate."""
+        timings = self._progress.stage_timings
+        if self.audio_action != "remux" or not self.media_duration:
+            return
+        estimate = self.media_duration * self.transcode_rate
+        timings["encode_saved"] = round(max(0.0, estimate - timings.get("remux", 0.0)), 3)
+
+    def _begin_stage(self, stage: str | None) -> None:
+        """Close the running stage's timer and start the next one."""
+        now = time.monotonic()
+        if self._stage is not None:
+            timings = self._progress.stage_timings
+            elapsed = timings.get(self._stage, 0.0) + now - self._stage_since
+            timings[self._stage] = round(elapsed, 3)
+        self._stage = stage
+        self._stage_since = now
 
     def _update_status(self, status: DownloadStatus) -> None:
         self._progress.status = status
@@ -145,4 +949,14 @@ class DownloadEngine:
         if not force and (now - self._last_callback_time) < 0.1:
             return
         self._last_callback_time = now
-        self.callback(self._progress.model_copy())
+        self.callback(self._progress.model_copy(deep=True))
+
+
+def __getattr__(name: str):
+    # yt_dlp takes a noticeable part of startup to import, so it is imported
+    # on first use. This keeps ``engine.yt_dlp`` reachable for callers and tests.
+    if name == "yt_dlp":
+        import yt_dlp
+
+        return yt_dlp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -12,6 +12,7 @@ _PATTERNS: list[tuple[re.Pattern[str], str]] = [
     (re.compile(r"HTTP Error 404", re.I), "Video not found (404). Check the URL."),
     (re.compile(r"(ffmpeg|ffprobe).*(not found|is not recognized)", re.I), "ffmpeg is not installed. Install it to merge video+audio."),
     (re.compile(r"(No space left on device|disk full|ENOSPC)", re.I), "Disk full. Free up space and try again."),
+    (re.compile(r"Download stalled", re.I), "Download kept stalling even after restarting. Try again later."),
     (re.compile(r"(timed? ?out|TimeoutError|Read timed out)", re.I), "Connection timed out. Check your internet and try again."),
     (re.compile(r"(network|connection|ConnectionError|URLError)", re.I), "Network error. Check your internet connection."),
     (re.compile(r"Unsupported URL", re.I), "Unsupported URL. Only YouTube links are supported."),
@@ -1,8 +1,83 @@
 from __future__ import annotations
 
-import yt_dlp
+import threading
+import time
+from collections.abc import Collection
+from typing import Literal
 
 from .models import FetchResult, FormatOption, PlaylistInfo, VideoInfo
+from .ytcache import cache_params
+
+
+ExtractionProfile = Literal["basic", "formats-audio", "formats-video", "full"]
+
+# yt-dlp YouTube extractor args per profile, cheapest first. A profile's
+# result also answers every profile listed before it.
+PROFILES: dict[str, dict[str, list[str]]] = {
+    # Title, duration, uploader etc. from one JS-less player client; no
+    # player JS, no watch-next data, no manifests.
+    "basic": {
+        "player_client": ["visionos"],
+        "player_skip": ["js", "initial_data"],
+        "skip": ["dash", "hls", "translated_subs"],
+    },
+    # visionos serves the audio-only adaptive streams without player JS.
+    "formats-audio": {
+        "player_client": ["visionos"],
+        "player_skip": ["js", "initial_data"],
+        "skip": ["hls", "translated_subs"],
+    },
+    # Default clients for the full video ladder, minus chapters/translations.
+    "formats-video": {
+        "player_skip": ["initial_data"],
+        "skip": ["translated_subs"],
+    },
+    "full": {},
+}
+_RANK = {name: rank for rank, name in enumerate(PROFILES)}
+BASIC_FIELDS = frozenset(VideoInfo.model_fields) - {"formats"}
+
+
+def profile_for(fields: Collection[str] | None = None, audio_only: bool = False) -> ExtractionProfile:
+    """The cheapest profile whose result has every VideoInfo field in ``fields``.
+
+    With no fields (None or empty) the lookup stays ``full``: the result is
+    cached, and a download or quality plan of the same URL can only reuse a
+    full one.
+    """
+    if fields and not set(fields) - BASIC_FIELDS:
+        return "basic"
+    if audio_only:
+        return "formats-audio"
+    return "formats-video" if fields else "full"
+
+
+def playlist_indices(spec: str, count: int) -> list[int]:
+    """0-based indices of the entries a yt-dlp ``--playlist-items`` spec selects.
+
+    ``spec`` is 1-based with inclusive ranges, e.g. ``"1-3,7,-5::2"``;
+    negative numbers count from the end. Raises ValueError on bad syntax.
+    """
+    from yt_dlp.utils import PlaylistEntries
+
+    picked: dict[int, None] = {}
+    for item in PlaylistEntries.parse_playlist_items(spec):
+        idx = item if isinstance(item, slice) else slice(item, item)
+        step = idx.step or 1
+        if idx.start is None:
+            start = 0 if step > 0 else count - 1
+        else:
+            start = idx.start - 1 if idx.start >= 0 else count + idx.start
+        if idx.stop is None:
+            stop = count if step > 0 else -1
+        else:
+            end = int(min(idx.stop, count)) if idx.stop >= 0 else count + int(idx.stop) + 1
+            stop = end if step > 0 else end - 2
+        start = max(-1, min(start, count))
+        for i in range(start, max(-1, min(stop, count)), step):
+            if 0 <= i < count:
+                picked[i] = None
+    return list(picked)
 
 
 class MetadataExtractor:
@@ -14,11 +89,63 @@ class MetadataExtractor:
         "extract_flat": False,
     }
 
-    def fetch(self, url: str) -> FetchResult:
-        """Single extraction that returns VideoInfo or PlaylistInfo."""
-        opts = {**self._ydl_opts, "extract_flat": "in_playlist"}
+    def __init__(self, cache_ttl: float = 600.0, cache_dir: str | None = None):
+        # Raw info dicts keyed by (url, flat), with the rank of the profile
+        # that produced them. Media URLs inside them expire, so entries are
+        # only reused for cache_ttl seconds.
+        self._cache_ttl = cache_ttl
+        self._cache: dict[tuple[str, bool], tuple[float, dict, int]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_dir = cache_dir
+
+    def cached(self, url: str, profile: ExtractionProfile = "full") -> dict | None:
+        """Return a fresh non-flat info dict for ``url`` covering ``profile``, if one was extracted recently."""
+        return self._lookup(url, False, profile)
+
+    def _lookup(self, url: str, flat: bool, profile: ExtractionProfile) -> dict | None:
+        with self._cache_lock:
+            entry = self._cache.get((url, flat))
+            if entry is None or time.monotonic() - entry[0] > self._cache_ttl or entry[2] < _RANK[profile]:
+                return None
+            return entry[1]
+
+    def extract_raw(self, url: str, flat: bool = False, profile: ExtractionProfile = "full") -> dict | None:
+        """Extract the raw yt-dlp info for ``url``, reusing a recent result at least as complete.
+
+        ``profile`` trims the work yt-dlp does; see PROFILES.
+        """
+        info = self._lookup(url, flat, profile)
+        if info is not None:
+            return info
+        import yt_dlp
+
+        opts = {**self._ydl_opts, **cache_params(self._cache_dir)}
+        if flat:
+            opts["extract_flat"] = "in_playlist"
+        if PROFILES[profile]:
+            opts["extractor_args"] = {"youtube": {k: list(v) for k, v in PROFILES[profile].items()}}
         with yt_dlp.YoutubeDL(opts) as ydl:
             info = ydl.extract_info(url, download=False)
+        if info is None:
+            return None
+        now, rank = time.monotonic(), _RANK[profile]
+        with self._cache_lock:
+            self._cache = {
+                k: v for k, v in self._cache.items() if now - v[0] <= self._cache_ttl
+            }
+            keys = [(url, flat)]
+            # A flat extraction of a single video is a full extraction.
+            if flat and info.get("_type", "video") == "video":
+                keys.append((url, False))
+            for key in keys:
+                # Don't let a cheaper extraction displace a more complete one.
+                if key not in self._cache or self._cache[key][2] <= rank:
+                    self._cache[key] = (now, info, rank)
+        return info
+
+    def fetch(self, url: str) -> FetchResult:
+        """Single extraction that returns VideoInfo or PlaylistInfo."""
+        info = self.extract_raw(url, flat=True)
         if info is None:
             raise ValueError(f"Could not extract info for {url}")
 
@@ -56,9 +183,8 @@ class MetadataExtractor:
             formats=formats,
         )
 
-    def extract_video_info(self, url: str) -> VideoInfo:
-        with yt_dlp.YoutubeDL(self._ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+    def extract_video_info(self, url: str, profile: ExtractionProfile = "full") -> VideoInfo:
+        info = self.extract_raw(url, profile=profile)
         if info is None:
             raise ValueError(f"Could not extract info for {url}")
         formats = self._parse_formats(info.get("formats", []))
@@ -75,9 +201,7 @@ class MetadataExtractor:
         )
 
     def extract_playlist_info(self, url: str) -> PlaylistInfo:
-        opts = {**self._ydl_opts, "extract_flat": "in_playlist"}
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = self.extract_raw(url, flat=True)
         if info is None:
             raise ValueError(f"Could not extract playlist info for {url}")
         videos = []
@@ -100,22 +224,30 @@ class MetadataExtractor:
             videos=videos,
         )
 
-    def extract_formats(self, url: str) -> list[FormatOption]:
-        with yt_dlp.YoutubeDL(self._ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+    def extract_formats(
+        self, url: str, profile: ExtractionProfile = "full", audio_only: bool = False
+    ) -> list[FormatOption]:
+        """Display formats for ``url``; with ``audio_only``, every audio-only format, best first."""
+        info = self.extract_raw(url, profile=profile)
         if info is None:
             return []
+        if audio_only:
+            audio = [f for f in self.parse_all_formats(info.get("formats", [])) if f.has_audio and not f.has_video]
+            return sorted(audio, key=lambda f: f.tbr or 0, reverse=True)
         return self._parse_formats(info.get("formats", []))
 
     def is_playlist(self, url: str) -> bool:
-        opts = {**self._ydl_opts, "extract_flat": "in_playlist"}
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = self.extract_raw(url, flat=True)
         if info is None:
             return False
         return info.get("_type") == "playlist"
 
     def _parse_formats(self, raw_formats: list[dict]) -> list[FormatOption]:
+        return self._deduplicate_formats(self.parse_all_formats(raw_formats))
+
+    @staticmethod
+    def parse_all_formats(raw_formats: list[dict]) -> list[FormatOption]:
+        """Convert every yt-dlp format to a FormatOption, without the display dedupe."""
         formats = []
         seen = set()
         for f in raw_formats:
@@ -150,7 +282,7 @@ class MetadataExtractor:
                     tbr=f.get("tbr"),
                 )
             )
-        return self._deduplicate_formats(formats)
+        return formats
 
     def _deduplicate_formats(self, formats: list[FormatOption]) -> list[FormatOption]:
         """Keep the best format per resolution to reduce clutter."""
@@ -182,3 +314,12 @@ class MetadataExtractor:
             except ValueError:
                 pass
         return 0
+
+
+def __getattr__(name: str):
+    # Imported on first use to keep startup fast; see engine.__getattr__.
+    if name == "yt_dlp":
+        import yt_dlp
+
+        return yt_dlp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,31 +1,115 @@
 from __future__ import annotations
 
 import asyncio
+import os
+import shutil
+import tempfile
 import threading
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
 
-from .engine import DownloadEngine
-from .extractor import MetadataExtractor
+from .diskspace import DiskSpaceGuard, InsufficientDiskSpace, estimate_bytes
+from .engine import CANCEL_POLL_INTERVAL, DEFAULT_TRANSCODE_RATE, DownloadEngine, auto_fragment_settings
+from .errors import friendly_error
+from .extractor import ExtractionProfile, MetadataExtractor, playlist_indices
 from .models import (
+    BatchItem,
+    BatchResult,
+    CacheStats,
+    DiskReservation,
+    DownloadChanges,
     DownloadProgress,
     DownloadRequest,
+    DownloadStatus,
+    EngineOptions,
     FormatOption,
+    GroupProgress,
+    GroupRequest,
     PlaylistInfo,
+    Transcript,
     VideoInfo,
+    WarmupReport,
 )
+from .notify import TERMINAL_STATUSES
+from .planner import FormatPlan, parse_quality, plan_format
+from .streamcache import SharedStreamCache, StreamKey
+from .streaming import AsyncQueueSink, StreamSink
+from .transcript import TranscriptFetcher
+from .warmup import warm_up
+from .ytcache import YtDlpCache
+from .watchdog import StallWatchdog
+
+# Job extractions (yt-dlp network round-trips and player JS) run at once, across all slots.
+MAX_JOB_EXTRACTIONS = 2
 
 
 class DownloadManager:
     """Orchestrates concurrent downloads and metadata extraction."""
 
-    def __init__(self, max_concurrent: int = 3):
+    def __init__(
+        self,
+        max_concurrent: int = 3,
+        postprocess_workers: int | None = None,
+        engine_options: EngineOptions | None = None,
+        watchdog: StallWatchdog | None = None,
+    ):
         self._max_concurrent = max_concurrent
+        engine_options = engine_options or EngineOptions()
+        self._yt_cache = YtDlpCache(engine_options.cache_dir, engine_options.cache_max_bytes)
+        self._engine_options = engine_options.model_copy(update={"cache_dir": str(self._yt_cache.root)})
         self._semaphore = threading.Semaphore(max_concurrent)
-        self._executor = ThreadPoolExecutor(max_workers=10)
-        self._extractor = MetadataExtractor()
+        # Merges and transcodes hold a CPU slot instead of a download slot.
+        self._postprocess_workers = postprocess_workers or os.cpu_count() or 2
+        self._postprocess_semaphore = threading.Semaphore(self._postprocess_workers)
+        self._extract_semaphore = threading.Semaphore(MAX_JOB_EXTRACTIONS)
+        self._executor = ThreadPoolExecutor(max_workers=10 + self._postprocess_workers)
+        self._transcode_threads = max(1, (os.cpu_count() or 2) // self._postprocess_workers)
+        self._transcode_rate = DEFAULT_TRANSCODE_RATE
+        # Smoothed per-job download throughput in bytes/s, for deadline planning.
+        self._bandwidth: float | None = None
+        self._merge_stats = {"merged": 0, "avoided": 0}
+        self._stage_totals: dict[str, float] = {}
+        self._stage_counts: dict[str, int] = {}
+        self._disk_guard = DiskSpaceGuard()
+        self._watchdog = watchdog or StallWatchdog()
+        self._stream_cache = SharedStreamCache(
+            Path(self._engine_options.staging_dir or tempfile.gettempdir()) / f"yoink-shared-{os.getpid()}"
+        )
+        self._extractor = MetadataExtractor(cache_dir=self._engine_options.cache_dir)
+        self._transcripts = TranscriptFetcher(cache_dir=self._engine_options.cache_dir)
         self._engines: dict[str, DownloadEngine] = {}
+        self._callbacks: dict[str, Callable[[DownloadProgress], None]] = {}
+        self._groups: dict[str, list[str]] = {}
+        # Group outputs whose engines wait on the group's extraction, and the
+        # ones among them cancelled meanwhile (skipped at fan-out).
+        self._unstarted: set[str] = set()
+        self._cancelled_unstarted: set[str] = set()
+        self._group_lock = threading.Lock()
         self._progress: dict[str, DownloadProgress] = {}
+        # Change log for list_changes: download_id -> (version, monotonic time)
+        # of its latest update, kept in version order.
+        self._version = 0
+        self._changes: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._changes_lock = threading.Lock()
+        self._running: set[str] = set()
+        self._running_lock = threading.Lock()
+        # Jobs waiting for a download slot, not yet extracted or admitted.
+        # They hold no thread; a finishing job hands its slot to the next one.
+        self._pending: deque[tuple[DownloadEngine, Callable[[], None]]] = deque()
+        self._dispatch_lock = threading.Lock()
+        # Async callers of wait_for_downloads, resolved when their job ends.
+        self._waiters: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._waiters_lock = threading.Lock()
+        self._warmup: WarmupReport | None = None
+        self._executor.submit(self._yt_cache.prune)
+
+    @property
+    def postprocess_workers(self) -> int:
+        return self._postprocess_workers
 
     @property
     def max_concurrent(self) -> int:
@@ -39,16 +123,35 @@ class DownloadManager:
         if diff > 0:
             for _ in range(diff):
                 self._semaphore.release()
+            self._dispatch_pending()
         elif diff < 0:
             for _ in range(-diff):
                 self._semaphore.acquire(blocking=False)
 
+    def warm_up(self, url: str | None = None) -> Future[WarmupReport]:
+        """Warm yt-dlp up in the background so the first request sees steady-state latency.
+
+        Opt-in: call once the UI or server is ready. ``url`` adds a full
+        extraction that primes yt-dlp's cache directory. The report is also
+        kept on ``warmup``.
+        """
+
+        def _run() -> WarmupReport:
+            self._warmup = warm_up(self._extractor, url)
+            return self._warmup
+
+        return self._executor.submit(_run)
+
+    @property
+    def warmup(self) -> WarmupReport | None:
+        return self._warmup
+
     # -- Async metadata wrappers (run sync yt-dlp in thread pool) --
 
-    async def get_video_info(self, url: str) -> VideoInfo:
+    async def get_video_info(self, url: str, profile: ExtractionProfile = "full") -> VideoInfo:
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
-            self._executor, self._extractor.extract_video_info, url
+            self._executor, self._extractor.extract_video_info, url, profile
         )
 
     async def get_playlist_info(self, url: str) -> PlaylistInfo:
@@ -57,12 +160,39 @@ class DownloadManager:
             self._executor, self._extractor.extract_playlist_info, url
         )
 
-    async def get_formats(self, url: str) -> list[FormatOption]:
+    async def get_formats(
+        self, url: str, profile: ExtractionProfile = "full", audio_only: bool = False
+    ) -> list[FormatOption]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._extractor.extract_formats, url, profile, audio_only
+        )
+
+    async def get_transcript(self, url: str, lang: str = "en") -> Transcript:
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
-            self._executor, self._extractor.extract_formats, url
+            self._executor, self._transcripts.fetch, url, lang
         )
 
+    async def plan_format(self, url: str, quality: str) -> FormatPlan:
+        """Resolve a quality request ("720p under 50MB") to concrete format ids."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._plan_format, url, quality)
+
+    def _plan_format(self, url: str, quality: str) -> FormatPlan:
+        info = self._extractor.cached(url)
+        if info is None:
+            with self._extract_semaphore:
+                info = self._extractor.extract_raw(url)
+        if info is None:
+            raise ValueError(f"Could not extract info for {url}")
+        formats = self._extractor.parse_all_formats(info.get("formats") or [])
+        return plan_format(formats, parse_quality(quality), info.get("duration"), self._bandwidth)
+
+    @property
+    def bandwidth(self) -> float | None:
+        return self._bandwidth
+
     async def is_playlist(self, url: str) -> bool:
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
@@ -75,26 +205,536 @@ class DownloadManager:
         self,
         request: DownloadRequest,
         callback: Callable[[DownloadProgress], None] | None = None,
+        sink: StreamSink | None = None,
     ) -> str:
+        engine = self._create_engine(request, callback, sink)
+        self._executor.submit(self._run_with_semaphore, engine)
+        return request.download_id
+
+    async def start_batch(
+        self,
+        items: list[BatchItem],
+        defaults: DownloadRequest,
+        callback: Callable[[DownloadProgress], None] | None = None,
+        reserve: Callable[[int], None] | None = None,
+    ) -> list[BatchResult]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._start_batch, items, defaults, callback, reserve
+        )
+
+    def _start_batch(
+        self,
+        items: list[BatchItem],
+        defaults: DownloadRequest,
+        callback: Callable[[DownloadProgress], None] | None = None,
+        reserve: Callable[[int], None] | None = None,
+    ) -> list[BatchResult]:
+        """Queue every item in one go, one result per job or failed item.
+
+        Playlist items expand to their selected entries here, so callers
+        don't have to list them. ``defaults`` supplies unset fields.
+        ``reserve`` gets the expanded job count before anything is queued;
+        if it raises, nothing is.
+        """
+        results: list[BatchResult] = []
+        jobs: list[tuple[DownloadRequest, str | None]] = []
+        for item in items:
+            try:
+                urls = self._batch_urls(item)
+            except Exception as e:
+                results.append(BatchResult(url=item.url, error=friendly_error(str(e))))
+                continue
+            for url in urls:
+                fields = item.model_dump(exclude={"url", "playlist_items", "quality"}, exclude_none=True)
+                try:
+                    request = DownloadRequest(**{
+                        **defaults.model_dump(exclude={"download_id"}),
+                        **fields,
+                        "url": url,
+                    })
+                except ValueError as e:
+                    results.append(BatchResult(url=url, error=friendly_error(str(e))))
+                    continue
+                jobs.append((request, item.quality))
+                results.append(BatchResult(url=url, download_id=request.download_id))
+        if reserve is not None:
+            reserve(len(jobs))
+        for request, quality in jobs:
+            engine = self._create_engine(request, callback)
+            self._executor.submit(self._run_batch_job, engine, quality)
+        return results
+
+    def _batch_urls(self, item: BatchItem) -> list[str]:
+        # Only explicit playlist URLs expand; watch?v=...&list=... means the one video.
+        if item.playlist_items is None and urlparse(item.url).path.rstrip("/") != "/playlist":
+            return [item.url]
+        playlist = self._extractor.extract_playlist_info(item.url)
+        entries = [v for v in playlist.videos if v.url]
+        if item.playlist_items is None:
+            return [v.url for v in entries]
+        return [entries[i].url for i in playlist_indices(item.playlist_items, len(entries))]
+
+    def _run_batch_job(self, engine: DownloadEngine, quality: str | None) -> None:
+        if quality:
+            # Planned on the worker so one slow extraction doesn't hold up the batch.
+            try:
+                engine.request.format_string = self._plan_format(engine.request.url, quality).format_string
+            except Exception as e:
+                engine.fail(friendly_error(str(e)))
+                return
+        self._run_with_semaphore(engine)
+
+    def select_downloads(
+        self,
+        ids: list[str] | None = None,
+        statuses: list[DownloadStatus] | None = None,
+        url_contains: str | None = None,
+        error_contains: str | None = None,
+    ) -> list[str]:
+        """Ids of the known downloads matching every given filter. Group ids expand."""
+        candidates = self.expand_ids(ids) if ids is not None else list(self._progress)
+        selected = []
+        for download_id in candidates:
+            progress = self._progress[download_id]
+            engine = self._engines.get(download_id)
+            if statuses is not None and progress.status not in statuses:
+                continue
+            if url_contains and (engine is None or url_contains not in engine.request.url):
+                continue
+            if error_contains and error_contains.lower() not in (progress.error or "").lower():
+                continue
+            selected.append(download_id)
+        return selected
+
+    def retry_download(self, download_id: str) -> bool:
+        """Start a failed or cancelled job again under the same id. False if it can't be retried."""
+        engine = self._engines.get(download_id)
+        progress = self._progress.get(download_id)
+        if engine is None or progress is None:
+            return False
+        if progress.status not in (DownloadStatus.ERROR, DownloadStatus.CANCELLED):
+            return False
+        self.start_download(engine.request.model_copy(), callback=self._callbacks.get(download_id))
+        return True
+
+    def _create_engine(
+        self,
+        request: DownloadRequest,
+        callback: Callable[[DownloadProgress], None] | None = None,
+        sink: StreamSink | None = None,
+    ) -> DownloadEngine:
         download_id = request.download_id
 
         def _on_progress(progress: DownloadProgress) -> None:
-            self._progress[download_id] = progress
+            self._publish(progress)
+            self._disk_guard.update(download_id, progress.downloaded_bytes)
+            if progress.status == DownloadStatus.FINISHED:
+                self._record_stages(progress, engine.media_duration)
+                self._record_merge(engine, progress)
             if callback:
                 callback(progress)
 
-        engine = DownloadEngine(request, callback=_on_progress)
+        engine = DownloadEngine(
+            request,
+            callback=_on_progress,
+            postprocess_slot=self._postprocess_semaphore,
+            sink=sink,
+            options=self._engine_options,
+        )
+        engine.transcode_threads = self._transcode_threads
+        engine.cached_info = self._extractor.cached(request.url)
+        engine.stream_cache = self._stream_cache
         self._engines[download_id] = engine
-        self._progress[download_id] = DownloadProgress(download_id=download_id)
-        self._executor.submit(self._run_with_semaphore, engine)
-        return download_id
+        if callback is not None:
+            self._callbacks[download_id] = callback
+        self._publish(DownloadProgress(download_id=download_id))
+        return engine
+
+    def start_group(
+        self,
+        request: GroupRequest,
+        callback: Callable[[DownloadProgress], None] | None = None,
+    ) -> str:
+        """Start every output of ``request`` from one extraction. Track it with get_group_progress."""
+        children = request.child_requests()
+        self._groups[request.group_id] = [c.download_id for c in children]
+        with self._group_lock:
+            self._unstarted.update(self._groups[request.group_id])
+        for child in children:
+            self._publish(DownloadProgress(download_id=child.download_id))
+        self._executor.submit(self._run_group, request, children, callback)
+        return request.group_id
 
-    def _run_with_semaphore(self, engine: DownloadEngine) -> None:
-        self._semaphore.acquire()
+    def _run_group(
+        self,
+        request: GroupRequest,
+        children: list[DownloadRequest],
+        callback: Callable[[DownloadProgress], None] | None,
+    ) -> None:
         try:
-            engine.run()
+            with self._extract_semaphore:
+                info = self._extractor.extract_raw(request.url)
+            if info is None:
+                raise ValueError(f"Could not extract info for {request.url}")
+            for child, target in zip(children, request.outputs):
+                if target.kind == "video" and target.quality and not target.format_string:
+                    child.format_string = self._plan_format(request.url, target.quality).format_string
+        except Exception as e:
+            with self._group_lock:
+                failed = self._claim_unstarted(children)
+            for child in failed:
+                self._publish(DownloadProgress(
+                    download_id=child.download_id,
+                    status=DownloadStatus.ERROR,
+                    error=friendly_error(str(e)),
+                ))
+            return
+
+        with self._group_lock:
+            # Under the lock so a cancel either finds the engine or marks the output.
+            engines = [self._create_engine(child, callback) for child in self._claim_unstarted(children)]
+        # Streams more than one output needs stay cached until the whole group is done.
+        counts: dict[StreamKey, int] = {}
+        for engine in engines:
+            for key in set(self._stream_keys(engine)):
+                counts[key] = counts.get(key, 0) + 1
+        held = [key for key, n in counts.items() if n > 1]
+        for key in held:
+            self._stream_cache.register(key)
+
+        remaining = [len(engines)]
+        lock = threading.Lock()
+
+        def _child_done() -> None:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for key in held:
+                    self._stream_cache.unregister(key)
+
+        for engine in engines:
+            self._executor.submit(self._run_with_semaphore, engine, _child_done)
+
+    def _claim_unstarted(self, children: list[DownloadRequest]) -> list[DownloadRequest]:
+        """Take ``children`` off the unstarted set; returns those not cancelled meanwhile.
+
+        Call with ``_group_lock`` held.
+        """
+        ids = {c.download_id for c in children}
+        cancelled = self._cancelled_unstarted & ids
+        self._unstarted -= ids
+        self._cancelled_unstarted -= ids
+        return [c for c in children if c.download_id not in cancelled]
+
+    def get_group_progress(self, group_id: str) -> GroupProgress | None:
+        ids = self._groups.get(group_id)
+        if ids is None:
+            return None
+        outputs = [self._progress[i] for i in ids if i in self._progress]
+        statuses = {p.status for p in outputs}
+        if statuses & {DownloadStatus.DOWNLOADING, DownloadStatus.MERGING}:
+            status = DownloadStatus.DOWNLOADING
+        elif DownloadStatus.QUEUED in statuses:
+            status = DownloadStatus.QUEUED
+        elif DownloadStatus.ERROR in statuses:
+            status = DownloadStatus.ERROR
+        elif statuses == {DownloadStatus.CANCELLED}:
+            status = DownloadStatus.CANCELLED
+        else:
+            status = DownloadStatus.FINISHED
+        return GroupProgress(
+            group_id=group_id,
+            title=next((p.title for p in outputs if p.title), ""),
+            status=status,
+            percent=round(sum(p.percent for p in outputs) / len(outputs), 1) if outputs else 0.0,
+            outputs=outputs,
+        )
+
+    def open_stream(
+        self,
+        request: DownloadRequest,
+        callback: Callable[[DownloadProgress], None] | None = None,
+        max_chunks: int = 16,
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """Start a streaming download and return its id and an async byte iterator.
+
+        Must be called from a running event loop. Leaving the iterator early
+        cancels the download.
+        """
+        sink = AsyncQueueSink(asyncio.get_running_loop(), max_chunks=max_chunks)
+        request = request.model_copy(update={"output_mode": "stream"})
+        download_id = self.start_download(request, callback=callback, sink=sink)
+
+        async def _chunks() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in sink.chunks():
+                    yield chunk
+            finally:
+                self.cancel_download(download_id)
+
+        return download_id, _chunks()
+
+    def _run_with_semaphore(
+        self, engine: DownloadEngine, on_done: Callable[[], None] | None = None
+    ) -> None:
+        # Extraction and the disk check wait for a slot too, so a queued job
+        # holds no thread until it can actually start.
+        on_done = on_done or _nothing
+        if self._take_slot(engine, on_done):
+            self._run_slotted(engine, on_done)
+
+    def _take_slot(self, engine: DownloadEngine, on_done: Callable[[], None]) -> bool:
+        """Take a download slot, or park the job in the pending queue and return False.
+
+        ``on_done`` runs once the job is over, including when it is dropped while parked.
+        """
+        with self._dispatch_lock:
+            if self._semaphore.acquire(blocking=False):
+                return True
+            self._pending.append((engine, on_done))
+            return False
+
+    def _dispatch_pending(self) -> None:
+        """Start parked jobs while slots are free."""
+        with self._dispatch_lock:
+            while self._pending and self._semaphore.acquire(blocking=False):
+                engine, on_done = self._pending.popleft()
+                try:
+                    self._executor.submit(self._run_slotted, engine, on_done)
+                except RuntimeError:  # shutting down
+                    self._pending.appendleft((engine, on_done))
+                    self._semaphore.release()
+                    return
+
+    def _unpark(self, engine: DownloadEngine) -> Callable[[], None] | None:
+        with self._dispatch_lock:
+            for entry in self._pending:
+                if entry[0] is engine:
+                    self._pending.remove(entry)
+                    return entry[1]
+        return None
+
+    def _run_slotted(self, engine: DownloadEngine, on_done: Callable[[], None]) -> None:
+        """Admit and run a job that holds a download slot."""
+        download_id = engine.request.download_id
+        shared: list[StreamKey] = []
+        admitted = False
+        try:
+            try:
+                self._prepare(engine)
+                shared.extend(self._register_shared_streams(engine))
+                admitted = self._admit(engine)
+            except InsufficientDiskSpace as e:
+                engine.fail(str(e))
+            except Exception as e:
+                # Anything else would vanish into the executor and leave the job queued forever.
+                engine.fail(friendly_error(str(e)))
+            else:
+                if not admitted:
+                    engine.run()  # reports the cancellation
+            if admitted:
+                self._run_admitted(engine)
+        finally:
+            if not admitted:
+                self._semaphore.release()
+                self._dispatch_pending()
+            self._disk_guard.release(download_id)
+            for key in shared:
+                self._stream_cache.unregister(key)
+            on_done()
+
+    def _prepare(self, engine: DownloadEngine) -> None:
+        """Extract the job's metadata while holding one of the few extraction slots.
+
+        Gives up waiting if the job is cancelled; admission then reports it.
+        """
+        while not self._extract_semaphore.acquire(timeout=CANCEL_POLL_INTERVAL):
+            if engine.is_cancelled:
+                return
+        try:
+            engine.prepare()
         finally:
+            self._extract_semaphore.release()
+
+    def _register_shared_streams(self, engine: DownloadEngine) -> list[StreamKey]:
+        """Record the streams a job will fetch, so jobs for the same video can share them."""
+        keys = self._stream_keys(engine)
+        for key in keys:
+            self._stream_cache.register(key)
+        return keys
+
+    @staticmethod
+    def _stream_keys(engine: DownloadEngine) -> list[StreamKey]:
+        request = engine.request
+        if request.output_mode != "file" or request.is_clip or request.subtitles_only:
+            return []
+        info = engine.prepare() or {}
+        if not info.get("id"):
+            return []
+        requested = info.get("requested_formats") or [info]
+        return [(info["id"], f["format_id"]) for f in requested if f.get("format_id")]
+
+    def _admit(self, engine: DownloadEngine) -> bool:
+        """Extract the job's metadata and wait until its estimated size fits on disk."""
+        info = engine.prepare() or {}
+        request = engine.request
+        if request.output_mode == "stream":
+            paths = [self._engine_options.staging_dir or tempfile.gettempdir()]
+        else:
+            paths = [self._engine_options.staging_dir or request.output_dir, request.output_dir]
+        if request.subtitles_only:
+            needed = 0  # a few kilobytes of text
+        else:
+            needed = int(estimate_bytes(info, merge_overhead=not request.is_clip) * engine.clip_fraction)
+        return self._disk_guard.reserve(
+            request.download_id,
+            paths,
+            needed,
+            cancelled=lambda: engine.is_cancelled,
+        )
+
+    def _run_admitted(self, engine: DownloadEngine) -> None:
+        """Run a job that holds a download slot."""
+        download_id = engine.request.download_id
+        with self._running_lock:
+            self._running.add(download_id)
+            engine.auto_fragments, engine.auto_chunk_size = auto_fragment_settings(
+                len(self._running), self._max_concurrent
+            )
+            engine.transcode_rate = self._transcode_rate
+
+        def _release_slot() -> None:
+            # Called by the engine when post-processing starts, and again on exit.
+            with self._running_lock:
+                if download_id not in self._running:
+                    return
+                self._running.discard(download_id)
             self._semaphore.release()
+            self._dispatch_pending()
+
+        engine.on_downloaded = _release_slot
+        # Streams can't be restarted mid-pipe and clips are cut by ffmpeg without progress reports.
+        watched = engine.request.output_mode == "file" and not engine.request.is_clip
+        if watched:
+            self._watchdog.start()
+            self._watchdog.watch(engine)
+        try:
+            engine.run()
+        finally:
+            if watched:
+                self._watchdog.unwatch(download_id)
+            _release_slot()
+
+    def _record_stages(self, progress: DownloadProgress, duration: float | None) -> None:
+        with self._running_lock:
+            for stage, seconds in progress.stage_timings.items():
+                self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + seconds
+                self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+            transcode = progress.stage_timings.get("transcode")
+            if transcode and duration:
+                # Smooth the per-second encode cost so one outlier doesn't skew estimates.
+                self._transcode_rate = 0.7 * self._transcode_rate + 0.3 * transcode / duration
+            download = progress.stage_timings.get("download")
+            if download and progress.downloaded_bytes:
+                rate = progress.downloaded_bytes / download
+                self._bandwidth = rate if self._bandwidth is None else 0.7 * self._bandwidth + 0.3 * rate
+
+    def _record_merge(self, engine: DownloadEngine, progress: DownloadProgress) -> None:
+        with self._running_lock:
+            if progress.merge_avoided:
+                self._merge_stats["avoided"] += 1
+            elif len((engine.prepare() or {}).get("requested_formats") or []) > 1:
+                self._merge_stats["merged"] += 1
+
+    def get_merge_stats(self) -> dict[str, int]:
+        """How many finished downloads merged streams vs. used an equivalent muxed format."""
+        with self._running_lock:
+            return dict(self._merge_stats)
+
+    def get_stage_summary(self) -> dict[str, dict[str, float]]:
+        """Total and mean seconds per pipeline stage across finished downloads."""
+        with self._running_lock:
+            return {
+                stage: {
+                    "total": round(total, 3),
+                    "mean": round(total / self._stage_counts[stage], 3),
+                    "jobs": self._stage_counts[stage],
+                }
+                for stage, total in self._stage_totals.items()
+            }
+
+    def get_cache_stats(self) -> CacheStats:
+        return self._yt_cache.stats()
+
+    def get_disk_reservations(self) -> list[DiskReservation]:
+        """Disk space promised to admitted jobs that hasn't been written yet."""
+        return self._disk_guard.reservations()
+
+    def expand_ids(self, ids: list[str]) -> list[str]:
+        """The download ids behind ``ids``: groups expand to their outputs, unknown ids drop out."""
+        expanded = [i for d in ids for i in self._groups.get(d, [d])]
+        return [i for i in dict.fromkeys(expanded) if i in self._progress]
+
+    def _publish(self, progress: DownloadProgress) -> None:
+        download_id = progress.download_id
+        with self._changes_lock:
+            self._progress[download_id] = progress
+            self._version += 1
+            self._changes[download_id] = (self._version, time.monotonic())
+            self._changes.move_to_end(download_id)
+        if progress.status not in TERMINAL_STATUSES:
+            return
+        with self._waiters_lock:
+            waiters = self._waiters.pop(progress.download_id, [])
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, progress)
+            except RuntimeError:
+                pass  # the waiting loop is gone
+
+    async def wait_for_downloads(
+        self,
+        download_ids: list[str],
+        until: str = "any",
+        timeout: float | None = None,
+    ) -> dict[str, DownloadProgress]:
+        """Wait until any (or all) of the jobs end; returns the final progress of those that did.
+
+        Group ids stand for all of their outputs. Unknown ids are ignored.
+        Nothing blocks a thread while waiting.
+        """
+        if until not in ("any", "all"):
+            raise ValueError('until must be "any" or "all"')
+        loop = asyncio.get_running_loop()
+        futures: dict[str, asyncio.Future] = {}
+        with self._waiters_lock:
+            for download_id in self.expand_ids(download_ids):
+                progress = self._progress[download_id]
+                future = loop.create_future()
+                if progress.status in TERMINAL_STATUSES:
+                    future.set_result(progress)
+                else:
+                    self._waiters.setdefault(download_id, []).append((loop, future))
+                futures[download_id] = future
+        if not futures:
+            return {}
+        try:
+            await asyncio.wait(
+                futures.values(),
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED if until == "any" else asyncio.ALL_COMPLETED,
+            )
+        finally:
+            with self._waiters_lock:
+                for download_id, future in futures.items():
+                    waiters = self._waiters.get(download_id)
+                    if waiters and (loop, future) in waiters:
+                        waiters.remove((loop, future))
+                        if not waiters:
+                            del self._waiters[download_id]
+        return {i: f.result() for i, f in futures.items() if f.done() and not f.cancelled()}
 
     def get_progress(self, download_id: str) -> DownloadProgress | None:
         return self._progress.get(download_id)
@@ -102,14 +742,69 @@ class DownloadManager:
     def get_all_progress(self) -> list[DownloadProgress]:
         return list(self._progress.values())
 
+    def list_changes(
+        self,
+        since: int = 0,
+        statuses: list[DownloadStatus] | None = None,
+        max_age: float | None = None,
+    ) -> DownloadChanges:
+        """Jobs updated after cursor ``since`` (and within ``max_age`` seconds), oldest first.
+
+        Pass the returned cursor as ``since`` next time to get only what
+        changed in between. Walks the change log from the newest end, so the
+        cost is proportional to the number of changes, not of jobs.
+        """
+        now = time.monotonic()
+        changed = []
+        with self._changes_lock:
+            cursor = self._version
+            for download_id, (version, at) in reversed(self._changes.items()):
+                if version <= since or (max_age is not None and now - at > max_age):
+                    break
+                progress = self._progress[download_id]
+                if statuses is None or progress.status in statuses:
+                    changed.append(progress)
+        changed.reverse()
+        return DownloadChanges(cursor=cursor, downloads=changed)
+
     def cancel_download(self, download_id: str) -> bool:
+        if download_id in self._groups:
+            for child_id in self._groups[download_id]:
+                self.cancel_download(child_id)
+            return True
+        with self._group_lock:
+            if download_id in self._unstarted:
+                self._cancelled_unstarted.add(download_id)
+                self._publish(DownloadProgress(download_id=download_id, status=DownloadStatus.CANCELLED))
+                return True
         engine = self._engines.get(download_id)
         if engine is None:
             return False
         engine.cancel()
+        self._disk_guard.wake()
+        on_done = self._unpark(engine)
+        if on_done is not None:
+            engine.drop()
+            on_done()
         return True
 
     def shutdown(self) -> None:
         for engine in self._engines.values():
             engine.cancel()
+        with self._dispatch_lock:
+            pending, self._pending = list(self._pending), deque()
+        for engine, on_done in pending:
+            engine.drop()
+            on_done()
         self._executor.shutdown(wait=False)
+        self._watchdog.stop()
+        shutil.rmtree(self._stream_cache.root, ignore_errors=True)
+
+
+def _nothing() -> None:
+    pass
+
+
+def _resolve(future: asyncio.Future, progress: DownloadProgress) -> None:
+    if not future.done():
+        future.set_result(progress)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import re
 import uuid
 from enum import Enum
 from pathlib import Path
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class DownloadStatus(str, Enum):
@@ -84,6 +86,32 @@ class PlaylistInfo(BaseModel):
 FetchResult = VideoInfo | PlaylistInfo
 
 
+class TranscriptSegment(BaseModel):
+    start: float
+    end: float
+    text: str
+
+
+class Transcript(BaseModel):
+    video_id: str
+    lang: str
+    automatic: bool = False
+    segments: list[TranscriptSegment] = Field(default_factory=list)
+
+
+class TranscriptChunk(BaseModel):
+    """One page of a transcript. Pass ``next_cursor`` back to get the following page."""
+
+    video_id: str
+    lang: str
+    automatic: bool = False
+    text: str = ""
+    segments: list[TranscriptSegment] | None = None
+    cursor: int = 0
+    next_cursor: int | None = None
+    total_segments: int = 0
+
+
 class DownloadProgress(BaseModel):
     download_id: str
     status: DownloadStatus = DownloadStatus.QUEUED
@@ -95,6 +123,15 @@ class DownloadProgress(BaseModel):
     percent: float = 0.0
     error: str | None = None
     output_path: str | None = None
+    stage_timings: dict[str, float] = Field(default_factory=dict)
+    disk_throughput: float | None = None
+    store_hit: bool = False
+    # A progressive (muxed) format replaced a video+audio pair, so no merge ran.
+    merge_avoided: bool = False
+    # Watchdog: times the transfer was flagged as stalled/throttled, and restarted.
+    stall_count: int = 0
+    restart_count: int = 0
+    stall_reason: str | None = None
 
     @property
     def size_display(self) -> str:
@@ -127,6 +164,80 @@ class DownloadProgress(BaseModel):
         return f"{s}s"
 
 
+class DiskReservation(BaseModel):
+    download_id: str
+    path: str
+    device: int
+    reserved_bytes: int
+    written_bytes: int = 0
+
+    @property
+    def outstanding_bytes(self) -> int:
+        return max(0, self.reserved_bytes - self.written_bytes)
+
+
+class WarmupReport(BaseModel):
+    """Outcome of DownloadManager.warm_up."""
+
+    # Step name -> seconds taken, in the order the steps ran.
+    steps: dict[str, float] = Field(default_factory=dict)
+    errors: dict[str, str] = Field(default_factory=dict)
+    total_seconds: float = 0.0
+
+
+class CacheStats(BaseModel):
+    """The shared yt-dlp cache directory and how often this process hit it."""
+
+    path: str
+    size_bytes: int = 0
+    max_bytes: int = 0
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    pruned: int = 0
+    # Per yt-dlp cache section (e.g. "youtube-sigfuncs"): hits, misses, stores.
+    sections: dict[str, dict[str, int]] = Field(default_factory=dict)
+
+
+class QuotaLimits(BaseModel):
+    """Per-client limits for a shared server. None disables a limit."""
+
+    max_queued_jobs: int | None = Field(default=100, ge=1)
+    max_bytes_per_hour: int | None = Field(default=50 * 1024**3, ge=1)
+    metadata_calls_per_minute: int | None = Field(default=120, ge=1)
+    # Past this many unfinished jobs server-wide, new work is refused for everyone.
+    high_water: int | None = Field(default=500, ge=1)
+
+
+class QuotaUsage(BaseModel):
+    queued_jobs: int = 0
+    bytes_last_hour: int = 0
+    metadata_calls_last_minute: int = 0
+    server_unfinished_jobs: int = 0
+    limits: QuotaLimits = Field(default_factory=QuotaLimits)
+
+
+class EngineOptions(BaseModel):
+    """Process-wide I/O settings shared by every download engine."""
+
+    # Partial files are written under staging_dir (e.g. tmpfs or local NVMe)
+    # and moved atomically into output_dir once complete.
+    staging_dir: str | None = None
+    buffer_size: int | None = Field(default=None, ge=1024)
+    preallocate: bool = True
+    # Content-addressed store: repeat downloads of a (video, format) become links.
+    store_dir: str | None = None
+    # Use a muxed format instead of merging when one is at least as good.
+    avoid_merges: bool = True
+    # Bounds how long a dead connection can block before yt-dlp retries it.
+    socket_timeout: float | None = Field(default=20.0, gt=0)
+    # yt-dlp's cache (player JS signature functions), shared across processes.
+    # The manager fills in the default location when this is unset.
+    cache_dir: str | None = None
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=0)
+
+
 class DownloadRequest(BaseModel):
     url: str
     format_string: str = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
@@ -136,4 +247,143 @@ class DownloadRequest(BaseModel):
     speed_limit: int | None = None
     download_subtitles: bool = False
     subtitle_lang: str = "en"
+    # Write only the subtitle files, no media.
+    subtitles_only: bool = False
     convert_to_mp3: bool = False
+    # Audio codecs the client can use as-is; a matching native stream is
+    # remuxed instead of being re-encoded to MP3.
+    accept_audio_codecs: list[Literal["m4a", "opus", "mp3"]] = Field(default_factory=list)
+    # "stream" sends the media bytes to stream_fd, the pipe at stream_path, or a
+    # consumer from DownloadManager.open_stream instead of writing to output_dir.
+    output_mode: Literal["file", "stream"] = "file"
+    stream_fd: int | None = None
+    stream_path: str | None = None
+    # None picks a value from the manager's load; http_chunk_size=0 disables chunking.
+    concurrent_fragments: int | None = Field(default=None, ge=1, le=32)
+    http_chunk_size: int | None = Field(default=None, ge=0)
+    # Clip downloads: only the fragments covering this time range (seconds or
+    # "HH:MM:SS") and/or the chapters whose titles match these regexes are fetched.
+    start_time: float | None = Field(default=None, ge=0)
+    end_time: float | None = Field(default=None, gt=0)
+    chapters: list[str] = Field(default_factory=list)
+
+    @property
+    def is_clip(self) -> bool:
+        return self.start_time is not None or self.end_time is not None or bool(self.chapters)
+
+    @field_validator("start_time", "end_time", mode="before")
+    @classmethod
+    def _parse_timestamp(cls, value):
+        if isinstance(value, str) and ":" in value:
+            parts = value.strip().split(":")
+            if len(parts) > 3:
+                raise ValueError(f"Invalid timestamp: {value}")
+            seconds = 0.0
+            for part in parts:
+                seconds = seconds * 60 + float(part)
+            return seconds
+        return value
+
+    @field_validator("chapters")
+    @classmethod
+    def _compile_chapters(cls, value: list[str]) -> list[str]:
+        for pattern in value:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid chapter pattern {pattern!r}: {e}") from None
+        return value
+
+    @model_validator(mode="after")
+    def _check_clip(self) -> DownloadRequest:
+        if self.start_time is not None and self.end_time is not None and self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        if self.is_clip and self.output_mode == "stream":
+            raise ValueError("Clip downloads can't be streamed")
+        return self
+
+
+class OutputTarget(BaseModel):
+    """One output of a GroupRequest: a video file, an audio file or subtitles."""
+
+    kind: Literal["video", "audio", "subtitles"] = "video"
+    # Video: an explicit yt-dlp format string, or a planner quality such as "720p under 50MB".
+    format_string: str | None = None
+    quality: str | None = None
+    # Audio: codecs usable as-is; anything else is encoded to MP3.
+    accept_audio_codecs: list[Literal["m4a", "opus", "mp3"]] = Field(default_factory=list)
+    subtitle_lang: str = "en"
+
+
+class GroupRequest(BaseModel):
+    """Several outputs of one video from a single extraction."""
+
+    url: str
+    outputs: list[OutputTarget] = Field(min_length=1)
+    output_dir: str = str(Path.home() / "Downloads")
+    group_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:12])
+    speed_limit: int | None = None
+
+    def child_requests(self) -> list[DownloadRequest]:
+        has_video = any(o.kind == "video" for o in self.outputs)
+        children = []
+        for i, target in enumerate(self.outputs):
+            fields: dict = {
+                "url": self.url,
+                "output_dir": self.output_dir,
+                "download_id": f"{self.group_id}-{i}",
+                "speed_limit": self.speed_limit,
+            }
+            if target.kind == "video":
+                if target.format_string:
+                    fields["format_string"] = target.format_string
+            elif target.kind == "audio":
+                fields["convert_to_mp3"] = True
+                fields["accept_audio_codecs"] = target.accept_audio_codecs
+                if has_video:
+                    # The audio source may share the video's extension (webm).
+                    fields["output_template"] = "%(title)s (audio).%(ext)s"
+            else:
+                fields["download_subtitles"] = True
+                fields["subtitles_only"] = True
+                fields["subtitle_lang"] = target.subtitle_lang
+            children.append(DownloadRequest(**fields))
+        return children
+
+
+class DownloadChanges(BaseModel):
+    # Pass back as ``since`` to get only later changes.
+    cursor: int
+    downloads: list[DownloadProgress] = Field(default_factory=list)
+
+
+class GroupProgress(BaseModel):
+    group_id: str
+    title: str = ""
+    status: DownloadStatus = DownloadStatus.QUEUED
+    percent: float = 0.0
+    outputs: list[DownloadProgress] = Field(default_factory=list)
+
+
+class BatchItem(BaseModel):
+    """One entry of a bulk start: a video, or playlist entries picked by ``playlist_items``.
+
+    Unset fields fall back to the batch's defaults.
+    """
+
+    url: str
+    # yt-dlp --playlist-items syntax, e.g. "1-10,15,-3:" (1-based, inclusive).
+    playlist_items: str | None = None
+    format_string: str | None = None
+    quality: str | None = None
+    output_dir: str | None = None
+    convert_to_mp3: bool = False
+    accept_audio_codecs: list[Literal["m4a", "opus", "mp3"]] = Field(default_factory=list)
+    start_time: float | str | None = None
+    end_time: float | str | None = None
+
+
+class BatchResult(BaseModel):
+    url: str
+    download_id: str | None = None
+    error: str | None = None
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from .models import DownloadProgress, DownloadStatus
+
+TERMINAL_STATUSES = frozenset({DownloadStatus.FINISHED, DownloadStatus.ERROR, DownloadStatus.CANCELLED})
+
+# Minimum seconds between pushed updates that don't change the status.
+NOTIFY_INTERVAL = 1.0
+
+
+def progress_message(progress: DownloadProgress) -> str:
+    parts = [progress.status.value, f"{progress.percent:.1f}%"]
+    if progress.speed_display:
+        parts.append(progress.speed_display)
+    if progress.eta_display:
+        parts.append(f"ETA {progress.eta_display}")
+    if progress.error:
+        parts.append(progress.error)
+    return " ".join(parts)
+
+
+async def push_progress(
+    updates: asyncio.Queue[DownloadProgress],
+    send: Callable[[DownloadProgress], Awaitable[None]],
+    interval: float = NOTIFY_INTERVAL,
+) -> None:
+    """Forward progress from ``updates`` to ``send`` until the job reaches a terminal state.
+
+    Status changes go out immediately. Other updates are coalesced to at most
+    one per ``interval``, always delivering the latest. Percent never goes
+    backwards, as MCP requires of progress notifications.
+    """
+    loop = asyncio.get_running_loop()
+    last_sent = float("-inf")
+    last_status: DownloadStatus | None = None
+    percent = 0.0
+    pending: DownloadProgress | None = None
+    while True:
+        timeout = None if pending is None else max(0.0, last_sent + interval - loop.time())
+        try:
+            pending = await asyncio.wait_for(updates.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        while not updates.empty():
+            pending = updates.get_nowait()
+        if pending is None:
+            continue
+        terminal = pending.status in TERMINAL_STATUSES
+        if not terminal and pending.status == last_status and loop.time() - last_sent < interval:
+            continue
+        percent = max(percent, pending.percent)
+        await send(pending.model_copy(update={"percent": percent}))
+        last_sent, last_status, pending = loop.time(), pending.status, None
+        if terminal:
+            return
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+
+from pydantic import BaseModel
+
+from .models import FormatOption
+
+# Codec names a caller may ask for, mapped to yt-dlp vcodec prefixes.
+_CODECS = {
+    "h264": "avc1",
+    "avc": "avc1",
+    "avc1": "avc1",
+    "h265": "hvc1",
+    "hevc": "hvc1",
+    "vp9": "vp9",
+    "vp09": "vp9",
+    "av1": "av01",
+    "av01": "av01",
+}
+_SIZE_UNITS = {"k": 1024, "m": 1024**2, "g": 1024**3}
+_TIME_UNITS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hr": 3600}
+
+# Video/audio containers that merge without falling back to MKV.
+_COMPATIBLE = {("mp4", "m4a"), ("webm", "webm")}
+
+# An optional frame rate may follow, as in "720p60".
+_HEIGHT = re.compile(r"\b(\d{3,4})p(?:\d{2,3})?\b")
+# The trailing "b" is optional: "50M" is a size.
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*([kmg])(i?b)?\b")
+# Words after which a bare "m" means minutes ("within 2m").
+_DEADLINE_WORDS = ("within", "in")
+_TIME = re.compile(r"(\d+(?:\.\d+)?)\s*(sec|min|hr|s|m|h)\b")
+
+
+class QualitySpec(BaseModel):
+    max_bytes: int | None = None
+    # Seconds the download may take at the measured bandwidth.
+    deadline: float | None = None
+    max_height: int | None = None
+    vcodec: str | None = None
+    audio_only: bool = False
+
+
+class FormatPlan(BaseModel):
+    format_string: str
+    estimated_bytes: int | None = None
+    height: int | None = None
+    # False when nothing met the budget and the smallest option was chosen.
+    fits: bool = True
+    reason: str = ""
+
+
+def parse_quality(text: str) -> QualitySpec:
+    """Parse a free-form quality request like ``"720p h264 under 50MB within 2m"``.
+
+    Sizes are read as budgets, durations as deadlines, ``NNNp`` as a
+    resolution cap; ``audio`` asks for audio only. A bare ``m`` is a size
+    ("under 50M") unless it follows "within" or "in".
+    """
+    text = text.lower()
+    spec = QualitySpec()
+    for m in _SIZE.finditer(text):
+        before = text[: m.start()].split()
+        if m.group(2) == "m" and not m.group(3) and before and before[-1] in _DEADLINE_WORDS:
+            continue
+        spec.max_bytes = int(float(m.group(1)) * _SIZE_UNITS[m.group(2)])
+        text = text[: m.start()] + text[m.end():]
+        break
+    if m := _TIME.search(text):
+        spec.deadline = float(m.group(1)) * _TIME_UNITS[m.group(2)]
+    if m := _HEIGHT.search(text):
+        spec.max_height = int(m.group(1))
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in _CODECS:
+            spec.vcodec = _CODECS[word]
+        elif word in ("audio", "mp3", "music"):
+            spec.audio_only = True
+    return spec
+
+
+def _height(f: FormatOption) -> int:
+    if f.resolution.endswith("p") and f.resolution[:-1].isdigit():
+        return int(f.resolution[:-1])
+    return 0
+
+
+def _size(f: FormatOption, duration: float | None) -> int | None:
+    if f.filesize:
+        return f.filesize
+    if f.tbr and duration:
+        return int(f.tbr * 1000 / 8 * duration)
+    return None
+
+
+def plan_format(
+    formats: list[FormatOption],
+    spec: QualitySpec,
+    duration: float | None = None,
+    bandwidth: float | None = None,
+) -> FormatPlan:
+    """Pick concrete format ids for ``spec``.
+
+    The byte budget is the smaller of ``spec.max_bytes`` and what
+    ``bandwidth`` (bytes/s) can fetch before ``spec.deadline``. Among the
+    video-only + audio pairs and muxed formats that fit, the highest
+    resolution wins, then muxed formats (no ffmpeg merge), then pairs that
+    merge into the video's own container, then the highest bitrate. Formats with unknown size are only chosen
+    when there is no budget.
+    """
+    budget = spec.max_bytes
+    notes = []
+    if spec.deadline is not None:
+        if bandwidth:
+            deadline_bytes = int(spec.deadline * bandwidth)
+            budget = deadline_bytes if budget is None else min(budget, deadline_bytes)
+        else:
+            notes.append("no bandwidth measured yet, deadline ignored")
+
+    audio = [f for f in formats if f.has_audio and not f.has_video]
+    if spec.audio_only:
+        candidates = [(f.format_id, 0, True, True, f.tbr or 0, _size(f, duration)) for f in audio]
+    else:
+        video = [
+            f for f in formats
+            if f.has_video
+            and (spec.max_height is None or _height(f) <= spec.max_height)
+            and (spec.vcodec is None or f.vcodec.startswith(spec.vcodec))
+        ]
+        candidates = []
+        for v in video:
+            v_size = _size(v, duration)
+            if v.has_audio:
+                candidates.append((v.format_id, _height(v), True, True, v.tbr or 0, v_size))
+                continue
+            for a in audio:
+                a_size = _size(a, duration)
+                size = v_size + a_size if v_size is not None and a_size is not None else None
+                candidates.append((
+                    f"{v.format_id}+{a.format_id}",
+                    _height(v),
+                    False,
+                    (v.ext, a.ext) in _COMPATIBLE,
+                    (v.tbr or 0) + (a.tbr or 0),
+                    size,
+                ))
+
+    if not candidates:
+        fallback = "bestaudio/best" if spec.audio_only else "bestvideo+bestaudio/best"
+        return FormatPlan(format_string=fallback, fits=False, reason="no matching formats")
+
+    if budget is None:
+        fitting = candidates
+    else:
+        fitting = [c for c in candidates if c[5] is not None and c[5] <= budget]
+    fits = bool(fitting)
+    if fits:
+        format_id, height, _, _, _, size = max(fitting, key=lambda c: c[1:5])
+    else:
+        sized = [c for c in candidates if c[5] is not None] or candidates
+        format_id, height, _, _, _, size = min(sized, key=lambda c: (c[5] or 0, c[1]))
+        notes.append("nothing fits the budget, chose the smallest")
+    if budget is not None:
+        notes.insert(0, f"budget {FormatOption._human_size(budget)}")
+    return FormatPlan(
+        format_string=format_id,
+        estimated_bytes=size,
+        height=height or None,
+        fits=fits,
+        reason="; ".join(notes),
+    )
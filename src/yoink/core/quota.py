@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import Callable, Iterable
+
+from .models import DownloadProgress, QuotaLimits, QuotaUsage
+from .notify import TERMINAL_STATUSES
+
+# Retry hint when only finishing jobs can free room; there's no ETA for that.
+QUEUE_RETRY_AFTER = 30.0
+_MINUTE = 60.0
+_HOUR = 3600.0
+
+
+class QuotaExceeded(Exception):
+    """A client hit a limit. ``retry_after`` is a hint in seconds, or None if waiting won't help."""
+
+    def __init__(self, message: str, retry_after: float | None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.jobs: set[str] = set()
+        # Slots held by calls that passed the check but haven't queued yet.
+        self.reserved = 0
+        self.calls: deque[float] = deque()
+        # (time the job ended, bytes it downloaded)
+        self.finished: deque[tuple[float, int]] = deque()
+
+
+class QuotaTracker:
+    """Per-client job, bandwidth and metadata-rate limits over one shared manager.
+
+    Clients are any weak-referenceable object (an MCP session), so a
+    client's usage goes away with it. ``progress`` looks up a job and
+    ``unfinished`` counts unfinished jobs server-wide.
+    """
+
+    def __init__(
+        self,
+        limits: QuotaLimits,
+        progress: Callable[[str], DownloadProgress | None],
+        unfinished: Callable[[], int],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limits = limits
+        self._progress = progress
+        self._unfinished = unfinished
+        self._clock = clock
+        self._clients: weakref.WeakKeyDictionary[object, _Client] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client(self, key: object) -> _Client:
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = _Client()
+        return client
+
+    def _refresh(self, client: _Client, now: float) -> tuple[int, int]:
+        """Move ended jobs into the byte window; return (queued or held jobs, bytes in the last hour)."""
+        active_bytes = 0
+        for download_id in list(client.jobs):
+            progress = self._progress(download_id)
+            if progress is None:
+                client.jobs.discard(download_id)
+            elif progress.status in TERMINAL_STATUSES:
+                client.jobs.discard(download_id)
+                client.finished.append((now, progress.downloaded_bytes))
+            else:
+                active_bytes += progress.downloaded_bytes
+        while client.finished and now - client.finished[0][0] > _HOUR:
+            client.finished.popleft()
+        return len(client.jobs) + client.reserved, active_bytes + sum(n for _, n in client.finished)
+
+    def check_metadata(self, key: object) -> None:
+        """Count one metadata call, or raise QuotaExceeded if the client is over its rate."""
+        limit = self.limits.metadata_calls_per_minute
+        with self._lock:
+            client, now = self._client(key), self._clock()
+            while client.calls and now - client.calls[0] > _MINUTE:
+                client.calls.popleft()
+            if limit is not None and len(client.calls) >= limit:
+                raise QuotaExceeded(
+                    f"Metadata rate limit reached ({limit} calls per minute)",
+                    client.calls[0] + _MINUTE - now,
+                )
+            client.calls.append(now)
+
+    def reserve_jobs(self, key: object, count: int = 1) -> None:
+        """Hold room for ``count`` more jobs from this client, or raise QuotaExceeded.
+
+        The check and the hold happen together, so concurrent calls can't
+        both fit under a limit. Hand the held slots to ``record_jobs`` once
+        the jobs are queued, or back to ``release_jobs`` if they never are.
+        """
+        limits = self.limits
+        with self._lock:
+            if limits.high_water is not None:
+                unfinished = self._unfinished() + sum(c.reserved for c in self._clients.values())
+                if unfinished >= limits.high_water:
+                    raise QuotaExceeded(f"Server is busy ({unfinished} downloads unfinished)", QUEUE_RETRY_AFTER)
+            client, now = self._client(key), self._clock()
+            queued, used = self._refresh(client, now)
+            if limits.max_queued_jobs is not None and queued + count > limits.max_queued_jobs:
+                raise QuotaExceeded(
+                    f"Queue limit reached ({queued} of {limits.max_queued_jobs} jobs queued)",
+                    None if count > limits.max_queued_jobs else QUEUE_RETRY_AFTER,
+                )
+            if limits.max_bytes_per_hour is not None and used >= limits.max_bytes_per_hour:
+                # Room opens when the oldest finished job leaves the window.
+                retry = client.finished[0][0] + _HOUR - now if client.finished else QUEUE_RETRY_AFTER
+                raise QuotaExceeded(f"Hourly download limit reached ({used} bytes)", retry)
+            client.reserved += count
+
+    def release_jobs(self, key: object, count: int) -> None:
+        with self._lock:
+            client = self._client(key)
+            client.reserved = max(client.reserved - count, 0)
+
+    def record_jobs(self, key: object, download_ids: Iterable[str], reserved: int = 0) -> None:
+        """Track queued jobs, replacing the ``reserved`` slots held for them."""
+        with self._lock:
+            client = self._client(key)
+            client.reserved = max(client.reserved - reserved, 0)
+            client.jobs.update(download_ids)
+
+    def usage(self, key: object) -> QuotaUsage:
+        with self._lock:
+            client, now = self._client(key), self._clock()
+            queued, used = self._refresh(client, now)
+            while client.calls and now - client.calls[0] > _MINUTE:
+                client.calls.popleft()
+            calls = len(client.calls)
+        return QuotaUsage(
+            queued_jobs=queued,
+            bytes_last_hour=used,
+            metadata_calls_last_minute=calls,
+            server_unfinished_jobs=self._unfinished(),
+            limits=self.limits,
+        )
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from .models import FormatOption
+
+_FICLONE = 0x40049409  # Linux ioctl: share extents between two files
+_HASH_CHUNK = 1024 * 1024
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+
+    with src.open("rb") as fin, dest.open("wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            dest.unlink(missing_ok=True)
+            raise
+
+
+def link_file(src: Path, dest: Path) -> str:
+    """Materialize ``src`` at ``dest`` without copying data when the filesystem allows.
+
+    Tries a reflink (independent copy-on-write file), then a hardlink, then a
+    plain copy. Returns the method used.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.yoink-tmp")
+    tmp.unlink(missing_ok=True)
+    for method in ("reflink", "hardlink", "copy"):
+        try:
+            if method == "reflink":
+                _reflink(src, tmp)
+            elif method == "hardlink":
+                os.link(src, tmp)
+            else:
+                shutil.copy2(src, tmp)
+            break
+        except OSError:
+            if method == "copy":
+                tmp.unlink(missing_ok=True)
+                raise
+    os.replace(tmp, dest)
+    return method
+
+
+class ContentStore:
+    """One stored copy per ``(video_id, format_id)``, linked into every folder that asks for it."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _key_dir(self, video_id: str, format_id: str) -> Path:
+        safe_format = re.sub(r"[^\w+.-]", "_", format_id)
+        return self.root / video_id[:2] / video_id / safe_format
+
+    def lookup(self, video_id: str, format_id: str) -> Path | None:
+        key_dir = self._key_dir(video_id, format_id)
+        if not key_dir.is_dir():
+            return None
+        for path in key_dir.iterdir():
+            if path.is_file() and not path.name.startswith("."):
+                return path
+        return None
+
+    def add(self, video_id: str, format_id: str, src: Path) -> Path:
+        """Record a finished download in the store, leaving ``src`` in place."""
+        existing = self.lookup(video_id, format_id)
+        if existing is not None:
+            return existing
+        stored = self._key_dir(video_id, format_id) / f"media{src.suffix}"
+        link_file(src, stored)
+        return stored
+
+    def link_into(self, video_id: str, format_id: str, dest: Path) -> Path | None:
+        """Place the stored file at ``dest`` (keeping the stored extension). None on a miss."""
+        stored = self.lookup(video_id, format_id)
+        if stored is None:
+            return None
+        dest = dest.with_suffix(stored.suffix)
+        if not dest.exists():
+            link_file(stored, dest)
+        return dest
+
+
+class DedupeReport(BaseModel):
+    files_scanned: int = 0
+    duplicates: int = 0
+    bytes_saved: int = 0
+    linked: list[tuple[str, str]] = Field(default_factory=list)
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dedupe_tree(roots: list[str | Path], dry_run: bool = False, min_size: int = 1024 * 1024) -> DedupeReport:
+    """Replace byte-identical files under ``roots`` with links to a single copy.
+
+    Files are grouped by size first so only candidates are hashed. Files on
+    different filesystems are never linked to each other.
+    """
+    report = DedupeReport()
+    by_size: dict[tuple[int, int], list[Path]] = {}
+    for root in roots:
+        for path in Path(root).rglob("*"):
+            if not path.is_file() or path.is_symlink() or path.name.startswith("."):
+                continue
+            st = path.stat()
+            report.files_scanned += 1
+            if st.st_size >= min_size:
+                by_size.setdefault((st.st_dev, st.st_size), []).append(path)
+
+    for (_, size), paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        by_hash: dict[str, list[Path]] = {}
+        for path in paths:
+            by_hash.setdefault(_file_hash(path), []).append(path)
+        for same in by_hash.values():
+            keep, *dupes = sorted(same)
+            for dupe in dupes:
+                if os.path.samefile(keep, dupe):
+                    continue
+                report.duplicates += 1
+                report.bytes_saved += size
+                report.linked.append((str(dupe), str(keep)))
+                if not dry_run:
+                    link_file(keep, dupe)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="yoink-dedupe",
+        description="Replace duplicate media files with reflinks or hardlinks.",
+    )
+    parser.add_argument("paths", nargs="+", metavar="DIR", help="library folders to scan")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="report without changing files")
+    args = parser.parse_args()
+
+    report = dedupe_tree(args.paths, dry_run=args.dry_run)
+    for dupe, keep in report.linked:
+        print(f"{'would link' if args.dry_run else 'linked'} {dupe} -> {keep}")
+    print(
+        f"Scanned {report.files_scanned} files, {report.duplicates} duplicates, "
+        f"{FormatOption._human_size(report.bytes_saved)} "
+        f"{'reclaimable' if args.dry_run else 'reclaimed'}."
+    )
+
+
+if __name__ == "__main__":
+    main()
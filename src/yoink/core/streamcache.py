@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import re
+import shutil
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+StreamKey = tuple[str, str]  # (video_id, format_id)
+
+
+class _Entry:
+    def __init__(self) -> None:
+        self.users = 0
+        self.path: Path | None = None
+        self.fetching = False
+        self.done = threading.Event()
+
+
+class SharedStreamCache:
+    """Component streams (e.g. ``bestaudio``) needed by several jobs for the same video.
+
+    Jobs register the streams they need while queued. A stream with more than
+    one user is downloaded once by whichever job gets there first; the others
+    wait and link the cached file into their own merge. The file is deleted
+    when the last user unregisters.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._entries: dict[StreamKey, _Entry] = {}
+
+    def _dir(self, key: StreamKey) -> Path:
+        video_id, format_id = (re.sub(r"[^\w.-]", "_", part) for part in key)
+        return self.root / video_id / format_id
+
+    def register(self, key: StreamKey) -> None:
+        with self._lock:
+            self._entries.setdefault(key, _Entry()).users += 1
+
+    def unregister(self, key: StreamKey) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.users -= 1
+            if entry.users > 0:
+                return
+            del self._entries[key]
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def users(self, key: StreamKey) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.users if entry else 0
+
+    def fetch(
+        self,
+        key: StreamKey,
+        download: Callable[[Path], Path],
+        cancelled: Callable[[], bool] | None = None,
+        poll: float = 0.2,
+    ) -> Path | None:
+        """Return the cached file for ``key``, running ``download(dir)`` at most once.
+
+        ``download`` receives an empty directory and returns the file it wrote.
+        Returns None if the stream isn't registered, the fetching job failed,
+        or ``cancelled()`` turned true while waiting; callers then download
+        the stream themselves.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.path is not None:
+                return entry.path
+            owner = not entry.fetching
+            entry.fetching = True
+            if owner:
+                entry.done.clear()
+
+        if owner:
+            path = None
+            try:
+                target = self._dir(key)
+                shutil.rmtree(target, ignore_errors=True)
+                target.mkdir(parents=True, exist_ok=True)
+                path = download(target)
+            finally:
+                with self._lock:
+                    entry.path = path
+                    entry.fetching = False
+                    entry.done.set()
+            return path
+
+        while not entry.done.wait(poll):
+            if cancelled is not None and cancelled():
+                return None
+        return entry.path
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import concurrent.futures
+import errno
+import os
+import stat
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+
+
+class StreamSink(abc.ABC):
+    """Destination for streamed media bytes. ``write`` blocks until the data is accepted."""
+
+    @abc.abstractmethod
+    def write(self, data: bytes) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+
+class FileDescriptorSink(StreamSink):
+    """Writes to a caller-owned file descriptor. A full pipe blocks the writer."""
+
+    def __init__(self, fd: int, close_fd: bool = False):
+        self._fd = fd
+        self._close_fd = close_fd
+
+    def write(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+
+    def close(self) -> None:
+        if self._close_fd:
+            os.close(self._fd)
+
+
+def is_fifo(path: str) -> bool:
+    """True if ``path`` exists and is a named pipe."""
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+class NamedPipeSink(FileDescriptorSink):
+    """Writes to an existing FIFO, opened lazily so a missing reader doesn't block setup.
+
+    Anything that isn't a FIFO is refused, so a caller can't point the stream
+    at a regular file. Until a reader opens the other end, the open is
+    retried every ``poll`` seconds and gives up with BrokenPipeError once
+    ``cancelled`` returns true.
+    """
+
+    def __init__(self, path: str, cancelled: Callable[[], bool] | None = None, poll: float = 0.1):
+        self._path = path
+        self._cancelled = cancelled or (lambda: False)
+        self._poll = poll
+        self._opened = False
+        super().__init__(-1, close_fd=True)
+
+    def write(self, data: bytes) -> None:
+        if not self._opened:
+            self._fd = self._open()
+            self._opened = True
+        super().write(data)
+
+    def _open(self) -> int:
+        if not is_fifo(self._path):
+            raise ValueError(f"{self._path} is not a named pipe")
+        while True:
+            try:
+                fd = os.open(self._path, os.O_WRONLY | os.O_NONBLOCK | os.O_NOCTTY)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO:  # ENXIO: no reader yet
+                    raise
+            if self._cancelled():
+                raise BrokenPipeError("stream cancelled before a reader opened the pipe")
+            time.sleep(self._poll)
+        # The path may have been swapped since the check; trust only the open fd.
+        if not stat.S_ISFIFO(os.fstat(fd).st_mode):
+            os.close(fd)
+            raise ValueError(f"{self._path} is not a named pipe")
+        os.set_blocking(fd, True)
+        return fd
+
+    def close(self) -> None:
+        if self._opened:
+            super().close()
+
+
+class AsyncQueueSink(StreamSink):
+    """Hands chunks to an asyncio consumer through a bounded queue.
+
+    The download thread waits while the queue is full, so a slow consumer
+    throttles the download instead of buffering it in memory.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_chunks: int = 16):
+        self._loop = loop
+        self._queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=max_chunks)
+        self._abandoned = threading.Event()
+
+    def write(self, data: bytes) -> None:
+        self._put(data)
+
+    def close(self) -> None:
+        try:
+            self._put(None)
+        except BrokenPipeError:
+            pass
+
+    def _put(self, item: bytes | None) -> None:
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop)
+        while True:
+            if self._abandoned.is_set():
+                future.cancel()
+                raise BrokenPipeError("stream consumer went away")
+            try:
+                future.result(timeout=0.25)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await self._queue.get()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self._abandoned.set()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from yt_dlp.utils import Popen
+
+_local = threading.local()
+_hook_lock = threading.Lock()
+# track() blocks running in any thread; the hook is only in place while this is non-zero.
+_active = 0
+_original_init = None
+
+
+def _tracking_init(self, *args, **kwargs):
+    _original_init(self, *args, **kwargs)
+    tracker = getattr(_local, "tracker", None)
+    if tracker is not None:
+        tracker._add(self)
+
+
+def _hook() -> None:
+    """Make yt-dlp's Popen report each child to the tracker active on the spawning thread.
+
+    yt-dlp starts ffmpeg (merges, audio extraction, section downloads) and
+    JS runtimes through ``yt_dlp.utils.Popen`` without exposing the handles.
+    Children are only attributed to threads inside ``track()``, which run
+    yoink's own YoutubeDL instances, and the hook is removed again once no
+    job is tracking, so yt-dlp is left untouched for other users of it.
+    """
+    global _active, _original_init
+    with _hook_lock:
+        _active += 1
+        if _active > 1:
+            return
+        if _original_init is not None:
+            return  # still chained under a wrapper added after ours
+        from yt_dlp.utils import Popen
+
+        _original_init = Popen.__init__
+        Popen.__init__ = _tracking_init
+
+
+def _unhook() -> None:
+    global _active, _original_init
+    with _hook_lock:
+        _active -= 1
+        if _active:
+            return
+        from yt_dlp.utils import Popen
+
+        # Leave it alone if someone else has wrapped it since.
+        if Popen.__init__ is _tracking_init:
+            Popen.__init__ = _original_init
+            _original_init = None
+
+
+class ChildProcesses:
+    """Processes yt-dlp started on behalf of one job, so a cancel can kill them."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._procs: list[Popen] = []
+        self._killed = False
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[None]:
+        """Record children spawned by the current thread while the block runs."""
+        _hook()
+        previous = getattr(_local, "tracker", None)
+        _local.tracker = self
+        try:
+            yield
+        finally:
+            _local.tracker = previous
+            _unhook()
+
+    def _add(self, proc: Popen) -> None:
+        with self._lock:
+            self._procs = [p for p in self._procs if p.poll() is None]
+            self._procs.append(proc)
+            killed = self._killed
+        if killed:
+            _kill(proc)
+
+    def kill(self) -> int:
+        """Kill every live child, and any started from now on. Returns how many were running."""
+        with self._lock:
+            self._killed = True
+            procs = list(self._procs)
+        return sum(_kill(proc) for proc in procs)
+
+
+def _kill(proc: Popen) -> bool:
+    if proc.poll() is not None:
+        return False
+    try:
+        proc.kill()
+    except OSError:
+        return False
+    return True
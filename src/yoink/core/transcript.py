@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import html
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from .models import Transcript, TranscriptChunk, TranscriptSegment
+from .ytcache import cache_params
+
+# Caption formats we can parse, best first.
+_PREFERRED_EXTS = ("json3", "vtt", "srt")
+_CACHE_SIZE = 64
+DEFAULT_CHUNK_CHARS = 20_000
+
+_TIMING = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})"
+)
+_TAG = re.compile(r"<[^>]*>")
+
+
+def _seconds(h: str | None, m: str, s: str, ms: str) -> float:
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+
+def parse_json3(data: str) -> list[TranscriptSegment]:
+    """Parse YouTube's json3 caption format."""
+    segments = []
+    for event in json.loads(data).get("events", []):
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs") or []).strip()
+        if not text:
+            continue
+        start = event.get("tStartMs", 0) / 1000
+        segments.append(
+            TranscriptSegment(start=start, end=start + event.get("dDurationMs", 0) / 1000, text=text)
+        )
+    return segments
+
+
+def parse_timed_text(data: str) -> list[TranscriptSegment]:
+    """Parse WebVTT or SRT cues.
+
+    Auto-generated YouTube VTT repeats the previous line at the top of each
+    cue as it scrolls; lines already emitted by the previous cue are dropped.
+    """
+    segments = []
+    previous: list[str] = []
+    for block in re.split(r"\r?\n\s*\r?\n", data):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            match = _TIMING.search(line)
+            if match:
+                break
+        else:
+            continue
+        g = match.groups()
+        text_lines = [html.unescape(_TAG.sub("", t)).strip() for t in lines[i + 1:]]
+        text_lines = [t for t in text_lines if t]
+        fresh = [t for t in text_lines if t not in previous]
+        previous = text_lines
+        if fresh:
+            segments.append(
+                TranscriptSegment(
+                    start=_seconds(*g[:4]), end=_seconds(*g[4:]), text=" ".join(fresh)
+                )
+            )
+    return segments
+
+
+def _pick_track(info: dict, lang: str) -> tuple[str, dict, bool] | None:
+    """Choose a caption track for ``lang``, preferring uploaded subtitles over auto captions."""
+    for automatic, tracks in ((False, info.get("subtitles") or {}), (True, info.get("automatic_captions") or {})):
+        candidates = [lang] + sorted(k for k in tracks if k.startswith(f"{lang}-"))
+        for key in candidates:
+            formats = {f.get("ext"): f for f in tracks.get(key) or []}
+            for ext in _PREFERRED_EXTS:
+                if ext in formats:
+                    return key, formats[ext], automatic
+    return None
+
+
+def chunk_transcript(
+    transcript: Transcript,
+    cursor: int = 0,
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+    timestamps: bool = False,
+) -> TranscriptChunk:
+    """Return the segments starting at ``cursor`` that fit in ``max_chars``.
+
+    Always returns at least one segment so a cursor can never stall.
+    """
+    segments = transcript.segments
+    end, size = cursor, 0
+    while end < len(segments):
+        size += len(segments[end].text) + 1
+        if size > max_chars and end > cursor:
+            break
+        end += 1
+    page = segments[cursor:end]
+    return TranscriptChunk(
+        video_id=transcript.video_id,
+        lang=transcript.lang,
+        automatic=transcript.automatic,
+        text=" ".join(s.text for s in page),
+        segments=page if timestamps else None,
+        cursor=cursor,
+        next_cursor=end if end < len(segments) else None,
+        total_segments=len(segments),
+    )
+
+
+class TranscriptFetcher:
+    """Fetches caption tracks without touching the media, cached by ``(video_id, lang)``."""
+
+    _ydl_opts: dict = {
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True,
+    }
+
+    def __init__(self, cache_size: int = _CACHE_SIZE, cache_dir: str | None = None):
+        self._cache_size = cache_size
+        self._cache_dir = cache_dir
+        self._cache: OrderedDict[tuple[str, str], Transcript] = OrderedDict()
+        self._video_ids: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, lang: str = "en") -> Transcript:
+        import yt_dlp
+
+        with self._lock:
+            video_id = self._video_ids.get(url)
+            if video_id is not None and (video_id, lang) in self._cache:
+                self._cache.move_to_end((video_id, lang))
+                return self._cache[(video_id, lang)]
+
+        with yt_dlp.YoutubeDL({**self._ydl_opts, **cache_params(self._cache_dir)}) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                raise ValueError(f"Could not extract info for {url}")
+            picked = _pick_track(info, lang)
+            if picked is None:
+                available = sorted({*(info.get("subtitles") or {}), *(info.get("automatic_captions") or {})})
+                raise ValueError(
+                    f"No '{lang}' transcript for {url}"
+                    + (f". Available: {', '.join(available[:20])}" if available else "")
+                )
+            track_lang, track, automatic = picked
+            data = track.get("data")
+            if data is None:
+                data = ydl.urlopen(track["url"]).read().decode("utf-8", "replace")
+
+        segments = parse_json3(data) if track.get("ext") == "json3" else parse_timed_text(data)
+        transcript = Transcript(
+            video_id=info.get("id", ""), lang=track_lang, automatic=automatic, segments=segments
+        )
+        with self._lock:
+            self._video_ids[url] = transcript.video_id
+            self._cache[(transcript.video_id, lang)] = transcript
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return transcript
+
+
+def __getattr__(name: str):
+    # Imported on first use to keep startup fast; see engine.__getattr__.
+    if name == "yt_dlp":
+        import yt_dlp
+
+        return yt_dlp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import socket
+import time
+from collections.abc import Callable
+
+from .errors import friendly_error
+from .extractor import MetadataExtractor
+from .models import WarmupReport
+
+# Hosts every YouTube extraction contacts first.
+WARMUP_HOSTS = ("www.youtube.com", "i.ytimg.com")
+
+
+def warm_up(
+    extractor: MetadataExtractor,
+    url: str | None = None,
+    hosts: tuple[str, ...] = WARMUP_HOSTS,
+) -> WarmupReport:
+    """Pay yt-dlp's one-off costs before the first real request does.
+
+    Imports yt-dlp and builds its YouTube extractor, then resolves the
+    YouTube hosts. With ``url`` it also runs one extraction, which stores the
+    player JS signature functions in yt-dlp's cache directory and leaves the
+    info dict in ``extractor``'s cache. A failed step is recorded and the
+    rest still run; this never raises.
+    """
+    steps: list[tuple[str, Callable[[], object]]] = [
+        ("import", _build_extractor),
+        ("resolve", lambda: [socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM) for host in hosts]),
+    ]
+    if url:
+        steps.append(("prime_cache", lambda: extractor.extract_raw(url)))
+
+    report = WarmupReport()
+    start = time.monotonic()
+    for name, step in steps:
+        began = time.monotonic()
+        try:
+            step()
+        except Exception as e:
+            report.errors[name] = friendly_error(str(e))
+        report.steps[name] = time.monotonic() - began
+    report.total_seconds = time.monotonic() - start
+    return report
+
+
+def _build_extractor() -> None:
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+        ydl.get_info_extractor("Youtube")
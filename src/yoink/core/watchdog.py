@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .models import FormatOption
+
+if TYPE_CHECKING:
+    from .engine import DownloadEngine
+
+
+class _JobState:
+    def __init__(self, engine: DownloadEngine, now: float):
+        self.engine = engine
+        self.baseline: float | None = None
+        self.reset(now)
+
+    def reset(self, now: float) -> None:
+        self.last_bytes = self.engine.progress.downloaded_bytes
+        self.last_change = now
+        self.download_since: float | None = None
+        self.slow_since: float | None = None
+
+
+class StallWatchdog:
+    """Restarts downloads that stop moving or get throttled far below their own earlier speed.
+
+    A job is flagged when its byte count hasn't changed for ``stall_timeout``
+    seconds, or when, after ``warmup`` seconds of downloading, its speed has
+    stayed under ``slow_ratio`` of its healthy average for ``slow_for``
+    seconds. Flagged engines re-extract (fresh media URLs) and resume from
+    their partial files.
+    """
+
+    def __init__(
+        self,
+        stall_timeout: float = 30.0,
+        slow_ratio: float = 0.1,
+        slow_for: float = 20.0,
+        warmup: float = 10.0,
+        interval: float = 1.0,
+    ):
+        self.stall_timeout = stall_timeout
+        self.slow_ratio = slow_ratio
+        self.slow_for = slow_for
+        self.warmup = warmup
+        self.interval = interval
+        self._jobs: dict[str, _JobState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="yoink-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def watch(self, engine: DownloadEngine) -> None:
+        with self._lock:
+            self._jobs[engine.request.download_id] = _JobState(engine, time.monotonic())
+
+    def unwatch(self, download_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(download_id, None)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self, now: float | None = None) -> list[str]:
+        """Inspect every watched job once; returns the ids that were told to restart."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            jobs = list(self._jobs.items())
+        flagged = []
+        for download_id, state in jobs:
+            reason = self._inspect(state, now)
+            if reason is not None:
+                state.engine.request_restart(reason)
+                state.reset(now)
+                flagged.append(download_id)
+        return flagged
+
+    def _inspect(self, state: _JobState, now: float) -> str | None:
+        engine = state.engine
+        if engine.stage != "download" or engine.is_cancelled:
+            state.reset(now)
+            return None
+        progress = engine.progress
+        if state.download_since is None:
+            state.download_since = now
+        if progress.downloaded_bytes > state.last_bytes:
+            state.last_bytes = progress.downloaded_bytes
+            state.last_change = now
+        if now - state.last_change >= self.stall_timeout:
+            return f"no progress for {now - state.last_change:.0f}s"
+
+        speed = progress.speed or 0.0
+        if state.baseline is None or speed >= self.slow_ratio * state.baseline:
+            # Only healthy samples feed the baseline, so throttling can't drag it down.
+            if speed > 0:
+                state.baseline = speed if state.baseline is None else 0.8 * state.baseline + 0.2 * speed
+            state.slow_since = None
+            return None
+        if state.slow_since is None:
+            state.slow_since = now
+        if now - state.download_since >= self.warmup and now - state.slow_since >= self.slow_for:
+            return (
+                f"throttled to {FormatOption._human_size(int(speed))}/s "
+                f"(usual {FormatOption._human_size(int(state.baseline))}/s)"
+            )
+        return None
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from .models import CacheStats
+
+try:
+    import fcntl
+except ImportError:  # Windows: pruning is idempotent, so it just runs unlocked
+    fcntl = None
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# yt-dlp's atomic writes leave these behind if the writer dies mid-write.
+_STALE_TMP_SECONDS = 3600
+_LOCK_NAME = ".yoink-prune.lock"
+
+_registry: dict[str, YtDlpCache] = {}
+_install_lock = threading.Lock()
+_installed = False
+_MISS = object()
+
+
+def default_cache_dir() -> Path:
+    """``$YOINK_CACHE_DIR``, else ``yoink/yt-dlp`` under ``$XDG_CACHE_HOME`` (``~/.cache``)."""
+    if os.environ.get("YOINK_CACHE_DIR"):
+        return Path(os.environ["YOINK_CACHE_DIR"]).expanduser()
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache").expanduser() / "yoink" / "yt-dlp"
+
+
+def cache_params(cache_dir: str | None) -> dict:
+    """yt-dlp options that point it at ``cache_dir``, with hit counting enabled.
+
+    Call right before building a YoutubeDL, so yt-dlp is only imported once
+    it's needed anyway.
+    """
+    if not cache_dir:
+        return {}
+    if not _installed:
+        _install()
+    return {"cachedir": cache_dir}
+
+
+def _install() -> None:
+    """Make yt-dlp's Cache report loads and stores to the YtDlpCache owning its directory."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from yt_dlp.cache import Cache
+
+        original_load, original_store = Cache.load, Cache.store
+
+        def load(self, section, key, dtype="json", default=None, *, min_ver=None):
+            value = original_load(self, section, key, dtype, _MISS, min_ver=min_ver)
+            cache = _registry.get(self._get_root_dir()) if self.enabled else None
+            if cache is not None:
+                cache._record(section, "hits" if value is not _MISS else "misses")
+            return default if value is _MISS else value
+
+        def store(self, section, key, data, dtype="json"):
+            original_store(self, section, key, data, dtype)
+            cache = _registry.get(self._get_root_dir()) if self.enabled else None
+            if cache is not None:
+                cache._record(section, "stores")
+
+        Cache.load, Cache.store = load, store
+        _installed = True
+
+
+class YtDlpCache:
+    """A yt-dlp ``cachedir`` shared by every yoink process, capped in size.
+
+    yt-dlp keeps player JS signature functions here; without a persistent
+    directory every cold start solves them again. Entries are written
+    atomically by yt-dlp, so processes can share the directory freely;
+    pruning takes a file lock so only one process prunes at a time.
+    """
+
+    def __init__(self, root: str | Path | None = None, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.root = Path(root or default_cache_dir()).expanduser().absolute()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sections: dict[str, dict[str, int]] = {}
+        self._pruned = 0
+        _registry[str(self.root)] = self
+
+    def _record(self, section: str, kind: str) -> None:
+        with self._lock:
+            counts = self._sections.setdefault(section, {"hits": 0, "misses": 0, "stores": 0})
+            counts[kind] += 1
+
+    def _entries(self) -> list[os.DirEntry]:
+        entries = []
+        try:
+            sections = [e for e in os.scandir(self.root) if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            return []
+        for section in sections:
+            try:
+                entries.extend(e for e in os.scandir(section.path) if e.is_file(follow_symlinks=False))
+            except OSError:
+                continue
+        return entries
+
+    def prune(self) -> int:
+        """Delete stale temp files, then the oldest entries until the cache fits ``max_bytes``.
+
+        Returns how many files were removed. Skipped if another process is
+        already pruning.
+        """
+        if not self.root.is_dir():
+            return 0
+        try:
+            lock = open(self.root / _LOCK_NAME, "a")
+        except OSError:
+            return 0
+        with lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return 0
+            now = time.time()
+            files = []
+            for entry in self._entries():
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path, entry.name.endswith(".tmp")))
+            removed = 0
+            total = sum(size for _, size, _, _ in files)
+            for mtime, size, path, tmp in sorted(files):
+                # A young temp file may be another process's write in progress.
+                evict = now - mtime > _STALE_TMP_SECONDS if tmp else total > self.max_bytes
+                if not evict:
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        with self._lock:
+            self._pruned += removed
+        return removed
+
+    def stats(self) -> CacheStats:
+        sizes = []
+        for entry in self._entries():
+            try:
+                sizes.append(entry.stat(follow_symlinks=False).st_size)
+            except OSError:
+                continue
+        with self._lock:
+            sections = {name: dict(counts) for name, counts in self._sections.items()}
+            pruned = self._pruned
+        return CacheStats(
+            path=str(self.root),
+            size_bytes=sum(sizes),
+            max_bytes=self.max_bytes,
+            entries=len(sizes),
+            hits=sum(c["hits"] for c in sections.values()),
+            misses=sum(c["misses"] for c in sections.values()),
+            stores=sum(c["stores"] for c in sections.values()),
+            pruned=pruned,
+            sections=sections,
+        )
@@ -1,81 +1,634 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import os
+import socket
+from collections.abc import Callable
 from pathlib import Path
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
 
+from yoink.core.extractor import profile_for
 from yoink.core.manager import DownloadManager
-from yoink.core.models import DownloadRequest
+from yoink.core.models import (
+    BatchItem,
+    DownloadProgress,
+    DownloadRequest,
+    DownloadStatus,
+    GroupRequest,
+    OutputTarget,
+    QuotaLimits,
+    VideoInfo,
+)
+from yoink.core.notify import NOTIFY_INTERVAL, TERMINAL_STATUSES, progress_message, push_progress
+from yoink.core.quota import QuotaExceeded, QuotaTracker
+from yoink.core.streaming import is_fifo
+from yoink.core.transcript import DEFAULT_CHUNK_CHARS, chunk_transcript
 
-mcp = FastMCP("Yoink")
-manager = DownloadManager(max_concurrent=3)
+DEFAULT_PORT = 8765
+
+mcp = FastMCP("Yoink", port=DEFAULT_PORT)
+_manager: DownloadManager | None = None
+_quota: QuotaTracker | None = None
+# Per-session limits; main() replaces these from the command line.
+quota_limits = QuotaLimits()
+
+
+def get_manager() -> DownloadManager:
+    """The shared manager, built on first use so the server can answer ``initialize`` sooner."""
+    global _manager
+    if _manager is None:
+        _manager = DownloadManager(max_concurrent=3)
+    return _manager
+
+
+def get_quota() -> QuotaTracker:
+    global _quota
+    if _quota is None:
+        manager = get_manager()
+        _quota = QuotaTracker(
+            quota_limits,
+            manager.get_progress,
+            lambda: sum(p.status not in TERMINAL_STATUSES for p in manager.get_all_progress()),
+        )
+    return _quota
+
+
+def _over_quota(ctx: Context | None, jobs: int = 0) -> dict | None:
+    """Charge the calling session one metadata call, or reserve room for ``jobs`` more.
+
+    Returns the error to send back when a limit is hit. A reservation must
+    end in ``_charge_jobs``, even when nothing gets queued. Calls without a
+    session (in-process use) aren't limited.
+    """
+    if ctx is None:
+        return None
+    try:
+        if jobs:
+            get_quota().reserve_jobs(ctx.session, jobs)
+        else:
+            get_quota().check_metadata(ctx.session)
+    except QuotaExceeded as e:
+        return _quota_error(e)
+    return None
+
+
+def _quota_error(e: QuotaExceeded) -> dict:
+    error: dict = {"error": str(e)}
+    if e.retry_after is not None:
+        error["retry_after_s"] = round(e.retry_after, 1)
+    return error
+
+
+def _charge_jobs(ctx: Context | None, download_ids: list[str], reserved: int) -> None:
+    """Count the queued jobs against the session in place of the ``reserved`` slots."""
+    if ctx is not None:
+        get_quota().record_jobs(ctx.session, download_ids, reserved)
+
+
+def _progress_notifier(
+    ctx: Context, token: str | int
+) -> tuple[Callable[[DownloadProgress], None], asyncio.Task]:
+    """A manager callback that pushes the job's progress to the client as MCP notifications.
+
+    MCP only allows progress notifications while their request is open, so
+    the caller must await the returned task (it ends with the job) or
+    cancel it before responding.
+    """
+    loop = asyncio.get_running_loop()
+    updates: asyncio.Queue[DownloadProgress] = asyncio.Queue()
+    session, request_id = ctx.session, ctx.request_id
+
+    async def send(progress: DownloadProgress) -> None:
+        await session.send_progress_notification(
+            progress_token=token,
+            progress=progress.percent,
+            total=100.0,
+            message=progress_message(progress),
+            related_request_id=request_id,
+        )
+
+    async def forward() -> None:
+        try:
+            await push_progress(updates, send)
+        except Exception:
+            pass  # client went away; the download carries on
+
+    task = loop.create_task(forward())
+
+    def callback(progress: DownloadProgress) -> None:
+        try:
+            loop.call_soon_threadsafe(updates.put_nowait, progress)
+        except RuntimeError:
+            pass  # event loop closed
+
+    return callback, task
 
 
 @mcp.tool()
-async def get_video_info(url: str) -> dict:
-    """Fetch video metadata including title, duration, uploader, and available formats."""
-    info = await manager.get_video_info(url)
-    return info.model_dump()
+async def get_video_info(url: str, fields: list[str] | None = None, ctx: Context | None = None) -> dict:
+    """Fetch video metadata including title, duration, uploader, and available formats.
+
+    Pass fields (e.g. ["title", "duration"]) to get only those; leaving out
+    "formats" makes the lookup much cheaper. An empty list means all fields.
+    """
+    unknown = sorted(set(fields or ()) - set(VideoInfo.model_fields))
+    if unknown:
+        return {"error": f"Unknown fields: {', '.join(unknown)}"}
+    if refused := _over_quota(ctx):
+        return refused
+    info = await get_manager().get_video_info(url, profile_for(fields))
+    return info.model_dump(include=set(fields) if fields else None)
 
 
 @mcp.tool()
-async def get_playlist_info(url: str) -> dict:
+async def get_playlist_info(url: str, ctx: Context | None = None) -> dict:
     """Fetch playlist metadata including all video titles and IDs."""
-    info = await manager.get_playlist_info(url)
+    if refused := _over_quota(ctx):
+        return refused
+    info = await get_manager().get_playlist_info(url)
     return info.model_dump()
 
 
 @mcp.tool()
-async def get_formats(url: str) -> list[dict]:
-    """List available download formats/qualities for a video URL."""
-    formats = await manager.get_formats(url)
+async def get_formats(url: str, audio_only: bool = False, ctx: Context | None = None) -> list[dict] | dict:
+    """List available download formats/qualities for a video URL.
+
+    With audio_only, lists every audio-only format instead (cheaper to fetch).
+    """
+    if refused := _over_quota(ctx):
+        return refused
+    formats = await get_manager().get_formats(url, profile_for(audio_only=audio_only), audio_only)
     return [f.model_dump() for f in formats]
 
 
+@mcp.tool()
+async def get_transcript(
+    url: str,
+    lang: str = "en",
+    timestamps: bool = False,
+    cursor: int = 0,
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+    ctx: Context | None = None,
+) -> dict:
+    """Fetch a video's transcript from its captions without downloading the media.
+
+    Uploaded subtitles are preferred over auto-generated captions. Long
+    transcripts come back in pages: call again with cursor=next_cursor until
+    next_cursor is null. Set timestamps for per-segment start/end times.
+    """
+    if refused := _over_quota(ctx):
+        return refused
+    transcript = await get_manager().get_transcript(url, lang)
+    chunk = chunk_transcript(transcript, cursor, max_chars, timestamps)
+    return chunk.model_dump(exclude=None if timestamps else {"segments"})
+
+
 @mcp.tool()
 async def start_download(
     url: str,
     format_string: str = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
     output_dir: str = str(Path.home() / "Downloads"),
+    concurrent_fragments: int | None = None,
+    http_chunk_size: int | None = None,
+    convert_to_mp3: bool = False,
+    accept_audio_codecs: list[str] | None = None,
+    stream_path: str | None = None,
+    start_time: str | None = None,
+    end_time: str | None = None,
+    chapters: list[str] | None = None,
+    quality: str | None = None,
+    wait: bool = False,
+    progress_token: str | int | None = None,
+    ctx: Context | None = None,
 ) -> dict:
-    """Start downloading a video. Returns a download_id for tracking progress."""
-    request = DownloadRequest(
-        url=url,
-        format_string=format_string,
-        output_dir=output_dir,
-    )
-    download_id = manager.start_download(request)
-    if download_id is None:
-        return {"error": "This URL is already being downloaded"}
-    return {"download_id": download_id, "status": "started"}
+    """Start downloading a video. Returns a download_id for tracking progress.
+
+    concurrent_fragments and http_chunk_size tune DASH/HLS fragment threads and
+    ranged request size; leave them unset to size them from the current load.
+    With convert_to_mp3, list codecs you can use as-is in accept_audio_codecs
+    ("m4a", "opus") to get the native stream remuxed instead of re-encoded.
+    Set stream_path to an existing named pipe (FIFO) to stream the media there
+    instead of saving it to output_dir; other paths are refused.
+    To fetch only part of a video, give start_time/end_time (seconds or
+    "HH:MM:SS") and/or chapter title regexes in chapters.
+    Instead of a format_string, quality can describe what you want, e.g.
+    "720p", "under 50MB", "within 2 min", "1080p vp9" or "audio"; concrete
+    formats are then picked from the video's available ones.
+    With wait, the call returns only once the download finishes, fails or is
+    cancelled, with its final progress; send a progress token (in the
+    request's _meta, or as progress_token) to get progress notifications
+    until then instead of polling get_download_progress.
+    """
+    if stream_path and not is_fifo(stream_path):
+        return {"error": "stream_path must be an existing named pipe"}
+    if refused := _over_quota(ctx, jobs=1):
+        return refused
+    queued: list[str] = []
+    try:
+        plan = None
+        if quality:
+            plan = await get_manager().plan_format(url, quality)
+            format_string = plan.format_string
+        request = DownloadRequest(
+            url=url,
+            format_string=format_string,
+            output_dir=output_dir,
+            concurrent_fragments=concurrent_fragments,
+            http_chunk_size=http_chunk_size,
+            convert_to_mp3=convert_to_mp3,
+            accept_audio_codecs=accept_audio_codecs or [],
+            output_mode="stream" if stream_path else "file",
+            stream_path=stream_path,
+            start_time=start_time,
+            end_time=end_time,
+            chapters=chapters or [],
+        )
+        if progress_token is None and ctx is not None and ctx.request_context.meta is not None:
+            progress_token = ctx.request_context.meta.progressToken
+        callback = notifier = None
+        if wait and progress_token is not None and ctx is not None:
+            callback, notifier = _progress_notifier(ctx, progress_token)
+        download_id = get_manager().start_download(request, callback=callback)
+        if download_id is None:
+            if notifier is not None:
+                notifier.cancel()
+            return {"error": "This URL is already being downloaded"}
+        queued.append(download_id)
+    finally:
+        _charge_jobs(ctx, queued, reserved=1)
+    result = {"download_id": download_id, "status": "started"}
+    if plan is not None:
+        result["plan"] = plan.model_dump()
+    if not wait:
+        return result
+    try:
+        done = await get_manager().wait_for_downloads([download_id], "all")
+        if notifier is not None:
+            # Let the final notification go out before the response.
+            await asyncio.wait({notifier}, timeout=NOTIFY_INTERVAL)
+    finally:
+        if notifier is not None:
+            notifier.cancel()
+    final = done[download_id]
+    result.update(status=final.status.value, progress=final.model_dump())
+    if notifier is not None:
+        result["progress_token"] = progress_token
+    return result
+
+
+@mcp.tool()
+async def start_downloads(
+    requests: list[BatchItem],
+    format_string: str = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+    output_dir: str = str(Path.home() / "Downloads"),
+    ctx: Context | None = None,
+) -> dict:
+    """Queue many downloads in one call; returns a download_id or error per job.
+
+    Each request takes a url plus optional format_string, quality,
+    output_dir, convert_to_mp3, accept_audio_codecs, start_time and
+    end_time; unset ones use the defaults given here. For a playlist, pass
+    its URL with playlist_items (e.g. "1-10,15,-3:") and the server expands
+    the selected entries itself. A /playlist URL without playlist_items
+    queues every entry.
+    """
+    # Playlists expand on the server, so this holds one slot per item until
+    # the real job count is known.
+    held = len(requests)
+    if refused := _over_quota(ctx, jobs=held):
+        return refused
+    results = []
+
+    def reserve(count: int) -> None:
+        nonlocal held
+        if ctx is not None and count > held:
+            get_quota().reserve_jobs(ctx.session, count - held)
+            held = count
+
+    try:
+        defaults = DownloadRequest(url="", format_string=format_string, output_dir=output_dir)
+        results = await get_manager().start_batch(requests, defaults, reserve=reserve)
+    except QuotaExceeded as e:
+        return _quota_error(e)
+    finally:
+        _charge_jobs(ctx, [r.download_id for r in results if r.download_id], reserved=held)
+    return {
+        "started": sum(r.download_id is not None for r in results),
+        "results": [r.model_dump(exclude_none=True) for r in results],
+    }
+
+
+@mcp.tool()
+async def start_group_download(
+    url: str,
+    outputs: list[OutputTarget],
+    output_dir: str = str(Path.home() / "Downloads"),
+    ctx: Context | None = None,
+) -> dict:
+    """Produce several outputs of one video (e.g. 1080p video + MP3 + subtitles) from one extraction.
+
+    Each output has a kind ("video", "audio" or "subtitles"); video outputs
+    take a format_string or quality, audio outputs accept_audio_codecs,
+    subtitles a subtitle_lang. Streams needed by several outputs are fetched
+    once. Returns a group_id; get_download_progress accepts it too.
+    """
+    if refused := _over_quota(ctx, jobs=len(outputs)):
+        return refused
+    download_ids: list[str] = []
+    try:
+        request = GroupRequest(url=url, outputs=outputs, output_dir=output_dir)
+        group_id = get_manager().start_group(request)
+        download_ids = get_manager().expand_ids([group_id])
+    finally:
+        _charge_jobs(ctx, download_ids, reserved=len(outputs))
+    return {"group_id": group_id, "download_ids": download_ids, "status": "started"}
 
 
 @mcp.tool()
 async def list_downloads() -> list[dict]:
     """List all downloads with their current status and progress."""
-    return [p.model_dump() for p in manager.get_all_progress()]
+    return [p.model_dump() for p in get_manager().get_all_progress()]
+
+
+@mcp.tool()
+async def list_download_changes(
+    since: int = 0,
+    status: list[DownloadStatus] | None = None,
+    max_age_s: float | None = None,
+) -> dict:
+    """List downloads that changed since a cursor, plus the cursor for the next call.
+
+    Pass the returned cursor as since on the next call to get only the
+    downloads that changed in between. status limits the result to those
+    statuses; max_age_s to downloads updated within that many seconds.
+    """
+    changes = get_manager().list_changes(since, status, max_age_s)
+    return changes.model_dump()
 
 
 @mcp.tool()
 async def get_download_progress(download_id: str) -> dict:
     """Get the current progress of a specific download."""
+    manager = get_manager()
+    group = manager.get_group_progress(download_id)
+    if group is not None:
+        return group.model_dump()
     progress = manager.get_progress(download_id)
     if progress is None:
         return {"error": f"No download found with id {download_id}"}
     return progress.model_dump()
 
 
+@mcp.tool()
+async def wait_for_downloads(
+    ids: list[str],
+    until: str = "any",
+    timeout_s: float = 60.0,
+) -> dict:
+    """Wait until any (until="any") or all (until="all") of the given downloads end.
+
+    Returns the final progress of every job that finished, failed or was
+    cancelled, and the ids still running when timeout_s ran out. Group ids
+    from start_group_download cover all of their outputs. Use this instead
+    of polling get_download_progress in a loop.
+    """
+    if until not in ("any", "all"):
+        return {"error": 'until must be "any" or "all"'}
+    manager = get_manager()
+    jobs = manager.expand_ids(ids)
+    done = await manager.wait_for_downloads(jobs, until, max(0.0, min(timeout_s, 600.0)))
+    return {
+        "done": [p.model_dump() for p in done.values()],
+        "pending": [i for i in jobs if i not in done],
+        "unknown": [i for i in ids if not manager.expand_ids([i])],
+    }
+
+
+@mcp.tool()
+async def get_disk_reservations() -> list[dict]:
+    """List disk space reserved by admitted downloads that has not been written yet."""
+    return [
+        {**r.model_dump(), "outstanding_bytes": r.outstanding_bytes}
+        for r in get_manager().get_disk_reservations()
+    ]
+
+
+@mcp.tool()
+async def get_download_stats() -> dict:
+    """Pipeline statistics: time per stage, merges run vs. avoided, measured bandwidth, warm-up, yt-dlp cache hits."""
+    manager = get_manager()
+    return {
+        "stages": manager.get_stage_summary(),
+        "merges": manager.get_merge_stats(),
+        "bandwidth": manager.bandwidth,
+        "warmup": manager.warmup.model_dump() if manager.warmup else None,
+        "cache": manager.get_cache_stats().model_dump(),
+    }
+
+
 @mcp.tool()
 async def cancel_download(download_id: str) -> dict:
     """Cancel an active download."""
-    success = manager.cancel_download(download_id)
+    success = get_manager().cancel_download(download_id)
     if success:
         return {"status": "cancelled", "download_id": download_id}
     return {"error": f"No active download found with id {download_id}"}
 
 
+@mcp.tool()
+async def cancel_downloads(
+    ids: list[str] | None = None,
+    status: list[DownloadStatus] | None = None,
+    url_contains: str | None = None,
+) -> dict:
+    """Cancel many downloads at once, by ids and/or a filter (status, url_contains).
+
+    Filters narrow the ids when both are given. At least one of them is
+    required. Returns what happened to each matched download.
+    """
+    if ids is None and status is None and not url_contains:
+        return {"error": "Give ids or a filter (status, url_contains)"}
+    manager = get_manager()
+    results = {}
+    for download_id in manager.select_downloads(ids, status, url_contains):
+        progress = manager.get_progress(download_id)
+        if progress is not None and progress.status in TERMINAL_STATUSES:
+            results[download_id] = f"already {progress.status.value}"
+        elif manager.cancel_download(download_id):
+            results[download_id] = "cancelled"
+    return {"cancelled": sum(r == "cancelled" for r in results.values()), "results": results}
+
+
+@mcp.tool()
+async def retry_failed(
+    ids: list[str] | None = None,
+    url_contains: str | None = None,
+    error_contains: str | None = None,
+    include_cancelled: bool = False,
+    ctx: Context | None = None,
+) -> dict:
+    """Restart failed downloads (and, with include_cancelled, cancelled ones) under their old ids.
+
+    With no arguments every failed download is retried; ids, url_contains
+    and error_contains (e.g. "timed out") narrow the selection.
+    """
+    statuses = [DownloadStatus.ERROR]
+    if include_cancelled:
+        statuses.append(DownloadStatus.CANCELLED)
+    manager = get_manager()
+    selected = manager.select_downloads(ids, statuses, url_contains, error_contains)
+    if selected and (refused := _over_quota(ctx, jobs=len(selected))):
+        return refused
+    results: dict[str, str] = {}
+    try:
+        for download_id in selected:
+            results[download_id] = "restarted" if manager.retry_download(download_id) else "not retryable"
+    finally:
+        _charge_jobs(ctx, [i for i, r in results.items() if r == "restarted"], reserved=len(selected))
+    return {"restarted": sum(r == "restarted" for r in results.values()), "results": results}
+
+
+@mcp.tool()
+async def get_quota_usage(ctx: Context | None = None) -> dict:
+    """This session's usage against its limits: queued jobs, bytes in the last hour, metadata calls per minute.
+
+    Work that would go over a limit, or that arrives while the server is
+    past its high-water mark, is refused with an error and retry_after_s.
+    """
+    if ctx is None:
+        return {"error": "Quotas apply to MCP sessions only"}
+    return get_quota().usage(ctx.session).model_dump()
+
+
+def _clear_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # left behind by a server that died
+    else:
+        raise SystemExit(f"A server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+async def serve(host: str, port: int, socket_path: str | None = None) -> None:
+    """Serve streamable-HTTP on host:port or a unix socket; every session shares one manager."""
+    import uvicorn
+
+    if socket_path:
+        _clear_stale_socket(socket_path)
+        # Only local processes can reach a unix socket, so Host checks don't apply.
+        mcp.settings.transport_security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
+    config = uvicorn.Config(
+        mcp.streamable_http_app(),
+        host=host,
+        port=port,
+        uds=socket_path,
+        log_level=mcp.settings.log_level.lower(),
+    )
+    try:
+        await uvicorn.Server(config).serve()
+    finally:
+        if _manager is not None:
+            _manager.shutdown()
+
+
 def main() -> None:
-    mcp.run(transport="stdio")
+    parser = argparse.ArgumentParser(
+        prog="yoink-mcp",
+        description="MCP server for downloading YouTube videos.",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--serve",
+        action="store_true",
+        help="run a long-lived streamable-HTTP server that many assistant sessions share",
+    )
+    mode.add_argument(
+        "--connect",
+        metavar="URL",
+        nargs="?",
+        const=f"http://127.0.0.1:{DEFAULT_PORT}{mcp.settings.streamable_http_path}",
+        help="speak stdio but forward to a running --serve instance (default: %(const)s)",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port for --serve (default: %(default)s)")
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        default=None,
+        help="listen on / connect to this unix socket instead of TCP",
+    )
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        help="load yt-dlp and resolve YouTube hosts in the background at startup",
+    )
+    parser.add_argument(
+        "--warm-up-url",
+        metavar="URL",
+        default=None,
+        help="also extract this video at startup to prime yt-dlp's cache (implies --warm-up)",
+    )
+    limits = parser.add_argument_group("per-session limits (0 disables a limit)")
+    defaults = QuotaLimits()
+    limits.add_argument(
+        "--max-queued",
+        type=int,
+        default=defaults.max_queued_jobs,
+        metavar="N",
+        help="unfinished jobs per session (default: %(default)s)",
+    )
+    limits.add_argument(
+        "--max-gb-per-hour",
+        type=float,
+        default=defaults.max_bytes_per_hour / 1024**3,
+        metavar="GB",
+        help="downloaded per session per hour (default: %(default)g)",
+    )
+    limits.add_argument(
+        "--metadata-per-minute",
+        type=int,
+        default=defaults.metadata_calls_per_minute,
+        metavar="N",
+        help="info/format/transcript calls per session (default: %(default)s)",
+    )
+    limits.add_argument(
+        "--high-water",
+        type=int,
+        default=defaults.high_water,
+        metavar="N",
+        help="refuse new work while this many jobs are unfinished (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    if min(args.max_queued, args.max_gb_per_hour, args.metadata_per_minute, args.high_water) < 0:
+        parser.error("limits can't be negative")
+    global quota_limits
+    quota_limits = QuotaLimits(
+        max_queued_jobs=args.max_queued or None,
+        max_bytes_per_hour=int(args.max_gb_per_hour * 1024**3) or None,
+        metadata_calls_per_minute=args.metadata_per_minute or None,
+        high_water=args.high_water or None,
+    )
+    forwarding = not args.serve and bool(args.connect or args.socket)
+    if (args.warm_up or args.warm_up_url) and not forwarding:
+        get_manager().warm_up(args.warm_up_url)
+
+    if args.serve:
+        asyncio.run(serve(args.host, args.port, args.socket))
+    elif forwarding:
+        from yoink.mcp_server.shim import forward_stdio
+
+        url = args.connect or f"http://localhost{mcp.settings.streamable_http_path}"
+        asyncio.run(forward_stdio(url, args.socket))
+    else:
+        mcp.run(transport="stdio")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import logging
+
+import anyio
+import httpx
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.server.stdio import stdio_server
+
+
+def _client_factory(socket_path: str | None):
+    def factory(
+        headers: dict[str, str] | None = None,
+        timeout: httpx.Timeout | None = None,
+        auth: httpx.Auth | None = None,
+    ) -> httpx.AsyncClient:
+        # Same timeouts as the SDK's own client: the server holds response streams open.
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout or httpx.Timeout(30.0, read=300.0),
+            auth=auth,
+            transport=httpx.AsyncHTTPTransport(uds=socket_path) if socket_path else None,
+        )
+
+    return factory
+
+
+async def forward_stdio(url: str, socket_path: str | None = None) -> None:
+    """Relay MCP messages between this process's stdio and a shared ``yoink-mcp --serve``.
+
+    The assistant launches this as its stdio server; every launch talks to
+    the same long-lived process, so all windows share one download queue.
+    """
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per relayed request otherwise
+    async with stdio_server() as (local_in, local_out), streamablehttp_client(
+        url, httpx_client_factory=_client_factory(socket_path)
+    ) as (remote_in, remote_out, _):
+        async with anyio.create_task_group() as tg:
+
+            async def pipe(source, sink) -> None:
+                async for message in source:
+                    if not isinstance(message, Exception):
+                        await sink.send(message)
+                # Either side hanging up ends the session.
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(pipe, local_in, remote_out)
+            tg.start_soon(pipe, remote_in, local_out)
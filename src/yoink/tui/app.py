@@ -3,12 +3,14 @@ from __future__ import annotations
 import argparse
 import logging
 import shutil
+from concurrent.futures import Future
 from pathlib import Path
 
 from textual.app import App, ComposeResult
 from textual.widgets import Footer, Header
 
 from yoink.core.manager import DownloadManager
+from yoink.core.models import EngineOptions, WarmupReport
 
 from .screens.main_screen import MainScreen
 
@@ -25,27 +27,73 @@ class YoinkApp(App):
         ("ctrl+c", "quit", "Quit"),
     ]
 
-    def __init__(self, max_concurrent: int = 3) -> None:
+    def __init__(
+        self,
+        max_concurrent: int = 3,
+        request_defaults: dict | None = None,
+        postprocess_workers: int | None = None,
+        engine_options: EngineOptions | None = None,
+        warm_up: bool = False,
+        warm_up_url: str | None = None,
+    ) -> None:
         super().__init__()
-        self.manager = DownloadManager(max_concurrent=max_concurrent)
+        self.manager = DownloadManager(
+            max_concurrent=max_concurrent,
+            postprocess_workers=postprocess_workers,
+            engine_options=engine_options,
+        )
+        self.request_defaults = request_defaults or {}
+        self._warm_up = warm_up or bool(warm_up_url)
+        self._warm_up_url = warm_up_url
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield Footer()
 
     def on_mount(self) -> None:
-        self.push_screen(MainScreen(self.manager))
+        self.push_screen(MainScreen(self.manager, self.request_defaults))
         if not shutil.which("ffmpeg"):
             self.notify(
                 "ffmpeg not found. Some formats may not merge correctly.",
                 severity="warning",
                 timeout=5,
             )
+        if self._warm_up:
+            self.call_after_refresh(self._start_warm_up)
+
+    def _start_warm_up(self) -> None:
+        def _done(future: Future[WarmupReport]) -> None:
+            try:
+                self.call_from_thread(self._report_warm_up, future.result())
+            except RuntimeError:
+                pass  # app already closed
+
+        self.manager.warm_up(self._warm_up_url).add_done_callback(_done)
+
+    def _report_warm_up(self, report: WarmupReport) -> None:
+        logging.getLogger("yoink").info("warm-up: %s", report.model_dump())
+        if report.errors:
+            failed = ", ".join(report.errors)
+            self.notify(f"Warm-up finished in {report.total_seconds:.1f}s ({failed} failed)", severity="warning")
+        else:
+            self.notify(f"Warmed up in {report.total_seconds:.1f}s")
 
     def on_unmount(self) -> None:
         self.manager.shutdown()
 
 
+def _parse_size(value: str) -> int:
+    """Parse sizes like ``512K`` or ``10M`` into bytes."""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    value = value.strip().upper()
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}") from None
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         prog="yoink",
@@ -58,8 +106,77 @@ def main() -> None:
         metavar="N",
         help="max simultaneous downloads (default: 3, range: 1-10)",
     )
+    parser.add_argument(
+        "--fragments",
+        type=int,
+        default=None,
+        metavar="N",
+        help="parallel fragments per DASH/HLS download (default: auto)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=_parse_size,
+        default=None,
+        metavar="SIZE",
+        help="HTTP chunk size, e.g. 10M; 0 disables chunking (default: auto)",
+    )
+    parser.add_argument(
+        "--postprocess-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="simultaneous merges/transcodes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--staging-dir",
+        default=None,
+        metavar="DIR",
+        help="write partial files here (e.g. tmpfs) and move them into place when done",
+    )
+    parser.add_argument(
+        "--io-buffer",
+        type=_parse_size,
+        default=None,
+        metavar="SIZE",
+        help="download write buffer size, e.g. 1M (default: adaptive)",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        metavar="DIR",
+        help="content-addressed store; repeat downloads become links instead of new fetches",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        metavar="DIR",
+        help="yt-dlp cache shared by all yoink processes (default: $YOINK_CACHE_DIR or ~/.cache/yoink/yt-dlp)",
+    )
+    parser.add_argument(
+        "--no-preallocate",
+        action="store_true",
+        help="don't reserve disk space for files of known size",
+    )
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        help="load yt-dlp and resolve YouTube hosts in the background once the UI is up",
+    )
+    parser.add_argument(
+        "--warm-up-url",
+        metavar="URL",
+        default=None,
+        help="also extract this video during warm-up to prime yt-dlp's cache (implies --warm-up)",
+    )
     args = parser.parse_args()
     jobs = max(1, min(args.jobs, 10))
+    postprocess_workers = max(1, args.postprocess_workers) if args.postprocess_workers else None
+
+    request_defaults: dict = {}
+    if args.fragments is not None:
+        request_defaults["concurrent_fragments"] = max(1, min(args.fragments, 32))
+    if args.chunk_size is not None:
+        request_defaults["http_chunk_size"] = args.chunk_size
 
     logging.basicConfig(
         filename=str(Path.home() / "yoink_debug.log"),
@@ -68,7 +185,20 @@ def main() -> None:
     )
     logging.getLogger("yoink").info("=== yoink starting ===")
 
-    app = YoinkApp(max_concurrent=jobs)
+    app = YoinkApp(
+        max_concurrent=jobs,
+        request_defaults=request_defaults,
+        postprocess_workers=postprocess_workers,
+        engine_options=EngineOptions(
+            staging_dir=args.staging_dir,
+            buffer_size=max(1024, args.io_buffer) if args.io_buffer else None,
+            preallocate=not args.no_preallocate,
+            store_dir=args.store,
+            cache_dir=args.cache_dir,
+        ),
+        warm_up=args.warm_up,
+        warm_up_url=args.warm_up_url,
+    )
     app.run()
 
 
@@ -67,9 +67,10 @@ class MainScreen(Screen):
     }
     """
 
-    def __init__(self, manager: DownloadManager) -> None:
+    def __init__(self, manager: DownloadManager, request_defaults: dict | None = None) -> None:
         super().__init__()
         self.manager = manager
+        self._request_defaults = request_defaults or {}
         self._current_video: VideoInfo | None = None
         self._current_playlist: PlaylistInfo | None = None
 
@@ -143,6 +144,9 @@ class MainScreen(Screen):
     def _start_video_download(self, video: VideoInfo, fmt: FormatOption) -> None:
         if fmt.has_video and not fmt.has_audio:
             format_string = f"{fmt.format_id}+bestaudio"
+            if fmt.resolution.endswith("p"):
+                # Lets the engine swap in a muxed format of the same height and skip the merge.
+                format_string += f"/best[height>={fmt.resolution[:-1]}]"
         else:
             format_string = fmt.format_id
 
@@ -151,6 +155,7 @@ class MainScreen(Screen):
             url=video.url,
             format_string=format_string,
             output_dir=output_dir,
+            **self._request_defaults,
         )
         queue = self.query_one(DownloadQueue)
         queue.add_download(request, title=video.title)
@@ -171,6 +176,7 @@ class MainScreen(Screen):
                 url=f"https://www.youtube.com/watch?v={video.video_id}",
                 format_string=event.quality,
                 output_dir=playlist_dir,
+                **self._request_defaults,
             )
             queue.add_download(request, title=video.title)
         self.notify(f"Queued {len(event.videos)} downloads")
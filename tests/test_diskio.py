@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import errno
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from yoink.core.diskio import atomic_move, preallocate, remove_partials
+
+
+class TestAtomicMove:
+    def test_same_filesystem_rename(self, tmp_path):
+        src = tmp_path / "stage" / "video.mp4"
+        src.parent.mkdir()
+        src.write_bytes(b"data")
+        dest = tmp_path / "out" / "video.mp4"
+
+        assert atomic_move(src, dest) == 0
+        assert dest.read_bytes() == b"data"
+        assert not src.exists()
+
+    def test_cross_device_copy(self, tmp_path):
+        src = tmp_path / "video.mp4"
+        src.write_bytes(b"x" * 5000)
+        dest = tmp_path / "out" / "video.mp4"
+        real_replace = os.replace
+        calls = []
+
+        def replace(a, b):
+            calls.append((a, b))
+            if len(calls) == 1:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return real_replace(a, b)
+
+        with patch("yoink.core.diskio.os.replace", side_effect=replace):
+            copied = atomic_move(src, dest, buffer_size=1024)
+
+        assert copied == 5000
+        assert dest.read_bytes() == b"x" * 5000
+        assert not src.exists()
+        # The final rename came from a hidden temp sibling.
+        assert calls[1][0].name == ".video.mp4.yoink-tmp"
+        assert list(dest.parent.iterdir()) == [dest]
+
+    def test_no_replace_keeps_existing_file(self, tmp_path):
+        src = tmp_path / "video.mp4"
+        src.write_bytes(b"new")
+        dest = tmp_path / "out" / "video.mp4"
+        dest.parent.mkdir()
+        dest.write_bytes(b"old")
+
+        with pytest.raises(FileExistsError):
+            atomic_move(src, dest, replace=False)
+        assert dest.read_bytes() == b"old"
+        assert src.read_bytes() == b"new"
+
+        fresh = tmp_path / "out" / "other.mp4"
+        assert atomic_move(src, fresh, replace=False) == 0
+        assert fresh.read_bytes() == b"new" and not src.exists()
+
+    def test_other_errors_propagate(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            atomic_move(tmp_path / "missing", tmp_path / "out" / "x")
+
+
+class TestPreallocate:
+    def test_zero_size_is_noop(self, tmp_path):
+        f = tmp_path / "a.part"
+        f.touch()
+        assert preallocate(f, 0) is False
+
+    def test_missing_file(self, tmp_path):
+        assert preallocate(tmp_path / "missing.part", 1024) is False
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fallocate is Linux-only")
+    def test_keeps_apparent_size(self, tmp_path):
+        f = tmp_path / "a.part"
+        f.write_bytes(b"abc")
+        preallocate(f, 1024 * 1024)
+        assert f.stat().st_size == 3
+
+
+class TestRemovePartials:
+    def test_removes_sidecars_only(self, tmp_path):
+        for name in ("Talk.mp4", "Talk.mp4.part", "Talk.mp4.ytdl", "Talk.mp4.part-Frag3", "Talk.temp.mp4", "Other.mp4.part"):
+            (tmp_path / name).write_bytes(b"x")
+        assert remove_partials(tmp_path / "Talk.mp4") == 4
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["Other.mp4.part", "Talk.mp4"]
+
+    def test_merge_component(self, tmp_path):
+        for name in ("Talk.f137.mp4", "Talk.f140.m4a.part", "Talk.temp.mkv"):
+            (tmp_path / name).write_bytes(b"x")
+        remove_partials(tmp_path / "Talk.f137.mp4", format_id="137")
+        remove_partials(tmp_path / "Talk.f140.m4a", format_id="140")
+        assert list(tmp_path.iterdir()) == []
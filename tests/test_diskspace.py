@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+from collections import namedtuple
+from unittest.mock import patch
+
+import pytest
+
+from yoink.core.diskspace import DiskSpaceGuard, InsufficientDiskSpace, estimate_bytes
+
+_Usage = namedtuple("_Usage", "total used free")
+GB = 1024**3
+
+
+def _free(nbytes):
+    return patch("yoink.core.diskspace.shutil.disk_usage", return_value=_Usage(0, 0, nbytes))
+
+
+class TestEstimateBytes:
+    def test_filesize(self):
+        assert estimate_bytes({"filesize": 1000}) == 1000
+
+    def test_filesize_approx(self):
+        assert estimate_bytes({"filesize_approx": 2000}) == 2000
+
+    def test_bitrate_times_duration(self):
+        assert estimate_bytes({"tbr": 800, "duration": 10}) == 1_000_000
+
+    def test_merge_counts_twice(self):
+        info = {"requested_formats": [{"filesize": 700}, {"filesize": 300}]}
+        assert estimate_bytes(info) == 2000
+        assert estimate_bytes(info, merge_overhead=False) == 1000
+
+    def test_unknown(self):
+        assert estimate_bytes({}) == 0
+
+
+class TestDiskSpaceGuard:
+    def test_reserve_when_room(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        with _free(10 * GB):
+            assert guard.reserve("a", [str(tmp_path)], 1 * GB) is True
+        [r] = guard.reservations()
+        assert r.download_id == "a"
+        assert r.outstanding_bytes == GB
+
+    def test_same_filesystem_reserved_once(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        with _free(10 * GB):
+            guard.reserve("a", [str(tmp_path), str(tmp_path / "sub")], GB)
+        assert len(guard.reservations()) == 1
+
+    def test_never_fits_raises(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        with _free(GB), pytest.raises(InsufficientDiskSpace, match="Not enough disk space"):
+            guard.reserve("a", [str(tmp_path)], 2 * GB)
+
+    def test_waits_for_release(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        admitted = threading.Event()
+        with _free(3 * GB):
+            guard.reserve("a", [str(tmp_path)], 2 * GB)
+
+            def second():
+                guard.reserve("b", [str(tmp_path)], 2 * GB, poll=0.05)
+                admitted.set()
+
+            t = threading.Thread(target=second)
+            t.start()
+            assert not admitted.wait(0.2)
+            guard.release("a")
+            assert admitted.wait(2)
+            t.join()
+        assert [r.download_id for r in guard.reservations()] == ["b"]
+
+    def test_written_bytes_shrink_reservation(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        with _free(10 * GB):
+            guard.reserve("a", [str(tmp_path)], GB)
+        guard.update("a", GB // 4)
+        assert guard.reservations()[0].outstanding_bytes == GB - GB // 4
+
+    def test_cancelled_while_waiting(self, tmp_path):
+        guard = DiskSpaceGuard(margin=0)
+        cancelled = threading.Event()
+        with _free(3 * GB):
+            guard.reserve("a", [str(tmp_path)], 2 * GB)
+            cancelled.set()
+            assert guard.reserve("b", [str(tmp_path)], 2 * GB, cancelled=cancelled.is_set) is False
+
+    def test_zero_estimate_always_admitted(self, tmp_path):
+        guard = DiskSpaceGuard()
+        with _free(0):
+            assert guard.reserve("a", [str(tmp_path)], 0) is True
@@ -1,12 +1,39 @@
 from __future__ import annotations
 
+import subprocess
+import sys
 import threading
+import time
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from yoink.core.engine import DownloadCancelled, DownloadEngine
-from yoink.core.models import DownloadProgress, DownloadRequest, DownloadStatus
+from yoink.core.engine import (
+    DEFAULT_CHUNK_SIZE,
+    MAX_FRAGMENTS_PER_JOB,
+    MAX_RESTARTS,
+    DownloadCancelled,
+    DownloadEngine,
+    audio_action,
+    auto_fragment_settings,
+    clip_sections,
+    muxed_equivalent,
+)
+from yoink.core.models import DownloadProgress, DownloadRequest, DownloadStatus, EngineOptions
+from yoink.core.streamcache import SharedStreamCache
+from yoink.core.watchdog import StallWatchdog
+from yt_dlp.utils import Popen
+
+
+MUXED_FORMATS = [
+    {"format_id": "22", "url": "http://x/22", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a",
+     "height": 720, "fps": 30, "tbr": 1000},
+    {"format_id": "136", "url": "http://x/136", "ext": "mp4", "vcodec": "avc1", "acodec": "none",
+     "height": 720, "fps": 30, "tbr": 1500},
+    {"format_id": "140", "url": "http://x/140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a",
+     "tbr": 128},
+]
 
 
 @pytest.fixture
@@ -77,6 +104,49 @@ class TestDownloadEngine:
         result = engine.run()
         assert result.status == DownloadStatus.CANCELLED
 
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_restart_after_stall(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+        calls = []
+
+        def stall_once(urls):
+            calls.append(urls)
+            if len(calls) == 1:
+                engine.request_restart("no progress for 30s")
+                engine._progress_hook({"status": "downloading", "downloaded_bytes": 10})
+
+        mock_ydl.download.side_effect = stall_once
+
+        engine = DownloadEngine(dl_request)
+        result = engine.run()
+        assert result.status == DownloadStatus.FINISHED
+        assert len(calls) == 2
+        assert result.stall_count == 1
+        assert result.restart_count == 1
+        assert result.stall_reason == "no progress for 30s"
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_gives_up_after_repeated_stalls(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+
+        def always_stall(urls):
+            engine.request_restart("throttled")
+            engine._progress_hook({"status": "downloading"})
+
+        mock_ydl.download.side_effect = always_stall
+
+        engine = DownloadEngine(dl_request)
+        result = engine.run()
+        assert result.status == DownloadStatus.ERROR
+        assert "stalling" in result.error
+        assert result.restart_count == MAX_RESTARTS
+
     def test_progress_hook_downloading(self, dl_request):
         progress_updates = []
         engine = DownloadEngine(dl_request, callback=progress_updates.append)
@@ -180,6 +250,777 @@ class TestDownloadEngine:
         engine._emit_progress(force=True)
         assert len(updates) == count_after_first + 1
 
+    def test_fail_reports_error(self, dl_request):
+        updates = []
+        engine = DownloadEngine(dl_request, callback=updates.append)
+        result = engine.fail("Not enough disk space")
+        assert result.status == DownloadStatus.ERROR
+        assert updates[-1].error == "Not enough disk space"
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_prepare_extracts_once(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Prepared", "filesize": 10}
+
+        engine = DownloadEngine(dl_request)
+        assert engine.prepare()["title"] == "Prepared"
+        result = engine.run()
+        assert mock_ydl.extract_info.call_count == 1
+        assert result.title == "Prepared"
+
     def test_no_callback(self, dl_request):
         engine = DownloadEngine(dl_request, callback=None)
         engine._emit_progress(force=True)
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_fragment_options_auto(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+
+        engine = DownloadEngine(dl_request)
+        engine.auto_fragments, engine.auto_chunk_size = 4, 1024
+        engine.run()
+
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["concurrent_fragment_downloads"] == 4
+        assert opts["http_chunk_size"] == 1024
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_fragment_options_explicit(self, mock_ydl_cls, dl_request):
+        req = dl_request.model_copy(update={"concurrent_fragments": 6, "http_chunk_size": 0})
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+
+        engine = DownloadEngine(req)
+        engine.run()
+
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["concurrent_fragment_downloads"] == 6
+        assert "http_chunk_size" not in opts
+
+    def test_progress_aggregates_streams(self, dl_request):
+        engine = DownloadEngine(dl_request)
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.f137.mp4",
+            "downloaded_bytes": 600, "total_bytes": 1000,
+        })
+        engine._progress_hook({
+            "status": "downloading", "filename": "a.f140.m4a",
+            "downloaded_bytes": 100, "total_bytes": 1000,
+        })
+        assert engine._progress.downloaded_bytes == 700
+        assert engine._progress.total_bytes == 2000
+
+        engine._progress_hook({
+            "status": "finished", "filename": "v.f137.mp4", "total_bytes": 1000,
+        })
+        assert engine._progress.status == DownloadStatus.DOWNLOADING
+        assert engine._progress.percent < 100.0
+
+    def test_merge_waits_for_last_component(self, dl_request):
+        engine = DownloadEngine(dl_request)
+        engine._info = {"requested_formats": [
+            {"format_id": "137", "filesize": 1000},
+            {"format_id": "140", "filesize_approx": 1000},
+        ]}
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.f137.mp4",
+            "downloaded_bytes": 500, "total_bytes": 1000,
+        })
+        assert engine._progress.percent == pytest.approx(25.0)
+
+        # The video finishing before the audio has started is not the end.
+        engine._progress_hook({"status": "finished", "filename": "v.f137.mp4", "total_bytes": 1000})
+        assert engine._progress.status == DownloadStatus.DOWNLOADING
+        assert engine._progress.percent == pytest.approx(50.0)
+
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.f140.m4a",
+            "downloaded_bytes": 500, "total_bytes": 1000,
+        })
+        assert engine._progress.status == DownloadStatus.DOWNLOADING
+        assert engine._progress.percent == pytest.approx(75.0)
+
+        engine._progress_hook({"status": "finished", "filename": "v.f140.m4a", "total_bytes": 1000})
+        assert engine._progress.status == DownloadStatus.MERGING
+        assert engine._progress.percent == 100.0
+
+    def test_subtitles_do_not_count_as_components(self, dl_request):
+        dl_request.download_subtitles = True
+        engine = DownloadEngine(dl_request)
+        engine._info = {
+            "requested_formats": [
+                {"format_id": "137", "filesize": 1000},
+                {"format_id": "140", "filesize": 1000},
+            ],
+            "requested_subtitles": {"en": {"ext": "vtt", "url": "https://example.com/en.vtt"}},
+        }
+        # yt-dlp writes the captions before any media.
+        engine._progress_hook({
+            "status": "finished", "filename": "v.en.vtt", "total_bytes": 50,
+            "info_dict": {"ext": "vtt", "url": "https://example.com/en.vtt"},
+        })
+        assert engine._progress.status != DownloadStatus.MERGING
+        assert engine._progress.percent < 100.0
+
+        engine._progress_hook({
+            "status": "finished", "filename": "v.f137.mp4", "total_bytes": 1000,
+            "info_dict": {"format_id": "137"},
+        })
+        assert engine._progress.total_bytes == 2000
+        assert engine._progress.status != DownloadStatus.MERGING
+        assert engine._progress.percent == pytest.approx(50.0)
+
+        engine._progress_hook({
+            "status": "finished", "filename": "v.f140.m4a", "total_bytes": 1000,
+            "info_dict": {"format_id": "140"},
+        })
+        assert engine._progress.status == DownloadStatus.MERGING
+        assert engine._progress.output_path == "v.f140.m4a"
+
+    def test_subtitles_do_not_finish_single_format(self, dl_request):
+        dl_request.download_subtitles = True
+        engine = DownloadEngine(dl_request)
+        engine._info = {"format_id": "22"}
+        engine._progress_hook({"status": "finished", "filename": "v.en.vtt", "total_bytes": 50})
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.mp4",
+            "downloaded_bytes": 250, "total_bytes": 1000,
+        })
+        assert engine._progress.status == DownloadStatus.DOWNLOADING
+        assert engine._progress.percent == pytest.approx(25.0)
+        engine._progress_hook({"status": "finished", "filename": "v.mp4", "total_bytes": 1000})
+        assert engine._progress.status == DownloadStatus.MERGING
+
+    def test_progress_out_of_order_fragments(self, dl_request):
+        engine = DownloadEngine(dl_request)
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.mp4",
+            "downloaded_bytes": 800, "total_bytes_estimate": 1000,
+        })
+        # A slower fragment thread reports a stale count afterwards.
+        engine._progress_hook({
+            "status": "downloading", "filename": "v.mp4",
+            "downloaded_bytes": 500, "total_bytes_estimate": 1100,
+        })
+        assert engine._progress.downloaded_bytes == 800
+        assert engine._progress.percent == pytest.approx(80.0)
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_stage_timings_recorded(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+
+        result = DownloadEngine(dl_request).run()
+        assert {"queued", "extract", "download"} <= set(result.stage_timings)
+        assert "postprocess" not in result.stage_timings
+
+    def test_postprocess_releases_download_slot(self, dl_request):
+        released = []
+        slot = threading.Semaphore(1)
+        engine = DownloadEngine(
+            dl_request,
+            on_downloaded=lambda: released.append(engine._holds_postprocess_slot),
+            postprocess_slot=slot,
+        )
+        engine._progress_hook({"status": "finished", "filename": "/tmp/v.mp4"})
+        engine._postprocessor_hook({"status": "started", "postprocessor": "Merger"})
+        engine._postprocessor_hook({"status": "started", "postprocessor": "MoveFiles"})
+
+        # The download slot was handed back before the CPU slot was taken.
+        assert released == [False]
+        assert engine._holds_postprocess_slot is True
+        assert slot.acquire(blocking=False) is False
+        assert engine._stage == "postprocess"
+
+    def test_postprocess_before_download_keeps_slot(self, dl_request):
+        released = []
+        engine = DownloadEngine(dl_request, on_downloaded=lambda: released.append(True))
+        engine._postprocessor_hook({"status": "started"})
+        assert released == []
+
+    def test_postprocess_wait_cancellable(self, dl_request):
+        slot = threading.Semaphore(0)
+        engine = DownloadEngine(dl_request, postprocess_slot=slot)
+        engine._progress_hook({"status": "finished", "filename": "/tmp/v.mp4"})
+        engine.cancel()
+        with pytest.raises(DownloadCancelled):
+            engine._enter_postprocess()
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_audio_passthrough_options(self, mock_ydl_cls, dl_request):
+        req = dl_request.model_copy(
+            update={"convert_to_mp3": True, "accept_audio_codecs": ["opus", "m4a"]}
+        )
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test", "ext": "webm", "acodec": "opus"}
+
+        engine = DownloadEngine(req)
+        engine.transcode_threads = 2
+        engine.run()
+
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["format"].startswith("bestaudio[acodec=opus]/bestaudio[ext=m4a]")
+        pp = next(p for p in opts["postprocessors"] if p["key"] == "FFmpegExtractAudio")
+        assert pp["preferredcodec"] == "webm>opus/opus>opus/m4a>m4a/mp3"
+        assert opts["postprocessor_args"]["extractaudio+ffmpeg"] == ["-threads", "2"]
+        assert engine.audio_action == "remux"
+
+    def test_remux_records_encode_savings(self, dl_request):
+        engine = DownloadEngine(dl_request)
+        engine.audio_action = "remux"
+        engine.media_duration = 600
+        engine.transcode_rate = 0.05
+        engine._progress_hook({"status": "finished", "filename": "/tmp/a.webm"})
+        engine._postprocessor_hook({"status": "started", "postprocessor": "ExtractAudio"})
+        assert engine._stage == "remux"
+        engine._postprocessor_hook({"status": "finished", "postprocessor": "ExtractAudio"})
+
+        timings = engine._progress.stage_timings
+        assert "remux" in timings
+        assert timings["encode_saved"] == pytest.approx(30.0, abs=0.1)
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_stream_direct_http(self, mock_ydl_cls, dl_request):
+        req = dl_request.model_copy(update={"output_mode": "stream", "http_chunk_size": 4})
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        payload = b"0123456789"
+        mock_ydl.extract_info.return_value = {
+            "title": "Test", "url": "https://media/x", "protocol": "https", "filesize": 10,
+        }
+
+        def urlopen(request):
+            start, end = map(int, request.headers["Range"][6:].split("-"))
+            response = MagicMock()
+            response.read.side_effect = [payload[start:end + 1], b""]
+            return response
+
+        mock_ydl.urlopen.side_effect = urlopen
+        sink = MagicMock()
+        engine = DownloadEngine(req, sink=sink)
+        result = engine.run()
+
+        assert result.status == DownloadStatus.FINISHED
+        assert b"".join(c.args[0] for c in sink.write.call_args_list) == payload
+        assert mock_ydl.urlopen.call_count == 3
+        mock_ydl.download.assert_not_called()
+        sink.close.assert_called_once()
+        assert result.output_path is None
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_stream_merge_falls_back_to_temp_file(self, mock_ydl_cls, dl_request):
+        req = dl_request.model_copy(update={"output_mode": "stream"})
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test", "requested_formats": [{}, {}]}
+        sink = MagicMock()
+        engine = DownloadEngine(req, sink=sink)
+
+        def download(urls):
+            outtmpl = mock_ydl_cls.call_args[0][0]["outtmpl"]
+            merged = Path(outtmpl).parent / "merged.mp4"
+            merged.write_bytes(b"merged-bytes")
+            engine._postprocessor_hook({"status": "finished", "info_dict": {"filepath": str(merged)}})
+
+        mock_ydl.download.side_effect = download
+        result = engine.run()
+
+        assert result.status == DownloadStatus.FINISHED
+        sink.write.assert_called_once_with(b"merged-bytes")
+        stream_dir = Path(mock_ydl_cls.call_args[0][0]["outtmpl"]).parent
+        assert not stream_dir.exists()
+
+    def test_stream_without_target_errors(self, dl_request):
+        engine = DownloadEngine(dl_request.model_copy(update={"output_mode": "stream"}))
+        with pytest.raises(ValueError):
+            engine._open_sink()
+
+    def test_stream_broken_pipe_after_cancel(self, dl_request):
+        sink = MagicMock()
+        sink.write.side_effect = BrokenPipeError()
+        engine = DownloadEngine(dl_request, sink=sink)
+        with pytest.raises(RuntimeError, match="closed the pipe"):
+            engine._write_chunk(sink, b"x")
+        engine._cancel_event.set()
+        with pytest.raises(DownloadCancelled):
+            engine._write_chunk(sink, b"x")
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_staging_dir_finalizes_into_output_dir(self, mock_ydl_cls, tmp_path):
+        req = DownloadRequest(
+            url="https://www.youtube.com/watch?v=test123",
+            download_id="stage1",
+            output_dir=str(tmp_path / "library"),
+        )
+        options = EngineOptions(staging_dir=str(tmp_path / "fast"), buffer_size=65536)
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+        engine = DownloadEngine(req, options=options)
+
+        def download(urls):
+            outtmpl = Path(mock_ydl_cls.call_args[0][0]["outtmpl"])
+            assert not (tmp_path / "library").exists()
+            done = outtmpl.parent / "Test.mp4"
+            done.write_bytes(b"video")
+            time.sleep(0.01)
+            engine._progress_hook({"status": "downloading", "filename": str(done),
+                                   "downloaded_bytes": 5, "total_bytes": 5})
+            engine._postprocessor_hook({"status": "finished", "info_dict": {"filepath": str(done)}})
+
+        mock_ydl.download.side_effect = download
+        result = engine.run()
+
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["outtmpl"].startswith(str(tmp_path / "fast"))
+        assert opts["buffersize"] == 65536
+        assert opts["noresizebuffer"] is True
+        assert result.status == DownloadStatus.FINISHED
+        assert result.output_path == str(tmp_path / "library" / "Test.mp4")
+        assert (tmp_path / "library" / "Test.mp4").read_bytes() == b"video"
+        assert list((tmp_path / "fast").iterdir()) == []
+        assert "finalize" in result.stage_timings
+        assert result.disk_throughput is not None
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_staging_dir_never_overwrites_existing_output(self, mock_ydl_cls, tmp_path):
+        library = tmp_path / "library"
+        library.mkdir()
+        (library / "Test.mp4").write_bytes(b"original")
+        req = DownloadRequest(
+            url="https://www.youtube.com/watch?v=test123",
+            download_id="stage2",
+            output_dir=str(library),
+        )
+        options = EngineOptions(staging_dir=str(tmp_path / "fast"))
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+        engine = DownloadEngine(req, options=options)
+
+        def download(urls):
+            done = Path(mock_ydl_cls.call_args[0][0]["outtmpl"]).parent / "Test.mp4"
+            done.write_bytes(b"video")
+            engine._postprocessor_hook({"status": "finished", "info_dict": {"filepath": str(done)}})
+
+        mock_ydl.download.side_effect = download
+        result = engine.run()
+
+        assert result.status == DownloadStatus.FINISHED
+        assert (library / "Test.mp4").read_bytes() == b"original"
+        assert result.output_path == str(library / "Test (1).mp4")
+        assert (library / "Test (1).mp4").read_bytes() == b"video"
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_store_miss_then_hit(self, mock_ydl_cls, tmp_path):
+        options = EngineOptions(store_dir=str(tmp_path / "store"))
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test", "id": "abc123", "format_id": "22"}
+
+        def download(urls):
+            done = tmp_path / "a" / "Test.mp4"
+            done.write_bytes(b"video")
+            engine._postprocessor_hook({"status": "finished", "info_dict": {"filepath": str(done)}})
+
+        mock_ydl.download.side_effect = download
+        engine = DownloadEngine(
+            DownloadRequest(url="https://x/abc123", download_id="s1", output_dir=str(tmp_path / "a")),
+            options=options,
+        )
+        first = engine.run()
+        assert first.store_hit is False
+        assert mock_ydl.download.call_count == 1
+
+        mock_ydl.prepare_filename.return_value = str(tmp_path / "b" / "Test.mp4")
+        engine = DownloadEngine(
+            DownloadRequest(url="https://x/abc123", download_id="s2", output_dir=str(tmp_path / "b")),
+            options=options,
+        )
+        second = engine.run()
+
+        assert mock_ydl.download.call_count == 1
+        assert second.status == DownloadStatus.FINISHED
+        assert second.store_hit is True
+        assert second.output_path == str(tmp_path / "b" / "Test.mp4")
+        assert (tmp_path / "b" / "Test.mp4").read_bytes() == b"video"
+        assert "store_link" in second.stage_timings
+
+    def test_store_key_distinguishes_audio(self, tmp_path):
+        options = EngineOptions(store_dir=str(tmp_path))
+        info = {"id": "abc", "format_id": "251"}
+        video = DownloadEngine(DownloadRequest(url="u", download_id="v"), options=options)
+        audio = DownloadEngine(
+            DownloadRequest(url="u", download_id="a", convert_to_mp3=True, accept_audio_codecs=["opus"]),
+            options=options,
+        )
+        assert video._store_key(info) == ("abc", "251")
+        assert audio._store_key(info) == ("abc", "251~audio-opus")
+        assert DownloadEngine(DownloadRequest(url="u"))._store_key(info) is None
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_clip_download(self, mock_ydl_cls, tmp_path):
+        req = DownloadRequest(
+            url="https://x/abc", download_id="clip1", output_dir=str(tmp_path),
+            start_time="1:00", end_time="2:30",
+        )
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {
+            "title": "Lecture", "id": "abc", "duration": 600, "filesize": 6000,
+        }
+        mock_ydl.prepare_filename.return_value = str(tmp_path / "Lecture.mp4")
+        engine = DownloadEngine(req, callback=MagicMock())
+        seen = []
+
+        def download(urls):
+            part = tmp_path / "Lecture [60.0].mp4.part"
+            part.write_bytes(b"x" * 750)
+            deadline = time.time() + 5
+            while engine._progress.downloaded_bytes < 750 and time.time() < deadline:
+                time.sleep(0.05)
+            with engine._progress_lock:
+                seen.append(engine._progress.percent)
+            part.rename(tmp_path / "Lecture [60.0].mp4")
+            engine._progress_hook({"status": "finished", "filename": str(tmp_path / "Lecture [60.0].mp4"),
+                                   "downloaded_bytes": 750, "total_bytes": 750})
+
+        mock_ydl.download.side_effect = download
+        with patch("yoink.core.engine.CLIP_POLL_INTERVAL", 0.01):
+            result = engine.run()
+
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["download_ranges"].ranges == [(60.0, 150.0)]
+        assert opts["outtmpl"].endswith("%(title)s [%(section_title,section_start)s].%(ext)s")
+        assert engine.clip_fraction == 0.15
+        assert engine.clip_bytes == 900
+        assert seen == [pytest.approx(750 / 900 * 100)]
+        assert result.status == DownloadStatus.FINISHED
+        assert result.output_path == str(tmp_path / "Lecture [60.0].mp4")
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_clip_unmatched_chapter_fails(self, mock_ydl_cls, tmp_path):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "T", "duration": 60, "chapters": []}
+        req = DownloadRequest(url="u", output_dir=str(tmp_path), chapters=["Outro"])
+        result = DownloadEngine(req).run()
+        assert result.status == DownloadStatus.ERROR
+        assert "No chapters match Outro" in result.error
+        mock_ydl.download.assert_not_called()
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_prepare_reuses_cached_info(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.sanitize_info.side_effect = lambda info, remove_private_keys: info
+        mock_ydl.process_ie_result.return_value = {"title": "Cached", "format_id": "18"}
+        engine = DownloadEngine(dl_request)
+        engine.cached_info = {"id": "test123", "title": "Cached", "formats": []}
+
+        info = engine.prepare()
+
+        assert info["format_id"] == "18"
+        mock_ydl.extract_info.assert_not_called()
+        mock_ydl.process_ie_result.assert_called_once()
+        assert engine._progress.title == "Cached"
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_download_starts_from_cached_info(self, mock_ydl_cls, tmp_path):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.sanitize_info.side_effect = lambda info, remove_private_keys: info
+        mock_ydl.process_ie_result.return_value = {"title": "Cached", "format_id": "18"}
+        engine = DownloadEngine(DownloadRequest(url="https://youtu.be/abc", output_dir=str(tmp_path)))
+        engine.cached_info = {"id": "abc", "title": "Cached", "formats": []}
+
+        result = engine.run()
+
+        assert result.status == DownloadStatus.FINISHED
+        mock_ydl.extract_info.assert_not_called()
+        mock_ydl.download.assert_not_called()
+        assert mock_ydl.process_ie_result.call_args_list[-1].kwargs == {"download": True}
+
+    @pytest.mark.parametrize("format_string, expected, avoided", [
+        ("bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best", "22", True),
+        ("136+bestaudio/best[height>=720]", "22", True),
+        ("136+140", "136+140", False),
+    ])
+    def test_prepare_avoids_merge_when_muxed_equivalent(self, format_string, expected, avoided):
+        req = DownloadRequest(url="http://x/abc", format_string=format_string)
+        engine = DownloadEngine(req)
+        engine.cached_info = {
+            "id": "abc", "title": "T", "extractor": "generic", "extractor_key": "Generic",
+            "webpage_url": "http://x/abc", "formats": MUXED_FORMATS,
+        }
+
+        info = engine.prepare()
+
+        assert info["format_id"] == expected
+        assert engine._format_string() == (expected if avoided else format_string)
+        assert engine._progress.merge_avoided is avoided
+
+    def test_merge_avoidance_can_be_disabled(self):
+        req = DownloadRequest(url="http://x/abc")
+        engine = DownloadEngine(req, options=EngineOptions(avoid_merges=False))
+        engine.cached_info = {
+            "id": "abc", "title": "T", "extractor": "generic", "extractor_key": "Generic",
+            "webpage_url": "http://x/abc", "formats": MUXED_FORMATS,
+        }
+        assert engine.prepare()["format_id"] == "136+140"
+
+    def test_shared_stream_linked_into_place(self, dl_request, tmp_path):
+        cache = SharedStreamCache(tmp_path / "cache")
+        cache.register(("abc", "140"))
+        cache.register(("abc", "140"))
+        cache.register(("abc", "137"))
+        engine = DownloadEngine(dl_request)
+        engine.stream_cache = cache
+        info = {
+            "id": "abc", "ext": "mp4",
+            "requested_formats": [
+                {"format_id": "137", "ext": "mp4"},
+                {"format_id": "140", "ext": "m4a"},
+            ],
+        }
+        ydl = MagicMock()
+        ydl.prepare_filename.return_value = str(tmp_path / "out" / "My.Video.mp4")
+
+        def fetch(info, fmt, target):
+            path = target / f"stream.{fmt['ext']}"
+            path.write_bytes(b"audio")
+            return path
+
+        with patch.object(engine, "_fetch_component", side_effect=fetch) as fetch_mock:
+            engine._use_shared_streams(ydl, info, tmp_path / "out")
+
+        fetch_mock.assert_called_once()
+        assert fetch_mock.call_args[0][1]["format_id"] == "140"
+        assert (tmp_path / "out" / "My.Video.f140.m4a").read_bytes() == b"audio"
+        assert not (tmp_path / "out" / "My.Video.f137.mp4").exists()
+
+    def test_waiting_on_shared_stream_is_not_a_stall(self, dl_request, tmp_path):
+        cache = SharedStreamCache(tmp_path / "cache")
+        key = ("abc", "140")
+        cache.register(key)
+        cache.register(key)
+        release = threading.Event()
+
+        def slow_fetch(target):
+            release.wait(5)
+            path = target / "stream.m4a"
+            path.write_bytes(b"audio")
+            return path
+
+        owner = threading.Thread(target=cache.fetch, args=(key, slow_fetch))
+        owner.start()
+        engine = DownloadEngine(dl_request)
+        engine.stream_cache = cache
+        engine._begin_stage("download")
+        ydl = MagicMock()
+        ydl.prepare_filename.return_value = str(tmp_path / "out" / "V.m4a")
+        info = {"id": "abc", "format_id": "140", "ext": "m4a"}
+        waiter = threading.Thread(target=engine._use_shared_streams, args=(ydl, info, tmp_path / "out"))
+        waiter.start()
+        deadline = time.monotonic() + 2
+        while engine.stage != "shared_wait" and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        watchdog = StallWatchdog(stall_timeout=1)
+        watchdog.watch(engine)
+        assert watchdog.check(time.monotonic() + 100) == []
+
+        release.set()
+        owner.join(2)
+        waiter.join(2)
+        assert engine.stage == "download"
+        assert (tmp_path / "out" / "V.m4a").read_bytes() == b"audio"
+
+    @patch("yoink.core.engine.preallocate")
+    def test_preallocates_once_per_file(self, mock_prealloc, dl_request):
+        engine = DownloadEngine(dl_request)
+        for done in (10, 20):
+            engine._progress_hook({
+                "status": "downloading", "filename": "v.mp4", "tmpfilename": "v.mp4.part",
+                "downloaded_bytes": done, "total_bytes": 100,
+            })
+        engine._progress_hook({
+            "status": "downloading", "filename": "a.m4a", "tmpfilename": "a.m4a.part",
+            "downloaded_bytes": 10, "total_bytes_estimate": 100,
+        })
+        mock_prealloc.assert_called_once_with("v.mp4.part", 100)
+
+
+class TestCancelLatency:
+    def _run_in_thread(self, engine):
+        result = {}
+        thread = threading.Thread(target=lambda: result.setdefault("progress", engine.run()))
+        thread.start()
+        return thread, result
+
+    def _cancel_and_time(self, engine, thread):
+        start = time.monotonic()
+        engine.cancel()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        return time.monotonic() - start
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_cancel_abandons_extraction(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_extract(url, download=False):
+            entered.set()
+            release.wait(10)
+            return {"title": "Test"}
+
+        mock_ydl.extract_info.side_effect = slow_extract
+        engine = DownloadEngine(dl_request)
+        thread, result = self._run_in_thread(engine)
+        try:
+            assert entered.wait(2)
+            assert self._cancel_and_time(engine, thread) < 0.5
+        finally:
+            release.set()
+        assert result["progress"].status == DownloadStatus.CANCELLED
+        mock_ydl.download.assert_not_called()
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_cancel_kills_ffmpeg(self, mock_ydl_cls, dl_request):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Test"}
+        started = threading.Event()
+
+        def merge(urls):
+            # Stands in for yt-dlp running ffmpeg through its Popen wrapper.
+            proc = Popen([sys.executable, "-c", "import time; time.sleep(30)"], stdout=subprocess.DEVNULL)
+            started.set()
+            if proc.wait() != 0:
+                raise RuntimeError("ffmpeg exited with code -9")
+
+        mock_ydl.download.side_effect = merge
+        engine = DownloadEngine(dl_request)
+        thread, result = self._run_in_thread(engine)
+        assert started.wait(5)
+        assert self._cancel_and_time(engine, thread) < 2
+        assert result["progress"].status == DownloadStatus.CANCELLED
+        assert result["progress"].error is None
+
+    @patch("yoink.core.engine.yt_dlp.YoutubeDL")
+    def test_cancel_removes_partial_files(self, mock_ydl_cls, tmp_path):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {
+            "title": "Talk",
+            "requested_formats": [{"format_id": "137"}, {"format_id": "140"}],
+        }
+        request = DownloadRequest(url="http://example.com", download_id="c1", output_dir=str(tmp_path))
+        engine = DownloadEngine(request, options=EngineOptions(avoid_merges=False))
+        (tmp_path / "Earlier.mp4").write_bytes(b"keep")
+
+        def download(urls):
+            audio = tmp_path / "Talk.f140.m4a"
+            audio.write_bytes(b"a")
+            engine._progress_hook({"status": "finished", "filename": str(audio), "downloaded_bytes": 1})
+            video = tmp_path / "Talk.f137.mp4"
+            (tmp_path / "Talk.f137.mp4.part").write_bytes(b"v")
+            engine.cancel()
+            engine._progress_hook({"status": "downloading", "filename": str(video), "downloaded_bytes": 1})
+
+        mock_ydl.download.side_effect = download
+        result = engine.run()
+        assert result.status == DownloadStatus.CANCELLED
+        assert [p.name for p in tmp_path.iterdir()] == ["Earlier.mp4"]
+
+
+class TestAudioAction:
+    def test_m4a_accepted(self):
+        assert audio_action({"ext": "m4a", "acodec": "mp4a.40.2"}, ["m4a"]) == "remux"
+
+    def test_opus_accepted(self):
+        assert audio_action({"ext": "webm", "acodec": "opus"}, ["opus"]) == "remux"
+
+    def test_not_accepted_transcodes(self):
+        assert audio_action({"ext": "webm", "acodec": "opus"}, ["m4a"]) == "transcode"
+        assert audio_action({"ext": "m4a", "acodec": "mp4a.40.2"}, []) == "transcode"
+
+
+class TestAutoFragmentSettings:
+    def test_single_job_gets_cap(self):
+        fragments, chunk = auto_fragment_settings(1, 3)
+        assert fragments == MAX_FRAGMENTS_PER_JOB
+        assert chunk == DEFAULT_CHUNK_SIZE
+
+    def test_budget_shared_across_jobs(self):
+        assert auto_fragment_settings(4, 10)[0] == 4
+        assert auto_fragment_settings(10, 10)[0] == 1
+
+    def test_running_clamped_to_concurrency(self):
+        assert auto_fragment_settings(8, 2)[0] == MAX_FRAGMENTS_PER_JOB
+
+
+class TestClipSections:
+    INFO = {
+        "duration": 300,
+        "chapters": [
+            {"title": "Intro", "start_time": 0, "end_time": 30},
+            {"title": "Q&A", "start_time": 240, "end_time": 300},
+        ],
+    }
+
+    def test_chapters_and_range(self):
+        req = DownloadRequest(url="u", chapters=["^Q&A$"], start_time=100, end_time=120)
+        assert clip_sections(self.INFO, req) == [(240, 300), (100, 120)]
+
+    def test_open_ended_range_stops_at_duration(self):
+        req = DownloadRequest(url="u", start_time=200)
+        assert clip_sections(self.INFO, req) == [(200, 300)]
+
+    def test_no_match(self):
+        assert clip_sections(self.INFO, DownloadRequest(url="u", chapters=["Outro"])) == []
+
+
+class TestMuxedEquivalent:
+    def _info(self, *formats, requested=("136", "140")):
+        by_id = {f["format_id"]: f for f in formats}
+        return {"formats": list(formats), "requested_formats": [by_id[i] for i in requested]}
+
+    def test_same_height(self):
+        assert muxed_equivalent(self._info(*MUXED_FORMATS))["format_id"] == "22"
+
+    def test_lower_height_rejected(self):
+        video = {**MUXED_FORMATS[1], "height": 1080}
+        assert muxed_equivalent(self._info(MUXED_FORMATS[0], video, MUXED_FORMATS[2])) is None
+
+    def test_lower_fps_rejected(self):
+        video = {**MUXED_FORMATS[1], "fps": 60}
+        assert muxed_equivalent(self._info(MUXED_FORMATS[0], video, MUXED_FORMATS[2])) is None
+
+    def test_not_a_merge(self):
+        assert muxed_equivalent({"formats": MUXED_FORMATS, "format_id": "22"}) is None
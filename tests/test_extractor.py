@@ -4,7 +4,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from yoink.core.extractor import MetadataExtractor
+from yoink.core.extractor import PROFILES, MetadataExtractor, playlist_indices, profile_for
 from yoink.core.models import FormatOption
 
 
@@ -172,3 +172,137 @@ class TestFormatParsing:
         assert MetadataExtractor._res_sort_key(f1080) == 1080
         assert MetadataExtractor._res_sort_key(f720) == 720
         assert MetadataExtractor._res_sort_key(f_bad) == 0
+
+
+class TestExtractionCache:
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_reuses_recent_extraction(self, mock_ydl_cls):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"id": "abc", "title": "T", "formats": []}
+        extractor = MetadataExtractor()
+
+        assert extractor.is_playlist("https://youtu.be/abc") is False
+        extractor.extract_video_info("https://youtu.be/abc")
+        extractor.extract_formats("https://youtu.be/abc")
+
+        assert mock_ydl.extract_info.call_count == 1
+        assert extractor.cached("https://youtu.be/abc")["id"] == "abc"
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_expired_entries_are_refetched(self, mock_ydl_cls):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"id": "abc", "title": "T"}
+        extractor = MetadataExtractor(cache_ttl=0)
+
+        extractor.extract_raw("https://youtu.be/abc")
+        extractor.extract_raw("https://youtu.be/abc")
+
+        assert mock_ydl.extract_info.call_count == 2
+        assert extractor.cached("https://youtu.be/abc") is None
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_playlist_not_cached_as_video(self, mock_ydl_cls):
+        mock_ydl = MagicMock()
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        mock_ydl.extract_info.return_value = {"_type": "playlist", "entries": []}
+        extractor = MetadataExtractor()
+
+        extractor.extract_raw("https://youtube.com/playlist?list=x", flat=True)
+        assert extractor.cached("https://youtube.com/playlist?list=x") is None
+
+
+def _mock_ydl(mock_ydl_cls, info):
+    mock_ydl = MagicMock()
+    mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+    mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = info
+    return mock_ydl
+
+
+class TestExtractionProfiles:
+    def test_profile_for_fields(self):
+        assert profile_for(["title", "duration"]) == "basic"
+        assert profile_for(["title", "formats"]) == "formats-video"
+        assert profile_for(None) == "full"
+        # An empty list means every field, like None.
+        assert profile_for([]) == "full"
+        assert profile_for(audio_only=True) == "formats-audio"
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_profile_sets_extractor_args(self, mock_ydl_cls):
+        _mock_ydl(mock_ydl_cls, {"id": "abc", "title": "T"})
+        MetadataExtractor().extract_raw("https://youtu.be/abc", profile="basic")
+        opts = mock_ydl_cls.call_args[0][0]
+        assert opts["extractor_args"] == {"youtube": PROFILES["basic"]}
+        assert "js" in opts["extractor_args"]["youtube"]["player_skip"]
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_full_profile_passes_no_args(self, mock_ydl_cls):
+        _mock_ydl(mock_ydl_cls, {"id": "abc", "title": "T"})
+        MetadataExtractor().extract_raw("https://youtu.be/abc")
+        assert "extractor_args" not in mock_ydl_cls.call_args[0][0]
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_richer_result_serves_cheaper_profile(self, mock_ydl_cls):
+        mock_ydl = _mock_ydl(mock_ydl_cls, {"id": "abc", "title": "T", "formats": []})
+        extractor = MetadataExtractor()
+        extractor.extract_raw("https://youtu.be/abc", profile="formats-video")
+        extractor.extract_video_info("https://youtu.be/abc", profile="basic")
+        assert mock_ydl.extract_info.call_count == 1
+        # Downloads need the full extraction.
+        assert extractor.cached("https://youtu.be/abc") is None
+        extractor.extract_raw("https://youtu.be/abc")
+        assert mock_ydl.extract_info.call_count == 2
+        assert extractor.cached("https://youtu.be/abc") is not None
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_info_without_fields_serves_download(self, mock_ydl_cls):
+        mock_ydl = _mock_ydl(mock_ydl_cls, {"id": "abc", "title": "T", "formats": []})
+        extractor = MetadataExtractor()
+        extractor.extract_video_info("https://youtu.be/abc", profile=profile_for(None))
+        assert extractor.cached("https://youtu.be/abc") is not None
+        assert mock_ydl.extract_info.call_count == 1
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_cheaper_result_does_not_replace_full(self, mock_ydl_cls):
+        mock_ydl = _mock_ydl(mock_ydl_cls, {"id": "abc", "title": "T"})
+        extractor = MetadataExtractor()
+        extractor.extract_raw("https://youtu.be/abc")
+        extractor.extract_raw("https://youtu.be/abc", flat=True, profile="formats-audio")
+        assert extractor.cached("https://youtu.be/abc") is not None
+        assert mock_ydl.extract_info.call_count == 2
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_audio_only_formats(self, mock_ydl_cls):
+        _mock_ydl(mock_ydl_cls, {
+            "formats": [
+                {"format_id": "139", "ext": "m4a", "vcodec": "none", "acodec": "mp4a", "tbr": 48},
+                {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a", "tbr": 128},
+                {"format_id": "251", "ext": "webm", "vcodec": "none", "acodec": "opus", "tbr": 160},
+                {"format_id": "137", "ext": "mp4", "vcodec": "avc1", "acodec": "none", "height": 1080},
+            ],
+        })
+        formats = MetadataExtractor().extract_formats("https://youtu.be/abc", "formats-audio", audio_only=True)
+        assert [f.format_id for f in formats] == ["251", "140", "139"]
+
+
+class TestPlaylistIndices:
+    def test_items_and_ranges(self):
+        assert playlist_indices("1-3,7,10:", 12) == [0, 1, 2, 6, 9, 10, 11]
+
+    def test_negative_and_step(self):
+        assert playlist_indices("-2:", 5) == [3, 4]
+        assert playlist_indices("::2", 5) == [0, 2, 4]
+        assert playlist_indices("::-1", 3) == [2, 1, 0]
+
+    def test_out_of_range_and_duplicates(self):
+        assert playlist_indices("1-100,2,9", 3) == [0, 1, 2]
+
+    def test_bad_spec(self):
+        with pytest.raises(ValueError):
+            playlist_indices("abc", 3)
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from yoink.core.manager import DownloadManager
-from yoink.core.models import DownloadProgress, DownloadRequest
+from yoink.core.manager import MAX_JOB_EXTRACTIONS, DownloadManager
+from yoink.core.models import (
+    BatchItem,
+    DownloadProgress,
+    DownloadRequest,
+    DownloadStatus,
+    GroupRequest,
+    OutputTarget,
+    PlaylistInfo,
+    VideoInfo,
+)
 
 
 @pytest.fixture
@@ -20,6 +32,16 @@ class TestDownloadManager:
         assert manager.max_concurrent == 2
         assert manager.get_all_progress() == []
 
+    def test_postprocess_workers_default(self, manager):
+        assert manager.postprocess_workers >= 1
+
+    def test_postprocess_workers_custom(self):
+        m = DownloadManager(max_concurrent=1, postprocess_workers=2)
+        try:
+            assert m.postprocess_workers == 2
+        finally:
+            m.shutdown()
+
     def test_max_concurrent_setter_clamps(self, manager):
         manager.max_concurrent = 0
         assert manager.max_concurrent == 1
@@ -119,3 +141,519 @@ class TestDownloadManager:
         manager.start_download(request)
         manager.shutdown()
         mock_engine.cancel.assert_called_once()
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_download_slot_released_at_postprocess(self, mock_engine_cls):
+        manager = DownloadManager(max_concurrent=1)
+        slot_free = threading.Event()
+        merge_done = threading.Event()
+        mock_engine = MagicMock()
+        mock_engine.is_cancelled = False
+        mock_engine.clip_fraction = 1.0
+        mock_engine.prepare.return_value = {}
+        mock_engine.request = DownloadRequest(url="http://example.com", download_id="dl1")
+        mock_engine_cls.return_value = mock_engine
+
+        def run():
+            mock_engine.on_downloaded()
+            # A second job could now take the only download slot.
+            if manager._semaphore.acquire(timeout=1):
+                slot_free.set()
+                manager._semaphore.release()
+            merge_done.set()
+
+        mock_engine.run.side_effect = run
+        try:
+            manager.start_download(mock_engine.request)
+            assert merge_done.wait(timeout=2)
+            assert slot_free.is_set()
+        finally:
+            manager.shutdown()
+        assert manager._semaphore.acquire(blocking=False)
+        assert not manager._semaphore.acquire(blocking=False)
+
+    def test_stage_summary(self, manager):
+        assert manager.get_stage_summary() == {}
+        progress = DownloadProgress(
+            download_id="dl1", stage_timings={"download": 4.0, "transcode": 30.0}
+        )
+        manager._record_stages(progress, duration=600)
+        manager._record_stages(progress.model_copy(update={"stage_timings": {"download": 2.0}}), None)
+
+        summary = manager.get_stage_summary()
+        assert summary["download"] == {"total": 6.0, "mean": 3.0, "jobs": 2}
+        assert summary["transcode"]["jobs"] == 1
+        assert manager._transcode_rate > 0.02
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_open_stream_cancels_when_consumer_leaves(self, mock_engine_cls, manager):
+        mock_engine = MagicMock()
+        mock_engine_cls.return_value = mock_engine
+
+        async def main():
+            request = DownloadRequest(url="http://example.com", download_id="s1")
+            download_id, chunks = manager.open_stream(request)
+            sink = mock_engine_cls.call_args.kwargs["sink"]
+            await asyncio.to_thread(sink.close)
+            assert [c async for c in chunks] == []
+            return download_id
+
+        assert asyncio.run(main()) == "s1"
+        assert mock_engine_cls.call_args[0][0].output_mode == "stream"
+        mock_engine.cancel.assert_called_once()
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_insufficient_disk_fails_job(self, mock_engine_cls, manager):
+        mock_engine = MagicMock()
+        mock_engine.is_cancelled = False
+        mock_engine.prepare.return_value = {"filesize": 10**18}
+        mock_engine.clip_fraction = 1.0
+        mock_engine.request.subtitles_only = False
+        mock_engine_cls.return_value = mock_engine
+
+        manager.start_download(DownloadRequest(url="http://example.com", download_id="big"))
+        manager._executor.shutdown(wait=True)
+
+        mock_engine.fail.assert_called_once()
+        assert "Not enough disk space" in mock_engine.fail.call_args[0][0]
+        mock_engine.run.assert_not_called()
+        assert manager.get_disk_reservations() == []
+
+
+class TestQueuedCancel:
+    def _engine(self, download_id):
+        engine = MagicMock()
+        engine.request = DownloadRequest(url="http://example.com", download_id=download_id, end_time=5)
+        engine.is_cancelled = False
+        engine.clip_fraction = 1.0
+        engine.prepare.return_value = {}
+        return engine
+
+    def test_queued_job_holds_no_thread_and_cancels_at_once(self):
+        manager = DownloadManager(max_concurrent=1)
+        running, release = threading.Event(), threading.Event()
+        first, second, third = self._engine("a"), self._engine("b"), self._engine("c")
+        first.run.side_effect = lambda: (running.set(), release.wait(5))
+        engines = iter([first, second, third])
+        try:
+            with patch("yoink.core.manager.DownloadEngine", side_effect=lambda *a, **k: next(engines)):
+                manager.start_download(first.request)
+                assert running.wait(2)
+                manager.start_download(second.request)
+                manager.start_download(third.request)
+                deadline = time.monotonic() + 2
+                while len(manager._pending) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                # Both waiting jobs returned their worker threads to the pool
+                # without extracting anything yet.
+                assert [e for e, _ in manager._pending] == [second, third]
+                second.prepare.assert_not_called()
+
+                start = time.monotonic()
+                assert manager.cancel_download("b")
+                assert time.monotonic() - start < 0.1
+                second.drop.assert_called_once()
+                second.run.assert_not_called()
+
+                release.set()
+                deadline = time.monotonic() + 2
+                while not third.run.called and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                third.run.assert_called_once()
+        finally:
+            manager.shutdown()
+        # The slot comes back once the last job's run() has returned.
+        assert manager._semaphore.acquire(timeout=2)
+
+    def test_unexpected_admission_error_fails_the_job(self, manager):
+        engine = self._engine("x")
+        engine.prepare.side_effect = RuntimeError("boom")
+        manager._run_with_semaphore(engine)
+        engine.fail.assert_called_once_with("boom")
+        engine.run.assert_not_called()
+        assert manager._semaphore.acquire(blocking=False)
+
+    def test_shutdown_drops_queued_jobs(self):
+        manager = DownloadManager(max_concurrent=1)
+        engine = self._engine("q")
+        cleanup = MagicMock()
+        manager._semaphore.acquire()
+        assert manager._take_slot(engine, cleanup) is False
+        manager.shutdown()
+        engine.drop.assert_called_once()
+        cleanup.assert_called_once()
+
+
+class TestExtractionLimit:
+    def test_prepare_is_bounded_across_slots(self):
+        manager = DownloadManager(max_concurrent=4)
+        lock, active, peak = threading.Lock(), [0], [0]
+        release = threading.Event()
+
+        def prepare():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            release.wait(2)
+            with lock:
+                active[0] -= 1
+            return {}
+
+        engines = []
+        for i in range(4):
+            engine = MagicMock()
+            engine.request = DownloadRequest(url=f"http://example.com/{i}", download_id=f"x{i}", end_time=5)
+            engine.is_cancelled = False
+            engine.clip_fraction = 1.0
+            engine.prepare.side_effect = prepare
+            engines.append(engine)
+        it = iter(engines)
+        try:
+            with patch("yoink.core.manager.DownloadEngine", side_effect=lambda *a, **k: next(it)):
+                for engine in engines:
+                    manager.start_download(engine.request)
+                time.sleep(0.3)
+                assert peak[0] == MAX_JOB_EXTRACTIONS
+                release.set()
+                deadline = time.monotonic() + 2
+                while not all(e.run.called for e in engines) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            assert all(e.run.called for e in engines)
+        finally:
+            manager.shutdown()
+
+
+class TestWaitForDownloads:
+    def test_any_returns_first_finished(self, manager):
+        for i in ("a", "b"):
+            manager._progress[i] = DownloadProgress(download_id=i, status=DownloadStatus.DOWNLOADING)
+
+        async def main():
+            waiting = asyncio.create_task(manager.wait_for_downloads(["a", "b", "nope"], "any", timeout=5))
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            # Completion arrives from a worker thread, as it does for real jobs.
+            await asyncio.to_thread(
+                manager._publish, DownloadProgress(download_id="b", status=DownloadStatus.FINISHED)
+            )
+            done = await waiting
+            return done, time.monotonic() - start
+
+        done, latency = asyncio.run(main())
+        assert list(done) == ["b"]
+        assert latency < 0.5
+        assert manager._waiters == {}
+
+    def test_all_with_timeout(self, manager):
+        manager._progress["a"] = DownloadProgress(download_id="a", status=DownloadStatus.CANCELLED)
+        manager._progress["b"] = DownloadProgress(download_id="b", status=DownloadStatus.DOWNLOADING)
+        done = asyncio.run(manager.wait_for_downloads(["a", "b"], "all", timeout=0.05))
+        assert list(done) == ["a"]
+        assert manager._waiters == {}
+
+    def test_group_ids_expand(self, manager):
+        manager._groups["g"] = ["g-0", "g-1"]
+        for i in ("g-0", "g-1"):
+            manager._progress[i] = DownloadProgress(download_id=i, status=DownloadStatus.ERROR)
+        assert manager.expand_ids(["g", "x"]) == ["g-0", "g-1"]
+        done = asyncio.run(manager.wait_for_downloads(["g"], "all", timeout=1))
+        assert sorted(done) == ["g-0", "g-1"]
+
+
+class TestChangeLog:
+    def test_cursor_returns_only_later_changes(self, manager):
+        manager._publish(DownloadProgress(download_id="a"))
+        manager._publish(DownloadProgress(download_id="b"))
+        first = manager.list_changes()
+        assert [p.download_id for p in first.downloads] == ["a", "b"]
+
+        manager._publish(DownloadProgress(download_id="a", status=DownloadStatus.DOWNLOADING, percent=5))
+        second = manager.list_changes(since=first.cursor)
+        assert [p.download_id for p in second.downloads] == ["a"]
+        assert second.downloads[0].percent == 5
+        assert second.cursor > first.cursor
+        assert manager.list_changes(since=second.cursor).downloads == []
+
+    def test_status_and_age_filters(self, manager):
+        manager._publish(DownloadProgress(download_id="old", status=DownloadStatus.FINISHED))
+        manager._changes["old"] = (manager._changes["old"][0], time.monotonic() - 3600)
+        manager._publish(DownloadProgress(download_id="new", status=DownloadStatus.FINISHED))
+        manager._publish(DownloadProgress(download_id="busy", status=DownloadStatus.DOWNLOADING))
+
+        recent = manager.list_changes(max_age=60)
+        assert [p.download_id for p in recent.downloads] == ["new", "busy"]
+        done = manager.list_changes(statuses=[DownloadStatus.FINISHED])
+        assert [p.download_id for p in done.downloads] == ["old", "new"]
+
+
+class TestBatch:
+    def _playlist(self, n):
+        videos = [VideoInfo(video_id=f"v{i}", title=f"V{i}", url=f"https://youtu.be/v{i}") for i in range(1, n + 1)]
+        return PlaylistInfo(playlist_id="PL", title="List", url="https://www.youtube.com/playlist?list=PL", videos=videos)
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_expands_playlists_and_reports_per_item(self, mock_engine_cls, manager):
+        items = [
+            BatchItem(url="https://www.youtube.com/playlist?list=PL", playlist_items="1-2,5"),
+            BatchItem(url="https://youtu.be/solo", convert_to_mp3=True, output_dir="/tmp/music"),
+            BatchItem(url="https://youtu.be/bad", start_time=60, end_time=10),
+        ]
+        defaults = DownloadRequest(url="", format_string="best", output_dir="/tmp/dl")
+        with patch.object(manager._extractor, "extract_playlist_info", return_value=self._playlist(6)) as extract, \
+                patch.object(manager._executor, "submit") as submit:
+            results = manager._start_batch(items, defaults)
+
+        extract.assert_called_once()
+        assert [r.url for r in results] == [
+            "https://youtu.be/v1", "https://youtu.be/v2", "https://youtu.be/v5",
+            "https://youtu.be/solo", "https://youtu.be/bad",
+        ]
+        assert all(r.download_id for r in results[:4])
+        assert results[4].download_id is None and results[4].error
+        assert submit.call_count == 4
+        requests = [c.args[0] for c in mock_engine_cls.call_args_list]
+        assert requests[0].format_string == "best" and requests[0].output_dir == "/tmp/dl"
+        assert requests[3].convert_to_mp3 is True and requests[3].output_dir == "/tmp/music"
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_reserve_sees_expanded_count_before_queueing(self, mock_engine_cls, manager):
+        items = [BatchItem(url="https://www.youtube.com/playlist?list=PL")]
+        defaults = DownloadRequest(url="", output_dir="/tmp/dl")
+        reserve = MagicMock(side_effect=RuntimeError("over quota"))
+        with patch.object(manager._extractor, "extract_playlist_info", return_value=self._playlist(6)), \
+                patch.object(manager._executor, "submit") as submit:
+            with pytest.raises(RuntimeError):
+                manager._start_batch(items, defaults, reserve=reserve)
+
+        reserve.assert_called_once_with(6)
+        submit.assert_not_called()
+        mock_engine_cls.assert_not_called()
+        assert manager.get_all_progress() == []
+
+    def test_watch_url_with_list_is_one_video(self, manager):
+        item = BatchItem(url="https://www.youtube.com/watch?v=x&list=PL")
+        assert manager._batch_urls(item) == [item.url]
+
+    def test_select_and_retry(self, manager):
+        for i, status in (("a", DownloadStatus.ERROR), ("b", DownloadStatus.FINISHED), ("c", DownloadStatus.CANCELLED)):
+            manager._progress[i] = DownloadProgress(
+                download_id=i, status=status, error="Connection timed out." if i == "a" else None
+            )
+            engine = MagicMock()
+            engine.request = DownloadRequest(url=f"https://youtu.be/{i}", download_id=i)
+            manager._engines[i] = engine
+        assert manager.select_downloads(statuses=[DownloadStatus.ERROR, DownloadStatus.CANCELLED]) == ["a", "c"]
+        assert manager.select_downloads(error_contains="timed out") == ["a"]
+        assert manager.select_downloads(["a", "b"], url_contains="/b") == ["b"]
+
+        with patch.object(manager, "start_download") as start:
+            assert manager.retry_download("a") is True
+            assert manager.retry_download("b") is False
+            assert manager.retry_download("nope") is False
+        assert start.call_args.args[0].download_id == "a"
+
+
+class TestFormatPlanning:
+    def test_bandwidth_from_finished_jobs(self, manager):
+        manager._record_stages(
+            DownloadProgress(download_id="a", downloaded_bytes=1000, stage_timings={"download": 2.0}),
+            None,
+        )
+        assert manager.bandwidth == 500
+        manager._record_stages(
+            DownloadProgress(download_id="b", downloaded_bytes=1000, stage_timings={"download": 1.0}),
+            None,
+        )
+        assert manager.bandwidth == pytest.approx(500 * 0.7 + 1000 * 0.3)
+
+    def test_plan_uses_cached_extraction(self, manager):
+        info = {
+            "duration": 10,
+            "formats": [
+                {"format_id": "18", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a", "height": 360, "filesize": 100_000},
+                {"format_id": "22", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a", "height": 720, "filesize": 900_000},
+            ],
+        }
+        with patch.object(manager._extractor, "extract_raw", return_value=info) as extract:
+            plan = asyncio.run(manager.plan_format("https://youtu.be/x", "under 500KB"))
+        extract.assert_called_once_with("https://youtu.be/x")
+        assert plan.format_string == "18"
+
+
+class TestMergeStats:
+    def test_counts_merges_and_avoided(self, manager):
+        merged = MagicMock()
+        merged.prepare.return_value = {"requested_formats": [{}, {}]}
+        single = MagicMock()
+        single.prepare.return_value = {"format_id": "22"}
+
+        manager._record_merge(merged, DownloadProgress(download_id="a"))
+        manager._record_merge(single, DownloadProgress(download_id="b", merge_avoided=True))
+        manager._record_merge(single, DownloadProgress(download_id="c"))
+
+        assert manager.get_merge_stats() == {"merged": 1, "avoided": 1}
+
+
+class TestSharedStreams:
+    def test_registers_components_until_job_ends(self, manager):
+        engine = MagicMock()
+        engine.request = DownloadRequest(url="http://example.com", download_id="m1")
+        engine.prepare.return_value = {
+            "id": "abc",
+            "requested_formats": [{"format_id": "137"}, {"format_id": "140"}],
+        }
+        engine.is_cancelled = False
+        engine.clip_fraction = 1.0
+        seen = []
+        with patch.object(manager, "_run_admitted", side_effect=lambda e: seen.append(
+            manager._stream_cache.users(("abc", "140"))
+        )):
+            manager._run_with_semaphore(engine)
+
+        assert seen == [1]
+        assert manager._stream_cache.users(("abc", "140")) == 0
+
+    def test_single_format_jobs_registered(self, manager):
+        engine = MagicMock()
+        engine.request = DownloadRequest(url="http://example.com")
+        engine.prepare.return_value = {"id": "abc", "format_id": "140"}
+        assert manager._register_shared_streams(engine) == [("abc", "140")]
+
+    def test_subtitle_and_clip_jobs_not_registered(self, manager):
+        engine = MagicMock()
+        engine.prepare.return_value = {"id": "abc", "format_id": "140"}
+        engine.request = DownloadRequest(url="http://example.com", subtitles_only=True)
+        assert manager._register_shared_streams(engine) == []
+        engine.request = DownloadRequest(url="http://example.com", end_time=10)
+        assert manager._register_shared_streams(engine) == []
+
+
+class TestGroupDownloads:
+    def _finish(self, engine_cls):
+        engines = []
+
+        def make(request, callback=None, **kwargs):
+            engine = MagicMock()
+            engine.request = request
+            engine.is_cancelled = False
+            engine.clip_fraction = 1.0
+            engine.prepare.return_value = (
+                {"id": "abc", "requested_formats": [{"format_id": "137"}, {"format_id": "140"}]}
+                if not request.convert_to_mp3 and not request.subtitles_only
+                else {"id": "abc", "format_id": "140"}
+            )
+
+            def run():
+                progress = DownloadProgress(
+                    download_id=request.download_id, status=DownloadStatus.FINISHED,
+                    percent=100.0, title="Video",
+                )
+                callback(progress)
+                return progress
+
+            engine.run.side_effect = run
+            engines.append(engine)
+            return engine
+
+        engine_cls.side_effect = make
+        return engines
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_one_extraction_fans_out(self, mock_engine_cls, manager):
+        engines = self._finish(mock_engine_cls)
+        request = GroupRequest(
+            url="https://youtu.be/abc",
+            group_id="g1",
+            outputs=[OutputTarget(kind="video"), OutputTarget(kind="audio"), OutputTarget(kind="subtitles")],
+        )
+        registered = []
+        real_register = manager._stream_cache.register
+        with patch.object(manager._extractor, "extract_raw", return_value={"id": "abc"}) as extract, \
+                patch.object(manager._disk_guard, "reserve", return_value=True) as reserve, \
+                patch.object(manager._stream_cache, "register",
+                             side_effect=lambda key: (registered.append(key), real_register(key))):
+            assert manager.start_group(request) == "g1"
+            deadline = time.time() + 5
+            while manager.get_group_progress("g1").status != DownloadStatus.FINISHED and time.time() < deadline:
+                time.sleep(0.01)
+            manager._executor.shutdown(wait=True)
+
+        extract.assert_called_once_with("https://youtu.be/abc")
+        assert [e.request.download_id for e in engines] == ["g1-0", "g1-1", "g1-2"]
+        assert engines[1].request.convert_to_mp3 is True
+        assert engines[1].request.output_template == "%(title)s (audio).%(ext)s"
+        assert engines[2].request.subtitles_only is True
+        # Subtitles need no room for media.
+        assert {c.args[0]: c.args[2] for c in reserve.call_args_list}["g1-2"] == 0
+        # The audio stream is needed by both media outputs and held for the group.
+        assert registered.count(("abc", "140")) == 3
+        assert manager._stream_cache.users(("abc", "140")) == 0
+
+        group = manager.get_group_progress("g1")
+        assert group.status == DownloadStatus.FINISHED
+        assert group.percent == 100.0
+        assert group.title == "Video"
+        assert len(group.outputs) == 3
+
+    def test_extraction_failure_fails_every_output(self, manager):
+        request = GroupRequest(url="https://youtu.be/x", group_id="g2", outputs=[OutputTarget(), OutputTarget(kind="audio")])
+        with patch.object(manager._extractor, "extract_raw", side_effect=RuntimeError("Video unavailable")):
+            manager.start_group(request)
+            manager._executor.shutdown(wait=True)
+        group = manager.get_group_progress("g2")
+        assert group.status == DownloadStatus.ERROR
+        assert all(p.error for p in group.outputs)
+
+    def test_cancel_before_fan_out(self, manager):
+        request = GroupRequest(url="https://youtu.be/x", group_id="g3", outputs=[OutputTarget()])
+        release = threading.Event()
+
+        def slow_extract(url):
+            release.wait(5)
+            return {"id": "x"}
+
+        with patch.object(manager._extractor, "extract_raw", side_effect=slow_extract):
+            manager.start_group(request)
+            assert manager.cancel_download("g3") is True
+            release.set()
+            manager._executor.shutdown(wait=True)
+        assert manager.get_group_progress("g3").status == DownloadStatus.CANCELLED
+
+    @patch("yoink.core.manager.DownloadEngine")
+    def test_cancel_output_before_fan_out(self, mock_engine_cls, manager):
+        engines = self._finish(mock_engine_cls)
+        request = GroupRequest(url="https://youtu.be/x", group_id="g4", outputs=[OutputTarget(), OutputTarget(kind="audio")])
+        release = threading.Event()
+
+        def slow_extract(url):
+            release.wait(5)
+            return {"id": "x"}
+
+        with patch.object(manager._extractor, "extract_raw", side_effect=slow_extract), \
+                patch.object(manager._disk_guard, "reserve", return_value=True):
+            manager.start_group(request)
+            assert manager.cancel_download("g4-1") is True
+            assert manager.get_progress("g4-1").status == DownloadStatus.CANCELLED
+            release.set()
+            deadline = time.time() + 5
+            while manager.get_progress("g4-0").status != DownloadStatus.FINISHED and time.time() < deadline:
+                time.sleep(0.01)
+            manager._executor.shutdown(wait=True)
+
+        assert [e.request.download_id for e in engines] == ["g4-0"]
+        assert manager.get_progress("g4-1").status == DownloadStatus.CANCELLED
+
+    def test_group_extraction_takes_an_extraction_slot(self, manager):
+        request = GroupRequest(url="https://youtu.be/x", group_id="g5", outputs=[OutputTarget()])
+        for _ in range(MAX_JOB_EXTRACTIONS):
+            manager._extract_semaphore.acquire()
+        with patch.object(manager._extractor, "extract_raw", return_value=None) as extract:
+            manager.start_group(request)
+            time.sleep(0.2)
+            extract.assert_not_called()
+            manager._extract_semaphore.release()
+            manager._executor.shutdown(wait=True)
+        extract.assert_called_once()
+
+    def test_unknown_group(self, manager):
+        assert manager.get_group_progress("nope") is None
@@ -9,6 +9,8 @@ from yoink.core.models import (
     DownloadRequest,
     DownloadStatus,
     FormatOption,
+    GroupRequest,
+    OutputTarget,
     PlaylistInfo,
     VideoInfo,
 )
@@ -146,6 +148,8 @@ class TestDownloadRequest:
         assert r.download_subtitles is False
         assert r.subtitle_lang == "en"
         assert r.convert_to_mp3 is False
+        assert r.concurrent_fragments is None
+        assert r.http_chunk_size is None
 
     def test_unique_ids(self):
         r1 = DownloadRequest(url="http://example.com")
@@ -171,3 +175,62 @@ class TestDownloadRequest:
         assert r2.download_id == "new_id"
         assert r2.speed_limit == 5000
         assert r2.url == r.url
+
+    def test_concurrent_fragments_bounds(self):
+        with pytest.raises(ValueError):
+            DownloadRequest(url="http://example.com", concurrent_fragments=0)
+        with pytest.raises(ValueError):
+            DownloadRequest(url="http://example.com", http_chunk_size=-1)
+
+    def test_clip_timestamps(self):
+        r = DownloadRequest(url="http://example.com", start_time="1:02:03", end_time="1:05:00.5")
+        assert r.start_time == 3723
+        assert r.end_time == 3900.5
+        assert r.is_clip is True
+        assert DownloadRequest(url="http://example.com", start_time=90).start_time == 90
+        assert DownloadRequest(url="http://example.com").is_clip is False
+        assert DownloadRequest(url="http://example.com", chapters=["Intro"]).is_clip is True
+
+    def test_clip_validation(self):
+        with pytest.raises(ValueError):
+            DownloadRequest(url="http://example.com", start_time=60, end_time=30)
+        with pytest.raises(ValueError):
+            DownloadRequest(url="http://example.com", start_time="1:2:3:4")
+        with pytest.raises(ValueError):
+            DownloadRequest(url="http://example.com", end_time=10, output_mode="stream")
+
+    def test_rejects_bad_chapter_pattern(self):
+        with pytest.raises(ValueError, match="chapter pattern"):
+            DownloadRequest(url="http://example.com", chapters=["Intro", "(unclosed"])
+
+
+class TestGroupRequest:
+    def test_child_requests(self):
+        group = GroupRequest(
+            url="http://example.com",
+            group_id="g",
+            output_dir="/tmp/out",
+            outputs=[
+                OutputTarget(kind="video", format_string="137+140"),
+                OutputTarget(kind="audio", accept_audio_codecs=["opus"]),
+                OutputTarget(kind="subtitles", subtitle_lang="fr"),
+            ],
+        )
+        video, audio, subs = group.child_requests()
+        assert [c.download_id for c in (video, audio, subs)] == ["g-0", "g-1", "g-2"]
+        assert video.format_string == "137+140"
+        assert audio.convert_to_mp3 is True
+        assert audio.accept_audio_codecs == ["opus"]
+        assert audio.output_template == "%(title)s (audio).%(ext)s"
+        assert subs.subtitles_only is True
+        assert subs.subtitle_lang == "fr"
+        assert all(c.output_dir == "/tmp/out" for c in (video, audio, subs))
+
+    def test_audio_alone_keeps_default_template(self):
+        group = GroupRequest(url="http://example.com", outputs=[OutputTarget(kind="audio")])
+        [audio] = group.child_requests()
+        assert audio.output_template == "%(title)s.%(ext)s"
+
+    def test_needs_an_output(self):
+        with pytest.raises(ValueError):
+            GroupRequest(url="http://example.com", outputs=[])
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+
+from yoink.core.models import DownloadProgress, DownloadStatus
+from yoink.core.notify import progress_message, push_progress
+
+
+def _progress(status=DownloadStatus.DOWNLOADING, percent=0.0, **kwargs):
+    return DownloadProgress(download_id="d", status=status, percent=percent, **kwargs)
+
+
+def _run(feed, interval=0.2):
+    sent = []
+
+    async def send(progress):
+        sent.append(progress)
+
+    async def main():
+        updates = asyncio.Queue()
+        task = asyncio.create_task(push_progress(updates, send, interval=interval))
+        await feed(updates)
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(main())
+    return sent
+
+
+class TestPushProgress:
+    def test_coalesces_updates_and_stops_at_terminal(self):
+        async def feed(updates):
+            for i in range(1, 50):
+                updates.put_nowait(_progress(percent=i))
+                await asyncio.sleep(0.005)
+            updates.put_nowait(_progress(DownloadStatus.FINISHED, 100.0))
+
+        sent = _run(feed)
+        assert 2 <= len(sent) < 10
+        assert sent[-1].status == DownloadStatus.FINISHED
+        assert [p.percent for p in sent] == sorted(p.percent for p in sent)
+
+    def test_status_changes_sent_immediately(self):
+        async def feed(updates):
+            updates.put_nowait(_progress(DownloadStatus.QUEUED))
+            await asyncio.sleep(0.01)
+            updates.put_nowait(_progress(percent=10))
+            await asyncio.sleep(0.01)
+            updates.put_nowait(_progress(DownloadStatus.MERGING, 99.9))
+            await asyncio.sleep(0.01)
+            updates.put_nowait(_progress(DownloadStatus.ERROR, 0.0, error="boom"))
+
+        sent = _run(feed, interval=10)
+        assert [p.status for p in sent] == [
+            DownloadStatus.QUEUED, DownloadStatus.DOWNLOADING, DownloadStatus.MERGING, DownloadStatus.ERROR,
+        ]
+        # Progress notifications must not go backwards.
+        assert sent[-1].percent == 99.9
+
+    def test_latest_update_delivered_after_quiet_period(self):
+        async def feed(updates):
+            updates.put_nowait(_progress(percent=1))
+            updates.put_nowait(_progress(percent=2))
+            await asyncio.sleep(0.01)
+            updates.put_nowait(_progress(percent=3))
+            await asyncio.sleep(0.4)
+            updates.put_nowait(_progress(DownloadStatus.CANCELLED, 3))
+
+        sent = _run(feed)
+        assert [p.percent for p in sent] == [2, 3, 3]
+
+    def test_message(self):
+        message = progress_message(_progress(percent=42.0, speed=2 * 1024 * 1024, eta=65))
+        assert message.startswith("downloading 42.0%")
+        assert "MB/s" in message
+        assert "ETA" in message
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from yoink.core.models import FormatOption
+from yoink.core.planner import QualitySpec, parse_quality, plan_format
+
+MB = 1024 * 1024
+
+FORMATS = [
+    FormatOption(format_id="18", ext="mp4", resolution="360p", filesize=10 * MB, vcodec="avc1.42001E",
+                 acodec="mp4a.40.2", has_video=True, has_audio=True, tbr=500),
+    FormatOption(format_id="136", ext="mp4", resolution="720p", filesize=40 * MB, vcodec="avc1.4d401f",
+                 acodec="none", has_video=True, tbr=1500),
+    FormatOption(format_id="247", ext="webm", resolution="720p", filesize=30 * MB, vcodec="vp9",
+                 acodec="none", has_video=True, tbr=1200),
+    FormatOption(format_id="137", ext="mp4", resolution="1080p", filesize=90 * MB, vcodec="avc1.640028",
+                 acodec="none", has_video=True, tbr=4000),
+    FormatOption(format_id="140", ext="m4a", filesize=5 * MB, acodec="mp4a.40.2", has_audio=True, tbr=128),
+    FormatOption(format_id="251", ext="webm", filesize=4 * MB, acodec="opus", has_audio=True, tbr=140),
+]
+
+
+class TestParseQuality:
+    def test_combined(self):
+        spec = parse_quality("720p H264 under 50MB")
+        assert spec == QualitySpec(max_bytes=50 * MB, max_height=720, vcodec="avc1")
+
+    def test_deadline(self):
+        assert parse_quality("done within 2 min").deadline == 120
+        assert parse_quality("90s").deadline == 90
+
+    def test_audio(self):
+        assert parse_quality("audio only").audio_only is True
+
+    def test_bare_unit_is_a_size(self):
+        spec = parse_quality("under 50M")
+        assert spec.max_bytes == 50 * MB
+        assert spec.deadline is None
+
+    def test_bare_m_after_within_is_minutes(self):
+        spec = parse_quality("under 50MB within 2m")
+        assert spec.max_bytes == 50 * MB
+        assert spec.deadline == 120
+        assert parse_quality("within 3m").max_bytes is None
+
+    def test_height_with_frame_rate(self):
+        assert parse_quality("720p60").max_height == 720
+        assert parse_quality("1080p30 vp9").max_height == 1080
+
+    def test_size_is_not_a_deadline(self):
+        spec = parse_quality("under 1.5 GB")
+        assert spec.max_bytes == int(1.5 * 1024**3)
+        assert spec.deadline is None
+
+
+class TestPlanFormat:
+    def test_no_constraints_picks_best(self):
+        plan = plan_format(FORMATS, QualitySpec())
+        assert plan.format_string == "137+140"
+        assert plan.height == 1080
+
+    def test_size_budget(self):
+        plan = plan_format(FORMATS, QualitySpec(max_bytes=50 * MB))
+        assert plan.format_string == "136+140"
+        assert plan.estimated_bytes == 45 * MB
+        assert plan.fits is True
+
+    def test_codec_and_height(self):
+        plan = plan_format(FORMATS, QualitySpec(max_height=720, vcodec="vp9"))
+        assert plan.format_string == "247+251"
+
+    def test_deadline_uses_bandwidth(self):
+        plan = plan_format(FORMATS, QualitySpec(deadline=10), bandwidth=2 * MB)
+        assert plan.format_string == "18"
+
+    def test_deadline_without_bandwidth_is_ignored(self):
+        plan = plan_format(FORMATS, QualitySpec(deadline=10))
+        assert plan.height == 1080
+        assert "deadline ignored" in plan.reason
+
+    def test_nothing_fits_picks_smallest(self):
+        plan = plan_format(FORMATS, QualitySpec(max_bytes=MB))
+        assert plan.format_string == "18"
+        assert plan.fits is False
+
+    def test_audio_only(self):
+        assert plan_format(FORMATS, QualitySpec(audio_only=True)).format_string == "251"
+
+    def test_size_from_bitrate(self):
+        formats = [FormatOption(format_id="22", resolution="720p", has_video=True, has_audio=True, tbr=800)]
+        plan = plan_format(formats, QualitySpec(max_bytes=2 * MB), duration=10)
+        assert plan.estimated_bytes == 1_000_000
+        assert plan.fits is True
+
+    def test_no_formats(self):
+        plan = plan_format([], QualitySpec(max_height=480))
+        assert plan.fits is False
+        assert plan.format_string == "bestvideo+bestaudio/best"
+
+    def test_prefers_muxed_at_same_height(self):
+        muxed = FormatOption(format_id="22", ext="mp4", resolution="720p", filesize=30 * MB,
+                             vcodec="avc1", acodec="mp4a", has_video=True, has_audio=True, tbr=900)
+        plan = plan_format([*FORMATS, muxed], QualitySpec(max_height=720))
+        assert plan.format_string == "22"
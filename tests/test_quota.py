@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import gc
+
+import pytest
+
+from yoink.core.models import DownloadProgress, DownloadStatus, QuotaLimits
+from yoink.core.quota import QUEUE_RETRY_AFTER, QuotaExceeded, QuotaTracker
+
+
+class Session:
+    pass
+
+
+class Harness:
+    def __init__(self, **limits):
+        self.now = 1000.0
+        self.jobs: dict[str, DownloadProgress] = {}
+        self.unfinished = 0
+        self.tracker = QuotaTracker(
+            QuotaLimits(**limits),
+            self.jobs.get,
+            lambda: self.unfinished,
+            clock=lambda: self.now,
+        )
+
+    def start(self, session, *ids):
+        for download_id in ids:
+            self.jobs[download_id] = DownloadProgress(download_id=download_id, status=DownloadStatus.DOWNLOADING)
+        self.tracker.record_jobs(session, ids)
+
+    def finish(self, download_id, downloaded):
+        self.jobs[download_id].status = DownloadStatus.FINISHED
+        self.jobs[download_id].downloaded_bytes = downloaded
+
+
+class TestMetadataRate:
+    def test_limits_calls_per_minute(self):
+        h = Harness(metadata_calls_per_minute=2)
+        s = Session()
+        h.tracker.check_metadata(s)
+        h.now += 10
+        h.tracker.check_metadata(s)
+        with pytest.raises(QuotaExceeded) as exc:
+            h.tracker.check_metadata(s)
+        assert exc.value.retry_after == pytest.approx(50)
+        h.now += 51
+        h.tracker.check_metadata(s)
+
+    def test_sessions_are_independent(self):
+        h = Harness(metadata_calls_per_minute=1)
+        a, b = Session(), Session()
+        h.tracker.check_metadata(a)
+        h.tracker.check_metadata(b)
+        with pytest.raises(QuotaExceeded):
+            h.tracker.check_metadata(a)
+
+
+class TestJobLimits:
+    def test_queue_limit_frees_as_jobs_end(self):
+        h = Harness(max_queued_jobs=2)
+        s = Session()
+        h.start(s, "a", "b")
+        with pytest.raises(QuotaExceeded) as exc:
+            h.tracker.reserve_jobs(s)
+        assert exc.value.retry_after == QUEUE_RETRY_AFTER
+        h.finish("a", 0)
+        h.tracker.reserve_jobs(s)
+
+    def test_batch_larger_than_limit_gets_no_retry_hint(self):
+        h = Harness(max_queued_jobs=5)
+        with pytest.raises(QuotaExceeded) as exc:
+            h.tracker.reserve_jobs(Session(), 6)
+        assert exc.value.retry_after is None
+
+    def test_reservation_counts_until_recorded_or_released(self):
+        h = Harness(max_queued_jobs=2)
+        s = Session()
+        h.tracker.reserve_jobs(s, 2)
+        # A concurrent call sees the held slots before any job is queued.
+        with pytest.raises(QuotaExceeded):
+            h.tracker.reserve_jobs(s)
+        h.jobs["a"] = DownloadProgress(download_id="a", status=DownloadStatus.DOWNLOADING)
+        h.tracker.record_jobs(s, ["a"], reserved=2)
+        assert h.tracker.usage(s).queued_jobs == 1
+        h.tracker.reserve_jobs(s)
+        h.tracker.release_jobs(s, 1)
+        assert h.tracker.usage(s).queued_jobs == 1
+
+    def test_reservations_count_toward_high_water(self):
+        h = Harness(high_water=3)
+        h.unfinished = 1
+        a, b = Session(), Session()
+        h.tracker.reserve_jobs(a, 2)
+        with pytest.raises(QuotaExceeded):
+            h.tracker.reserve_jobs(b)
+
+    def test_bytes_per_hour_window(self):
+        h = Harness(max_bytes_per_hour=1000)
+        s = Session()
+        h.start(s, "a")
+        h.jobs["a"].downloaded_bytes = 400
+        h.tracker.reserve_jobs(s)
+        h.finish("a", 1200)
+        h.tracker.usage(s)  # ends are noticed on the next check
+        h.now += 100
+        with pytest.raises(QuotaExceeded) as exc:
+            h.tracker.reserve_jobs(s)
+        assert exc.value.retry_after == pytest.approx(3600 - 100)
+        h.now += 3600
+        h.tracker.reserve_jobs(s)
+
+    def test_sheds_load_past_high_water(self):
+        h = Harness(high_water=10)
+        h.unfinished = 10
+        with pytest.raises(QuotaExceeded) as exc:
+            h.tracker.reserve_jobs(Session())
+        assert "busy" in str(exc.value)
+        assert exc.value.retry_after == QUEUE_RETRY_AFTER
+
+    def test_none_disables_limits(self):
+        h = Harness(max_queued_jobs=None, max_bytes_per_hour=None, high_water=None)
+        h.unfinished = 10_000
+        h.tracker.reserve_jobs(Session(), 10_000)
+
+
+class TestUsage:
+    def test_reports_session_usage(self):
+        h = Harness()
+        s = Session()
+        h.tracker.check_metadata(s)
+        h.start(s, "a", "b")
+        h.jobs["a"].downloaded_bytes = 300
+        h.finish("b", 700)
+        h.unfinished = 4
+        usage = h.tracker.usage(s)
+        assert usage.queued_jobs == 1
+        assert usage.bytes_last_hour == 1000
+        assert usage.metadata_calls_last_minute == 1
+        assert usage.server_unfinished_jobs == 4
+        assert usage.limits == h.tracker.limits
+
+    def test_state_goes_with_session(self):
+        h = Harness()
+        s = Session()
+        h.start(s, "a")
+        del s
+        gc.collect()
+        assert len(h.tracker._clients) == 0
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from yoink.core.models import (
+    DownloadProgress,
+    DownloadStatus,
+    QuotaLimits,
+    Transcript,
+    TranscriptSegment,
+    VideoInfo,
+)
+from yoink.mcp_server import server
+
+
+class Session:
+    pass
+
+
+@pytest.fixture
+def manager():
+    manager = MagicMock()
+    manager.get_video_info = AsyncMock(
+        return_value=VideoInfo(video_id="abc", title="Test", url="https://youtu.be/abc", duration=60)
+    )
+    manager.get_formats = AsyncMock(return_value=[])
+    manager.get_transcript = AsyncMock(
+        return_value=Transcript(
+            video_id="abc",
+            lang="en",
+            segments=[TranscriptSegment(start=0, end=1, text="hello"), TranscriptSegment(start=1, end=2, text="world")],
+        )
+    )
+    manager.get_all_progress.return_value = []
+    with patch.object(server, "_manager", manager), patch.object(server, "_quota", None), \
+            patch.object(server, "quota_limits", QuotaLimits()):
+        yield manager
+
+
+def context():
+    ctx = MagicMock()
+    ctx.session = Session()
+    return ctx
+
+
+class TestTools:
+    def test_registered_tools(self):
+        names = {t.name for t in asyncio.run(server.mcp.list_tools())}
+        assert {
+            "get_video_info",
+            "get_playlist_info",
+            "get_formats",
+            "get_transcript",
+            "start_download",
+            "list_downloads",
+            "list_download_changes",
+            "wait_for_downloads",
+            "get_quota_usage",
+        } <= names
+
+    def test_video_info_fields_use_basic_profile(self, manager):
+        result = asyncio.run(server.get_video_info("https://youtu.be/abc", fields=["title"]))
+        assert result == {"title": "Test"}
+        manager.get_video_info.assert_awaited_once_with("https://youtu.be/abc", "basic")
+
+    def test_video_info_without_fields_uses_full_profile(self, manager):
+        result = asyncio.run(server.get_video_info("https://youtu.be/abc"))
+        assert result["duration"] == 60
+        manager.get_video_info.assert_awaited_once_with("https://youtu.be/abc", "full")
+
+    def test_video_info_rejects_unknown_fields(self, manager):
+        result = asyncio.run(server.get_video_info("https://youtu.be/abc", fields=["title", "bogus"]))
+        assert result == {"error": "Unknown fields: bogus"}
+        manager.get_video_info.assert_not_awaited()
+
+    def test_audio_formats_use_audio_profile(self, manager):
+        assert asyncio.run(server.get_formats("https://youtu.be/abc", audio_only=True)) == []
+        manager.get_formats.assert_awaited_once_with("https://youtu.be/abc", "formats-audio", True)
+
+    def test_transcript_pages(self, manager):
+        first = asyncio.run(server.get_transcript("https://youtu.be/abc", max_chars=5))
+        assert first["text"] == "hello"
+        assert "segments" not in first
+        second = asyncio.run(server.get_transcript("https://youtu.be/abc", cursor=first["next_cursor"]))
+        assert second["text"] == "world"
+        assert second["next_cursor"] is None
+
+    def test_list_downloads_returns_list(self, manager):
+        manager.get_all_progress.return_value = [
+            DownloadProgress(download_id="a", status=DownloadStatus.FINISHED)
+        ]
+        result = asyncio.run(server.list_downloads())
+        assert [p["download_id"] for p in result] == ["a"]
+
+
+class TestMetadataQuota:
+    def test_info_calls_limited_per_minute(self, manager):
+        ctx = context()
+        limit = QuotaLimits().metadata_calls_per_minute
+        for _ in range(limit):
+            assert "error" not in asyncio.run(server.get_video_info("https://youtu.be/abc", ctx=ctx))
+        refused = asyncio.run(server.get_video_info("https://youtu.be/abc", ctx=ctx))
+        assert "error" in refused
+        assert refused["retry_after_s"] > 0
+        assert manager.get_video_info.await_count == limit
+
+    def test_every_info_tool_is_charged(self, manager):
+        server.quota_limits = QuotaLimits(metadata_calls_per_minute=3)
+        ctx = context()
+        asyncio.run(server.get_video_info("https://youtu.be/abc", ctx=ctx))
+        asyncio.run(server.get_formats("https://youtu.be/abc", ctx=ctx))
+        asyncio.run(server.get_transcript("https://youtu.be/abc", ctx=ctx))
+        assert "retry_after_s" in asyncio.run(server.get_playlist_info("https://youtu.be/list", ctx=ctx))
+        manager.get_playlist_info.assert_not_called()
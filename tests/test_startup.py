@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def _loaded_after_import(module: str) -> set[str]:
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return set(out.stdout.split())
+
+
+class TestColdStart:
+    @pytest.mark.parametrize("module", ["yoink.mcp_server.server", "yoink.tui.app", "yoink.core.manager"])
+    def test_entry_points_do_not_import_yt_dlp(self, module):
+        assert "yt_dlp" not in _loaded_after_import(module)
+
+    def test_server_builds_manager_on_first_use(self):
+        code = (
+            "from yoink.mcp_server import server\n"
+            "assert server._manager is None\n"
+            "assert server.get_manager() is server.get_manager()\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+from unittest.mock import patch
+
+from yoink.core.store import ContentStore, dedupe_tree, link_file
+
+
+class TestLinkFile:
+    def test_links_or_copies(self, tmp_path):
+        src = tmp_path / "a.mp4"
+        src.write_bytes(b"data")
+        dest = tmp_path / "out" / "b.mp4"
+
+        method = link_file(src, dest)
+
+        assert method in ("reflink", "hardlink", "copy")
+        assert dest.read_bytes() == b"data"
+        assert not list((tmp_path / "out").glob(".*"))
+
+    def test_falls_back_to_hardlink(self, tmp_path):
+        src = tmp_path / "a.mp4"
+        src.write_bytes(b"data")
+        dest = tmp_path / "b.mp4"
+
+        with patch("yoink.core.store._reflink", side_effect=OSError("unsupported")):
+            assert link_file(src, dest) == "hardlink"
+        assert os.path.samefile(src, dest)
+
+    def test_replaces_existing_dest(self, tmp_path):
+        src = tmp_path / "a.mp4"
+        src.write_bytes(b"new")
+        dest = tmp_path / "b.mp4"
+        dest.write_bytes(b"old")
+
+        link_file(src, dest)
+        assert dest.read_bytes() == b"new"
+
+
+class TestContentStore:
+    def test_lookup_miss(self, tmp_path):
+        assert ContentStore(tmp_path).lookup("abc", "22") is None
+
+    def test_add_and_link_into(self, tmp_path):
+        store = ContentStore(tmp_path / "store")
+        src = tmp_path / "Video.mp4"
+        src.write_bytes(b"video")
+
+        stored = store.add("abc", "22", src)
+        assert stored.read_bytes() == b"video"
+        assert src.exists()
+        assert store.add("abc", "22", src) == stored
+
+        linked = store.link_into("abc", "22", tmp_path / "other" / "Video.webm")
+        assert linked == tmp_path / "other" / "Video.mp4"
+        assert linked.read_bytes() == b"video"
+
+    def test_format_ids_are_separate(self, tmp_path):
+        store = ContentStore(tmp_path / "store")
+        src = tmp_path / "v.mp4"
+        src.write_bytes(b"v")
+        store.add("abc", "137+140", src)
+        assert store.lookup("abc", "137+140") is not None
+        assert store.lookup("abc", "22") is None
+
+
+class TestDedupeTree:
+    def _write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def test_links_duplicates(self, tmp_path):
+        a = self._write(tmp_path / "x" / "a.mp4", b"same" * 10)
+        b = self._write(tmp_path / "y" / "b.mp4", b"same" * 10)
+        c = self._write(tmp_path / "y" / "c.mp4", b"diff" * 10)
+
+        with patch("yoink.core.store._reflink", side_effect=OSError):
+            report = dedupe_tree([tmp_path], min_size=1)
+
+        assert report.files_scanned == 3
+        assert report.duplicates == 1
+        assert report.bytes_saved == 40
+        assert os.path.samefile(a, b)
+        assert not os.path.samefile(a, c)
+
+        again = dedupe_tree([tmp_path], min_size=1)
+        assert again.duplicates == 0
+
+    def test_dry_run_changes_nothing(self, tmp_path):
+        a = self._write(tmp_path / "a.mp4", b"same")
+        b = self._write(tmp_path / "b.mp4", b"same")
+
+        report = dedupe_tree([tmp_path], dry_run=True, min_size=1)
+
+        assert report.duplicates == 1
+        assert report.linked == [(str(b), str(a))]
+        assert not os.path.samefile(a, b)
+
+    def test_min_size_skips_small_files(self, tmp_path):
+        self._write(tmp_path / "a.txt", b"same")
+        self._write(tmp_path / "b.txt", b"same")
+        assert dedupe_tree([tmp_path], min_size=1024).duplicates == 0
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from yoink.core.streamcache import SharedStreamCache
+
+KEY = ("abc123", "140")
+
+
+def _writer(calls):
+    def download(target):
+        calls.append(target)
+        time.sleep(0.05)
+        path = target / "stream.m4a"
+        path.write_bytes(b"audio")
+        return path
+    return download
+
+
+class TestSharedStreamCache:
+    def test_unregistered_key_is_not_fetched(self, tmp_path):
+        cache = SharedStreamCache(tmp_path)
+        calls = []
+        assert cache.fetch(KEY, _writer(calls)) is None
+        assert calls == []
+
+    def test_concurrent_fetch_downloads_once(self, tmp_path):
+        cache = SharedStreamCache(tmp_path)
+        cache.register(KEY)
+        cache.register(KEY)
+        calls, results = [], []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.fetch(KEY, _writer(calls))))
+            for _ in range(2)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results[0] == results[1]
+        assert results[0].read_bytes() == b"audio"
+
+    def test_last_user_removes_file(self, tmp_path):
+        cache = SharedStreamCache(tmp_path)
+        cache.register(KEY)
+        cache.register(KEY)
+        path = cache.fetch(KEY, _writer([]))
+
+        cache.unregister(KEY)
+        assert path.exists()
+        assert cache.users(KEY) == 1
+        cache.unregister(KEY)
+        assert not path.exists()
+        assert cache.users(KEY) == 0
+
+    def test_failed_fetch_lets_next_caller_retry(self, tmp_path):
+        cache = SharedStreamCache(tmp_path)
+        cache.register(KEY)
+
+        def broken(target):
+            raise OSError("network")
+
+        try:
+            cache.fetch(KEY, broken)
+        except OSError:
+            pass
+        calls = []
+        assert cache.fetch(KEY, _writer(calls)) is not None
+        assert len(calls) == 1
+
+    def test_waiter_gives_up_when_cancelled(self, tmp_path):
+        cache = SharedStreamCache(tmp_path)
+        cache.register(KEY)
+        started, release = threading.Event(), threading.Event()
+
+        def slow(target):
+            started.set()
+            release.wait(5)
+            path = target / "stream.m4a"
+            path.write_bytes(b"audio")
+            return path
+
+        owner = threading.Thread(target=cache.fetch, args=(KEY, slow))
+        owner.start()
+        started.wait(5)
+        assert cache.fetch(KEY, slow, cancelled=lambda: True, poll=0.01) is None
+        release.set()
+        owner.join()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from yoink.core.streaming import AsyncQueueSink, FileDescriptorSink, NamedPipeSink, StreamSink
+
+
+class TestStreamSink:
+    def test_write_is_required(self):
+        class NoWrite(StreamSink):
+            pass
+
+        with pytest.raises(TypeError):
+            NoWrite()
+
+
+class TestFileDescriptorSink:
+    def test_writes_all_bytes(self):
+        r, w = os.pipe()
+        try:
+            sink = FileDescriptorSink(w)
+            sink.write(b"hello world")
+            sink.close()
+            assert os.read(r, 100) == b"hello world"
+        finally:
+            os.close(r)
+            os.close(w)
+
+    def test_closed_reader_raises_broken_pipe(self):
+        r, w = os.pipe()
+        os.close(r)
+        try:
+            with pytest.raises(BrokenPipeError):
+                FileDescriptorSink(w).write(b"data")
+        finally:
+            os.close(w)
+
+
+class TestNamedPipeSink:
+    def test_writes_to_fifo(self, tmp_path):
+        path = tmp_path / "media.fifo"
+        os.mkfifo(path)
+        received = []
+
+        def reader():
+            with open(path, "rb") as f:
+                received.append(f.read())
+
+        t = threading.Thread(target=reader)
+        t.start()
+        sink = NamedPipeSink(str(path))
+        sink.write(b"abc")
+        sink.write(b"def")
+        sink.close()
+        t.join(timeout=2)
+        assert received == [b"abcdef"]
+
+    def test_close_without_write(self, tmp_path):
+        NamedPipeSink(str(tmp_path / "never-opened")).close()
+
+    def test_refuses_regular_file(self, tmp_path):
+        path = tmp_path / "important.txt"
+        path.write_bytes(b"keep me")
+        with pytest.raises(ValueError):
+            NamedPipeSink(str(path)).write(b"overwrite")
+        assert path.read_bytes() == b"keep me"
+
+    def test_waits_for_reader_until_cancelled(self, tmp_path):
+        path = tmp_path / "media.fifo"
+        os.mkfifo(path)
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        sink = NamedPipeSink(str(path), cancelled=cancel.is_set, poll=0.01)
+        with pytest.raises(BrokenPipeError):
+            sink.write(b"abc")
+        sink.close()
+
+
+class TestAsyncQueueSink:
+    def test_chunks_delivered_in_order(self):
+        async def main():
+            sink = AsyncQueueSink(asyncio.get_running_loop(), max_chunks=2)
+
+            def produce():
+                for i in range(5):
+                    sink.write(bytes([i]))
+                sink.close()
+
+            t = threading.Thread(target=produce)
+            t.start()
+            out = [c async for c in sink.chunks()]
+            t.join(timeout=2)
+            return out
+
+        assert asyncio.run(main()) == [bytes([i]) for i in range(5)]
+
+    def test_backpressure_blocks_producer(self):
+        async def main():
+            sink = AsyncQueueSink(asyncio.get_running_loop(), max_chunks=1)
+            written = []
+
+            def produce():
+                try:
+                    for i in range(3):
+                        sink.write(b"x")
+                        written.append(i)
+                except BrokenPipeError:
+                    pass
+
+            t = threading.Thread(target=produce, daemon=True)
+            t.start()
+            await asyncio.sleep(0.3)
+            blocked_at = len(written)
+            chunks = sink.chunks()
+            await chunks.__anext__()
+            await asyncio.sleep(0.3)
+            await chunks.aclose()
+            t.join(timeout=2)
+            return blocked_at
+
+        assert asyncio.run(main()) == 1
+
+    def test_abandoned_consumer_breaks_pipe(self):
+        async def main():
+            sink = AsyncQueueSink(asyncio.get_running_loop(), max_chunks=1)
+            errors = []
+
+            def produce():
+                try:
+                    for _ in range(10):
+                        sink.write(b"x")
+                except BrokenPipeError as e:
+                    errors.append(e)
+
+            t = threading.Thread(target=produce)
+            t.start()
+            chunks = sink.chunks()
+            await chunks.__anext__()
+            await chunks.aclose()
+            await asyncio.to_thread(t.join, 2)
+            return errors
+
+        assert len(asyncio.run(main())) == 1
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+
+from yt_dlp.utils import Popen
+
+from yoink.core.subprocs import ChildProcesses
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+class TestChildProcesses:
+    def test_kills_tracked_children(self):
+        children = ChildProcesses()
+        with children.track():
+            proc = Popen(SLEEP, stdout=subprocess.DEVNULL)
+        start = time.monotonic()
+        assert children.kill() == 1
+        proc.wait(timeout=5)
+        assert time.monotonic() - start < 2
+
+    def test_untracked_children_left_alone(self):
+        children = ChildProcesses()
+        proc = Popen(SLEEP, stdout=subprocess.DEVNULL)
+        try:
+            assert children.kill() == 0
+            assert proc.poll() is None
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_children_started_after_kill_die(self):
+        children = ChildProcesses()
+        children.kill()
+        with children.track():
+            proc = Popen(SLEEP, stdout=subprocess.DEVNULL)
+        assert proc.wait(timeout=5) != 0
+
+    def test_popen_is_restored_when_idle(self):
+        original = Popen.__init__
+        children = ChildProcesses()
+        with children.track():
+            assert Popen.__init__ is not original
+            with ChildProcesses().track():
+                pass
+            assert Popen.__init__ is not original
+        assert Popen.__init__ is original
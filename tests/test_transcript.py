@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from yoink.core.models import Transcript, TranscriptSegment
+from yoink.core.transcript import (
+    TranscriptFetcher,
+    chunk_transcript,
+    parse_json3,
+    parse_timed_text,
+)
+
+VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.500 align:start position:0%
+hello<00:00:01.000><c> world</c>
+
+00:00:02.500 --> 00:00:05.000
+hello world
+second &amp; line
+
+01:00:05.000 --> 01:00:06.000
+<i>last</i>
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:02,000
+first
+
+2
+00:00:02,000 --> 00:00:03,500
+second
+"""
+
+
+def _segments(n: int, text: str = "word") -> list[TranscriptSegment]:
+    return [TranscriptSegment(start=i, end=i + 1, text=text) for i in range(n)]
+
+
+class TestParsers:
+    def test_json3(self):
+        data = json.dumps({"events": [
+            {"tStartMs": 0, "dDurationMs": 1500, "segs": [{"utf8": "hello "}, {"utf8": "there"}]},
+            {"tStartMs": 1500, "dDurationMs": 10, "segs": [{"utf8": "\n"}]},
+            {"tStartMs": 2000},
+            {"tStartMs": 3000, "dDurationMs": 500, "segs": [{"utf8": "bye"}]},
+        ]})
+        segments = parse_json3(data)
+        assert [s.text for s in segments] == ["hello there", "bye"]
+        assert segments[0].end == 1.5
+        assert segments[1].start == 3.0
+
+    def test_vtt_strips_tags_and_rolling_repeats(self):
+        segments = parse_timed_text(VTT)
+        assert [s.text for s in segments] == ["hello world", "second & line", "last"]
+        assert segments[0].end == 2.5
+        assert segments[2].start == 3605.0
+
+    def test_srt(self):
+        segments = parse_timed_text(SRT)
+        assert [(s.start, s.end, s.text) for s in segments] == [(1.0, 2.0, "first"), (2.0, 3.5, "second")]
+
+
+class TestChunkTranscript:
+    def test_single_page(self):
+        t = Transcript(video_id="abc", lang="en", segments=_segments(3))
+        chunk = chunk_transcript(t)
+        assert chunk.text == "word word word"
+        assert chunk.next_cursor is None
+        assert chunk.segments is None
+        assert chunk.total_segments == 3
+
+    def test_pages_cover_everything(self):
+        t = Transcript(video_id="abc", lang="en", segments=_segments(10, "abcd"))
+        cursor, texts = 0, []
+        while cursor is not None:
+            chunk = chunk_transcript(t, cursor, max_chars=12, timestamps=True)
+            assert len(chunk.segments) >= 1
+            texts.extend(s.text for s in chunk.segments)
+            cursor = chunk.next_cursor
+        assert len(texts) == 10
+
+    def test_oversized_segment_still_advances(self):
+        t = Transcript(video_id="abc", lang="en", segments=_segments(2, "x" * 50))
+        chunk = chunk_transcript(t, 0, max_chars=10)
+        assert chunk.next_cursor == 1
+
+
+class TestTranscriptFetcher:
+    @pytest.fixture
+    def mock_ydl(self):
+        with patch("yoink.core.transcript.yt_dlp.YoutubeDL") as mock_ydl_cls:
+            ydl = MagicMock()
+            mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=ydl)
+            mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+            yield ydl
+
+    def test_prefers_manual_subtitles(self, mock_ydl):
+        mock_ydl.extract_info.return_value = {
+            "id": "abc",
+            "subtitles": {"en-GB": [{"ext": "vtt", "url": "http://subs/manual"}]},
+            "automatic_captions": {"en": [{"ext": "json3", "url": "http://subs/auto"}]},
+        }
+        mock_ydl.urlopen.return_value.read.return_value = SRT.encode()
+
+        transcript = TranscriptFetcher().fetch("https://youtu.be/abc", "en")
+
+        mock_ydl.urlopen.assert_called_once_with("http://subs/manual")
+        mock_ydl.download.assert_not_called()
+        assert transcript.lang == "en-GB"
+        assert transcript.automatic is False
+        assert transcript.segments[0].text == "first"
+
+    def test_falls_back_to_auto_captions_and_caches(self, mock_ydl):
+        mock_ydl.extract_info.return_value = {
+            "id": "abc",
+            "automatic_captions": {"en": [
+                {"ext": "srv3", "url": "http://subs/srv3"},
+                {"ext": "json3", "url": "http://subs/json3"},
+            ]},
+        }
+        mock_ydl.urlopen.return_value.read.return_value = json.dumps(
+            {"events": [{"tStartMs": 0, "dDurationMs": 1000, "segs": [{"utf8": "hi"}]}]}
+        ).encode()
+        fetcher = TranscriptFetcher()
+
+        first = fetcher.fetch("https://youtu.be/abc", "en")
+        second = fetcher.fetch("https://youtu.be/abc", "en")
+
+        assert first is second
+        assert first.automatic is True
+        mock_ydl.urlopen.assert_called_once_with("http://subs/json3")
+        assert mock_ydl.extract_info.call_count == 1
+
+    def test_missing_language_lists_available(self, mock_ydl):
+        mock_ydl.extract_info.return_value = {
+            "id": "abc",
+            "subtitles": {"de": [{"ext": "vtt", "url": "u"}]},
+        }
+        with pytest.raises(ValueError, match="Available: de"):
+            TranscriptFetcher().fetch("https://youtu.be/abc", "en")
+
+    def test_cache_is_bounded(self, mock_ydl):
+        mock_ydl.urlopen.return_value.read.return_value = SRT.encode()
+        fetcher = TranscriptFetcher(cache_size=2)
+        for vid in ("a", "b", "c"):
+            mock_ydl.extract_info.return_value = {
+                "id": vid, "subtitles": {"en": [{"ext": "srt", "url": vid}]},
+            }
+            fetcher.fetch(f"https://youtu.be/{vid}")
+        assert list(fetcher._cache) == [("b", "en"), ("c", "en")]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import socket
+from unittest.mock import MagicMock, patch
+
+from yoink.core.manager import DownloadManager
+from yoink.core.warmup import warm_up
+
+
+class TestWarmUp:
+    @patch("yoink.core.warmup.socket.getaddrinfo")
+    def test_times_each_step(self, getaddrinfo):
+        extractor = MagicMock()
+        report = warm_up(extractor, hosts=("a.example", "b.example"))
+        assert list(report.steps) == ["import", "resolve"]
+        assert report.errors == {}
+        assert report.total_seconds >= sum(report.steps.values())
+        assert [c.args[0] for c in getaddrinfo.call_args_list] == ["a.example", "b.example"]
+        extractor.extract_raw.assert_not_called()
+
+    @patch("yoink.core.warmup.socket.getaddrinfo")
+    def test_url_primes_cache(self, getaddrinfo):
+        extractor = MagicMock()
+        report = warm_up(extractor, "https://youtube.com/watch?v=x")
+        assert "prime_cache" in report.steps
+        extractor.extract_raw.assert_called_once_with("https://youtube.com/watch?v=x")
+
+    @patch("yoink.core.warmup.socket.getaddrinfo", side_effect=socket.gaierror("Name or service not known"))
+    def test_failed_step_does_not_stop_the_rest(self, getaddrinfo):
+        extractor = MagicMock()
+        extractor.extract_raw.side_effect = Exception("HTTP Error 429: Too Many Requests")
+        report = warm_up(extractor, "https://youtube.com/watch?v=x")
+        assert list(report.steps) == ["import", "resolve", "prime_cache"]
+        assert set(report.errors) == {"resolve", "prime_cache"}
+        assert "Rate limited" in report.errors["prime_cache"]
+
+    @patch("yoink.core.warmup.socket.getaddrinfo")
+    def test_manager_runs_in_background_and_keeps_report(self, getaddrinfo):
+        manager = DownloadManager()
+        try:
+            assert manager.warmup is None
+            report = manager.warm_up().result(timeout=10)
+            assert manager.warmup is report
+            assert "import" in report.steps
+        finally:
+            manager.shutdown()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from yoink.core.models import DownloadProgress
+from yoink.core.watchdog import StallWatchdog
+
+
+def _engine(download_id="job", stage="download"):
+    engine = MagicMock()
+    engine.request.download_id = download_id
+    engine.stage = stage
+    engine.is_cancelled = False
+    engine.progress = DownloadProgress(download_id=download_id)
+    return engine
+
+
+def _tick(engine, downloaded, speed):
+    engine.progress.downloaded_bytes = downloaded
+    engine.progress.speed = speed
+
+
+class TestStallWatchdog:
+    def test_flags_stalled_download(self):
+        dog = StallWatchdog(stall_timeout=30)
+        engine = _engine()
+        dog.watch(engine)
+        start = dog._jobs["job"].last_change
+        _tick(engine, 1000, 500.0)
+        assert dog.check(start + 1) == []
+        assert dog.check(start + 20) == []
+        assert dog.check(start + 31) == ["job"]
+        engine.request_restart.assert_called_once()
+        assert "no progress" in engine.request_restart.call_args[0][0]
+
+    def test_flags_throttle_against_own_baseline(self):
+        dog = StallWatchdog(slow_ratio=0.1, slow_for=20, warmup=10)
+        engine = _engine()
+        dog.watch(engine)
+        now = dog._jobs["job"].last_change
+        downloaded = 0
+        for _ in range(15):
+            now += 1
+            downloaded += 1_000_000
+            _tick(engine, downloaded, 1_000_000.0)
+            assert dog.check(now) == []
+        flagged = []
+        for _ in range(25):
+            now += 1
+            downloaded += 50_000
+            _tick(engine, downloaded, 50_000.0)
+            flagged += dog.check(now)
+        assert flagged == ["job"]
+        assert "throttled" in engine.request_restart.call_args[0][0]
+
+    def test_slow_but_steady_download_is_left_alone(self):
+        dog = StallWatchdog(slow_for=5, warmup=0)
+        engine = _engine()
+        dog.watch(engine)
+        now = dog._jobs["job"].last_change
+        for i in range(1, 60):
+            _tick(engine, i * 10_000, 10_000.0)
+            assert dog.check(now + i) == []
+
+    def test_ignores_jobs_outside_download_stage(self):
+        dog = StallWatchdog(stall_timeout=5)
+        engine = _engine(stage="postprocess")
+        dog.watch(engine)
+        start = dog._jobs["job"].last_change
+        assert dog.check(start + 100) == []
+        engine.stage = "download"
+        assert dog.check(start + 102) == []
+        assert dog.check(start + 106) == ["job"]
+
+    def test_unwatch(self):
+        dog = StallWatchdog(stall_timeout=1)
+        engine = _engine()
+        dog.watch(engine)
+        dog.unwatch("job")
+        assert dog.check(10**9) == []
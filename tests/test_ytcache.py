@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import yt_dlp
+
+from yoink.core.extractor import MetadataExtractor
+from yoink.core.manager import DownloadManager
+from yoink.core.models import EngineOptions
+from yoink.core.ytcache import YtDlpCache, cache_params, default_cache_dir
+
+
+def _entry(root, section, name, size, age=0.0):
+    path = root / section / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestDefaultCacheDir:
+    def test_env_override(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("YOINK_CACHE_DIR", str(tmp_path / "c"))
+        assert default_cache_dir() == tmp_path / "c"
+
+    def test_under_xdg_cache_home(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("YOINK_CACHE_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_cache_dir() == tmp_path / "yoink" / "yt-dlp"
+
+
+class TestPrune:
+    def test_evicts_oldest_over_limit(self, tmp_path):
+        old = _entry(tmp_path, "youtube-sigfuncs", "old.json", 600, age=300)
+        mid = _entry(tmp_path, "youtube-nsig", "mid.json", 600, age=200)
+        new = _entry(tmp_path, "youtube-sigfuncs", "new.json", 600, age=100)
+        cache = YtDlpCache(tmp_path, max_bytes=1000)
+        assert cache.prune() == 2
+        assert not old.exists() and not mid.exists() and new.exists()
+        assert cache.stats().pruned == 2
+
+    def test_removes_only_stale_temp_files(self, tmp_path):
+        stale = _entry(tmp_path, "youtube-nsig", "a.json.x1.tmp", 10, age=7200)
+        writing = _entry(tmp_path, "youtube-nsig", "b.json.x2.tmp", 10_000)
+        cache = YtDlpCache(tmp_path, max_bytes=100)
+        cache.prune()
+        assert not stale.exists()
+        assert writing.exists()
+
+    def test_skips_while_another_process_prunes(self, tmp_path):
+        _entry(tmp_path, "youtube-nsig", "a.json", 600)
+        cache = YtDlpCache(tmp_path, max_bytes=0)
+        with open(tmp_path / ".yoink-prune.lock", "a") as held:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            assert cache.prune() == 0
+        assert cache.prune() == 1
+
+    def test_missing_dir_is_left_alone(self, tmp_path):
+        assert YtDlpCache(tmp_path / "nope").prune() == 0
+        assert not (tmp_path / "nope").exists()
+
+
+class TestStats:
+    def test_counts_hits_misses_and_stores(self, tmp_path):
+        cache = YtDlpCache(tmp_path)
+        with yt_dlp.YoutubeDL({"quiet": True, **cache_params(str(cache.root))}) as ydl:
+            assert ydl.cache.load("youtube-sigfuncs", "player", default="fallback") == "fallback"
+            ydl.cache.store("youtube-sigfuncs", "player", [1, 2, 3])
+            assert ydl.cache.load("youtube-sigfuncs", "player") == [1, 2, 3]
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.stores, stats.entries) == (1, 1, 1, 1)
+        assert stats.sections == {"youtube-sigfuncs": {"hits": 1, "misses": 1, "stores": 1}}
+        assert stats.size_bytes > 0
+
+    def test_other_directories_are_not_counted(self, tmp_path):
+        cache = YtDlpCache(tmp_path / "mine")
+        with yt_dlp.YoutubeDL({"quiet": True, **cache_params(str(tmp_path / "other"))}) as ydl:
+            ydl.cache.load("youtube-sigfuncs", "player")
+        assert cache.stats().misses == 0
+
+
+class TestCacheWiring:
+    def test_manager_resolves_and_shares_dir(self, tmp_path):
+        manager = DownloadManager(engine_options=EngineOptions(cache_dir=str(tmp_path)))
+        try:
+            assert manager._engine_options.cache_dir == str(tmp_path)
+            assert manager.get_cache_stats().path == str(tmp_path)
+        finally:
+            manager.shutdown()
+
+    @patch("yoink.core.extractor.yt_dlp.YoutubeDL")
+    def test_extractor_passes_cachedir(self, mock_ydl_cls, tmp_path):
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {"id": "x", "title": "T"}
+        mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=ydl)
+        mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+        MetadataExtractor(cache_dir=str(tmp_path)).extract_raw("https://youtube.com/watch?v=x")
+        assert mock_ydl_cls.call_args[0][0]["cachedir"] == str(tmp_path)